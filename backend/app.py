@@ -5,6 +5,11 @@ from flask_migrate import Migrate
 from dotenv import load_dotenv
 from models.models import db, User
 from cache.cache_config import init_cache
+from cache.invalidation import init_cache_invalidation
+from utils.auth import load_user
+from utils.request_feed import init_request_feed
+from utils.search import init_search_index
+from utils.monthly_metrics import init_monthly_metrics
 from flask_cors import CORS
 from flask_mail import Mail
 from tasks.celery_config import make_celery
@@ -32,11 +37,25 @@ def create_app():
     app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', 'yourpassword')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@household-services.com')
 
+    # Export downloads. A fronting server can take over sending the files:
+    # USE_X_SENDFILE for Apache/lighttpd X-Sendfile, or EXPORT_ACCEL_REDIRECT_PREFIX
+    # for an nginx `internal` location aliased to the exports directory
+    app.config['USE_X_SENDFILE'] = os.getenv('USE_X_SENDFILE', 'False').lower() in ('true', '1', 't')
+    app.config['EXPORT_ACCEL_REDIRECT_PREFIX'] = os.getenv('EXPORT_ACCEL_REDIRECT_PREFIX')
+    app.config['EXPORT_RETENTION_DAYS'] = int(os.getenv('EXPORT_RETENTION_DAYS', 7))
+
+    # Compiled report template bytecode, see tasks.report_tasks.get_report_env
+    app.config['REPORT_TEMPLATE_CACHE_DIR'] = os.getenv(
+        'REPORT_TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'report_templates'))
+
     # Initialize extensions
     db.init_app(app)
     migrate = Migrate(app, db)
     mail.init_app(app)  # Initialize mail with app
     cache = init_cache(app)
+    init_cache_invalidation(app)
+    init_request_feed(app)
+    init_monthly_metrics(app)
     login_manager = LoginManager()
     login_manager.login_view = 'auth.login'
     login_manager.init_app(app)
@@ -54,8 +73,8 @@ def create_app():
     celery = make_celery(app)
     
     @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    def load_session_user(user_id):
+        return load_user(int(user_id))
     
     # Register blueprints
     from routes.auth_routes import auth_bp
@@ -75,9 +94,11 @@ def create_app():
     
     # Create exports directory if it doesn't exist
     os.makedirs(os.path.join(app.root_path, 'exports'), exist_ok=True)
+    os.makedirs(app.config['REPORT_TEMPLATE_CACHE_DIR'], exist_ok=True)
 
     with app.app_context():
         db.create_all()
+        init_search_index(app)
         
         # Create admin user if not exists
         admin = User.query.filter_by(role='admin').first()
@@ -0,0 +1,75 @@
+"""
+Measure the per-request cost of authenticating an approved professional.
+
+Runs against a throwaway in-memory SQLite database and an in-process cache,
+so it needs neither the app database nor Redis:
+
+    python benchmark_auth.py [requests]
+    JWT_CLAIMS_MODE=true python benchmark_auth.py [requests]
+"""
+import os
+import sys
+import time
+
+os.environ['DATABASE_URI'] = 'sqlite://'
+
+from sqlalchemy import event
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Professional, Service
+from utils.auth import approved_professional_required, current_professional_id
+from utils.tokens import JWT_CLAIMS_MODE
+
+
+def build_app():
+    app = create_app()
+
+    # A route doing nothing but auth, so the timing excludes handler work
+    @app.route('/benchmark/auth')
+    @approved_professional_required
+    def benchmark_auth():
+        return {'professional_id': current_professional_id()}
+
+    with app.app_context():
+        service = Service(name='Benchmark', base_price=1, time_required=1)
+        user = User(username='benchmark_pro', email='benchmark@example.com', role='professional')
+        user.set_password('benchmark')
+        db.session.add_all([service, user])
+        db.session.flush()
+        db.session.add(Professional(user_id=user.id, service_id=service.id, verification_status='approved'))
+        db.session.commit()
+
+    return app
+
+
+def run(count):
+    app = build_app()
+    client = app.test_client(use_cookies=False)
+    token = client.post('/api/auth/login', json={'username': 'benchmark_pro', 'password': 'benchmark'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    queries = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+
+    # Warm up the token cache and connection pool
+    for _ in range(20):
+        assert client.get('/benchmark/auth', headers=headers).status_code == 200
+
+    queries.clear()
+    start = time.perf_counter()
+    for _ in range(count):
+        client.get('/benchmark/auth', headers=headers)
+    elapsed = time.perf_counter() - start
+
+    mode = 'signed claims' if JWT_CLAIMS_MODE else 'database'
+    print(f"Auth mode: {mode}")
+    print(f"{count} requests in {elapsed:.2f}s: {elapsed / count * 1e6:.0f} us/request, "
+          f"{len(queries) / count:.1f} queries/request")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
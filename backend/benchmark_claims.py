@@ -0,0 +1,138 @@
+"""
+Stress test for professionals accepting open service requests concurrently.
+
+Every thread is a professional trying to accept every open request, first
+with the old read-check-write handler logic and then with
+ServiceRequest.claim(). Reports how many requests were accepted more than
+once and the claim throughput. Uses a throwaway SQLite file and an
+in-process cache:
+
+    python benchmark_claims.py [threads] [requests]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_claims.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest
+
+
+def seed(threads, requests):
+    service = Service(name='Benchmark', base_price=1, time_required=1)
+    customer_user = User(username='benchmark_customer', email='customer@example.com', role='customer')
+    db.session.add_all([service, customer_user])
+    db.session.flush()
+    customer = Customer(user_id=customer_user.id)
+    db.session.add(customer)
+
+    professional_ids = []
+    for i in range(threads):
+        user = User(username=f'benchmark_pro_{i}', email=f'pro{i}@example.com', role='professional')
+        db.session.add(user)
+        db.session.flush()
+        professional = Professional(user_id=user.id, service_id=service.id, verification_status='approved')
+        db.session.add(professional)
+        db.session.flush()
+        professional_ids.append(professional.id)
+
+    db.session.flush()
+    db.session.add_all([ServiceRequest(service_id=service.id, customer_id=customer.id) for _ in range(requests)])
+    db.session.commit()
+    return professional_ids
+
+
+def reset_requests():
+    ServiceRequest.query.update({ServiceRequest.service_status: 'requested', ServiceRequest.professional_id: None})
+    db.session.commit()
+
+
+def accept_read_check_write(request_id, professional_id):
+    """The previous accept logic: load, check the status, then write"""
+    service_request = db.session.get(ServiceRequest, request_id)
+    if service_request.service_status != 'requested':
+        db.session.rollback()
+        return False
+    service_request.professional_id = professional_id
+    service_request.service_status = 'accepted'
+    db.session.commit()
+    return True
+
+
+def accept_compare_and_set(request_id, professional_id):
+    """The accept action: the same cheap status check, then a conditional UPDATE"""
+    service_request = db.session.get(ServiceRequest, request_id)
+    if service_request.service_status != 'requested':
+        db.session.rollback()
+        return False
+    won = ServiceRequest.claim(request_id, professional_id)
+    if won:
+        db.session.commit()
+    else:
+        db.session.rollback()
+    return won
+
+
+def run(app, accept, professional_ids, request_ids):
+    wins = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+    barrier = threading.Barrier(len(professional_ids))
+
+    def worker(professional_id):
+        with app.app_context():
+            barrier.wait()
+            for request_id in request_ids:
+                try:
+                    won = accept(request_id, professional_id)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors[type(e).__name__] += 1
+                    continue
+                if won:
+                    with lock:
+                        wins[request_id] += 1
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(pid,)) for pid in professional_ids]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    attempts = len(professional_ids) * len(request_ids)
+    doubles = sum(1 for count in wins.values() if count > 1)
+    print(f"{accept.__name__}: {attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:.0f}/s), "
+          f"{sum(wins.values())} successful accepts, {doubles} requests accepted more than once, "
+          f"errors: {dict(errors) or 'none'}")
+
+
+def main(threads, requests):
+    app = create_app()
+    with app.app_context():
+        professional_ids = seed(threads, requests)
+        request_ids = [row.id for row in db.session.query(ServiceRequest.id).order_by(ServiceRequest.id)]
+
+    for accept in (accept_read_check_write, accept_compare_and_set):
+        with app.app_context():
+            reset_requests()
+        run(app, accept, professional_ids, request_ids)
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    )
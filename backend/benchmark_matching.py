@@ -0,0 +1,137 @@
+"""
+Benchmark nearest-pincode lookups of open service requests.
+
+Seeds one service with N open requests (1M by default) from customers
+spread over random pincodes in a throwaway SQLite file, then times the
+first page and a run of cursor pages for random professional pincodes,
+from the Redis matching index and from the SQL fallback query:
+
+    REDIS_URL=redis://localhost:6379/15 python benchmark_matching.py [requests] [customers]
+
+The index part is skipped when Redis is unreachable. It writes to the
+database in REDIS_URL, so point it at a scratch database.
+"""
+import os
+import sys
+import random
+import statistics
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_matching.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+import redis
+from sqlalchemy import func
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Customer, Service, ServiceRequest
+from utils.request_matching import build_index, nearest_request_ids, _sql_page
+
+PAGE_LIMIT = 50
+LOOKUPS = 200
+SQL_LOOKUPS = 10
+DEEP_PAGES = 20
+
+
+def random_pin(rng):
+    return f'{rng.randint(1, 8)}{rng.randint(0, 99999):05d}'
+
+
+def seed(requests, customers, rng):
+    service = Service(name='Benchmark', base_price=1, time_required=1)
+    db.session.add(service)
+    db.session.flush()
+
+    # create_app() may already have added the admin user
+    first_user = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    db.session.execute(User.__table__.insert(), [
+        {'id': first_user + i, 'username': f'benchmark_customer_{i}', 'email': f'c{i}@example.com', 'role': 'customer'}
+        for i in range(customers)
+    ])
+    db.session.execute(Customer.__table__.insert(), [
+        {'id': i + 1, 'user_id': first_user + i, 'pin_code': random_pin(rng)} for i in range(customers)
+    ])
+
+    batch = 50000
+    for start in range(0, requests, batch):
+        db.session.execute(ServiceRequest.__table__.insert(), [
+            {'service_id': service.id, 'customer_id': rng.randint(1, customers), 'service_status': 'requested'}
+            for _ in range(start, min(start + batch, requests))
+        ])
+    db.session.commit()
+    return service.id
+
+
+def timed(fn, samples):
+    durations = []
+    for args in samples:
+        start = time.perf_counter()
+        fn(*args)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def report(label, durations):
+    durations = sorted(durations)
+    p95 = durations[int(len(durations) * 0.95) - 1] if len(durations) >= 20 else durations[-1]
+    print(f"{label}: p50 {statistics.median(durations):.2f} ms, p95 {p95:.2f} ms over {len(durations)} lookups")
+
+
+def deep_pages(page, pin):
+    """Follow the cursor for DEEP_PAGES pages"""
+    after = None
+    for _ in range(DEEP_PAGES):
+        positions = page(pin, after)
+        if len(positions) <= PAGE_LIMIT:
+            return
+        after = positions[PAGE_LIMIT - 1]
+
+
+def redis_client():
+    client = redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/15'))
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        return None
+    return client
+
+
+def main(requests, customers):
+    rng = random.Random(42)
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        service_id = seed(requests, customers, rng)
+        print(f"Seeded {requests} open requests from {customers} customers in {time.perf_counter() - start:.1f}s")
+
+        pins = [random_pin(rng) for _ in range(LOOKUPS)]
+
+        client = redis_client()
+        if client is None:
+            print("Redis is unreachable, skipping the matching index")
+        else:
+            client.flushdb()
+            start = time.perf_counter()
+            build_index(client, service_id)
+            print(f"Built the matching index in {time.perf_counter() - start:.1f}s, "
+                  f"Redis memory {client.info('memory')['used_memory_human']}")
+
+            index_page = lambda pin, after=None: nearest_request_ids(client, service_id, pin, PAGE_LIMIT, after)
+            report(f"Index first page of {PAGE_LIMIT}", timed(index_page, [(pin,) for pin in pins]))
+            report(f"Index {DEEP_PAGES} cursor pages", timed(lambda pin: deep_pages(index_page, pin), [(pin,) for pin in pins]))
+            client.flushdb()
+
+        sql_page = lambda pin, after=None: _sql_page(service_id, pin, PAGE_LIMIT, after)
+        report(f"SQL first page of {PAGE_LIMIT}", timed(sql_page, [(pin,) for pin in pins[:SQL_LOOKUPS]]))
+        report(f"SQL {DEEP_PAGES} cursor pages", timed(lambda pin: deep_pages(sql_page, pin), [(pin,) for pin in pins[:1]]))
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1000000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    )
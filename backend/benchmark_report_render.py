@@ -0,0 +1,98 @@
+"""
+Benchmark rendering the monthly report email: renders per second with the
+template compiled once per process (tasks.report_tasks.get_report_template)
+against compiling it from source for every report, as the inline template
+string used to be. Renders a report of N requests (8 by default) from a
+throwaway SQLite file:
+
+    python benchmark_report_render.py [requests] [renders]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_report_render.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+import jinja2
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest, Review
+from tasks.report_tasks import REPORT_TEMPLATE_DIR, render_report_template
+
+
+def seed(requests):
+    service = Service(name='Benchmark', base_price=100, time_required=60)
+    customer_user = User(username='benchmark_customer', email='customer@example.com', role='customer')
+    professional_user = User(username='benchmark_pro', email='pro@example.com', role='professional')
+    db.session.add_all([service, customer_user, professional_user])
+    db.session.flush()
+    customer = Customer(user_id=customer_user.id)
+    professional = Professional(user_id=professional_user.id, service_id=service.id, verification_status='approved')
+    db.session.add_all([customer, professional])
+    db.session.flush()
+    for i in range(requests):
+        service_request = ServiceRequest(
+            service_id=service.id, customer_id=customer.id, professional_id=professional.id,
+            service_status='completed' if i % 2 else 'accepted', date_of_request=datetime(2026, 3, 1 + i % 28),
+            remarks=f'Request <{i}> & notes'
+        )
+        db.session.add(service_request)
+        db.session.flush()
+        if i % 2:
+            db.session.add(Review(service_request_id=service_request.id, rating=1 + i % 5))
+    db.session.commit()
+    return customer
+
+
+def report_args(customer):
+    service_requests = ServiceRequest.query.filter_by(customer_id=customer.id).all()
+    for req in service_requests:
+        # Load the relations up front so only rendering is timed
+        req.service, req.professional, req.review
+    return dict(
+        customer=customer,
+        service_requests=service_requests,
+        total_requests=len(service_requests),
+        completed_requests=sum(1 for req in service_requests if req.service_status == 'completed'),
+        total_cost=sum(req.service.base_price for req in service_requests),
+        avg_rating=3.0,
+        month_name='March 2026'
+    )
+
+
+def render_compiled_per_call(source, args):
+    env = jinja2.Environment(autoescape=jinja2.select_autoescape(['html']))
+    return env.from_string(source).render(**args)
+
+
+def rate(render, renders):
+    start = time.perf_counter()
+    for _ in range(renders):
+        render()
+    return renders / (time.perf_counter() - start)
+
+
+def main(requests, renders):
+    app = create_app()
+    with app.app_context():
+        args = report_args(seed(requests))
+        with open(os.path.join(REPORT_TEMPLATE_DIR, 'monthly_report.html')) as template_file:
+            source = template_file.read()
+
+        cached = render_report_template(**args)
+        assert cached == render_compiled_per_call(source, args)
+
+        print(f"{'template':<20} {'renders/s':>10}")
+        print(f"{'compiled per call':<20} {rate(lambda: render_compiled_per_call(source, args), renders):>10.0f}")
+        print(f"{'compiled once':<20} {rate(lambda: render_report_template(**args), renders):>10.0f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 2000)
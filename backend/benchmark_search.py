@@ -0,0 +1,99 @@
+"""
+Benchmark professional search over 1M rows.
+
+Seeds N approved professionals (1M by default) with random names and
+descriptions into a throwaway SQLite file, so the FTS5 triggers index them
+as they are inserted, then times the first ranked page of a few searches
+from the full-text index and from the LIKE fallback:
+
+    python benchmark_search.py [professionals]
+"""
+import os
+import sys
+import random
+import statistics
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_search.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import func
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Professional, Service
+from utils.search import professional_search
+
+PAGE_LIMIT = 20
+REPEAT = 5
+SERVICES = ['Plumbing', 'Electrical', 'Carpentry', 'Cleaning', 'Painting', 'Pest Control', 'Gardening', 'Appliance Repair']
+TRADE_WORDS = ['pipes', 'wiring', 'leak', 'repair', 'install', 'deep', 'furniture', 'emergency', 'certified', 'quick']
+QUERIES = ['plumb', 'emergency repair', 'cert', 'wiring install quick', 'zzzz']
+
+
+def random_word(rng):
+    return ''.join(rng.choice('bcdfghjklmnprstvw') + rng.choice('aeiou') for _ in range(rng.randint(2, 4)))
+
+
+def seed(count, rng):
+    services = [Service(name=name, base_price=1, time_required=1) for name in SERVICES]
+    db.session.add_all(services)
+    db.session.flush()
+    service_ids = [service.id for service in services]
+    vocabulary = [random_word(rng) for _ in range(5000)] + TRADE_WORDS
+
+    # create_app() may already have added the admin user
+    first_user = (db.session.query(func.max(User.id)).scalar() or 0) + 1
+    batch = 50000
+    for start in range(0, count, batch):
+        ids = range(start, min(start + batch, count))
+        db.session.execute(User.__table__.insert(), [
+            {'id': first_user + i, 'username': f'{random_word(rng)}_{i}', 'email': f'p{i}@example.com', 'role': 'professional'}
+            for i in ids
+        ])
+        db.session.execute(Professional.__table__.insert(), [
+            {'user_id': first_user + i, 'service_id': rng.choice(service_ids), 'verification_status': 'approved',
+             'description': ' '.join(rng.choice(vocabulary) for _ in range(12))}
+            for i in ids
+        ])
+    db.session.commit()
+
+
+def first_page(query_text):
+    match = professional_search(query_text)
+    return db.session.query(Professional.id, match.c.search_rank).join(
+        match, match.c.id == Professional.id
+    ).filter(
+        Professional.verification_status == 'approved'
+    ).order_by(match.c.search_rank, Professional.id).limit(PAGE_LIMIT).all()
+
+
+def run(label):
+    for query_text in QUERIES:
+        durations = []
+        for _ in range(REPEAT):
+            start = time.perf_counter()
+            rows = first_page(query_text)
+            durations.append((time.perf_counter() - start) * 1000)
+        print(f"{label} {query_text!r}: {len(rows)} rows, median {statistics.median(durations):.1f} ms")
+
+
+def main(count):
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        seed(count, random.Random(42))
+        print(f"Seeded and indexed {count} professionals in {time.perf_counter() - start:.1f}s")
+
+        backend = app.extensions['search_backend']
+        run(backend)
+        app.extensions['search_backend'] = None
+        run('LIKE')
+        app.extensions['search_backend'] = backend
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
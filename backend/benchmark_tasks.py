@@ -0,0 +1,89 @@
+"""
+Benchmark the per-task overhead of the Celery tasks: time and queries per
+call with the Flask app built once per worker process (get_worker_app()),
+against building it for every task as the tasks used to. Tasks run in this
+process the way a worker runs them, outside any app context, against a
+throwaway SQLite file:
+
+    python benchmark_tasks.py [calls]
+"""
+import os
+import sys
+import tempfile
+import time
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'benchmark_tasks.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'SimpleCache'
+
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest
+from tasks.celery_config import get_worker_app
+from tasks.maintenance_tasks import rebuild_professional_stats, finalize_monthly_metrics
+from tasks.scheduled_tasks import send_daily_reminders
+
+TASKS = (rebuild_professional_stats, finalize_monthly_metrics, send_daily_reminders)
+
+
+def seed():
+    service = Service(name='Benchmark', base_price=100, time_required=60)
+    customer_user = User(username='benchmark_customer', email='customer@example.com', role='customer')
+    professional_user = User(username='benchmark_pro', email='pro@example.com', role='professional')
+    db.session.add_all([service, customer_user, professional_user])
+    db.session.flush()
+    customer = Customer(user_id=customer_user.id)
+    professional = Professional(user_id=professional_user.id, service_id=service.id, verification_status='approved')
+    db.session.add_all([customer, professional])
+    db.session.flush()
+    db.session.add_all([
+        ServiceRequest(service_id=service.id, customer_id=customer.id, professional_id=professional.id,
+                       service_status='completed' if i % 2 else 'accepted')
+        for i in range(100)
+    ])
+    db.session.commit()
+
+
+def run_with_worker_app(task):
+    # What a worker does: ContextTask pushes the process-wide app
+    task()
+
+
+def run_with_new_app(task):
+    # What the tasks did before: a new app (blueprints, create_all, admin lookup) per call
+    with create_app().app_context():
+        task.run()
+
+
+def measure(runner, task, calls):
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(Engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    for _ in range(calls):
+        runner(task)
+    elapsed = time.perf_counter() - start
+    event.remove(Engine, 'before_cursor_execute', listener)
+    return elapsed * 1000 / calls, len(queries) / calls
+
+
+def main(calls):
+    with get_worker_app().app_context():
+        seed()
+
+    print(f"{'task':<28} {'worker app ms':>14} {'queries':>8} {'new app ms':>11} {'queries':>8}")
+    for task in TASKS:
+        # Warm up both paths so imports and first-use compilation do not count
+        run_with_worker_app(task)
+        run_with_new_app(task)
+        worker_ms, worker_queries = measure(run_with_worker_app, task, calls)
+        new_ms, new_queries = measure(run_with_new_app, task, calls)
+        print(f"{task.name.rsplit('.', 1)[-1]:<28} {worker_ms:>14.2f} {worker_queries:>8.1f} {new_ms:>11.2f} {new_queries:>8.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
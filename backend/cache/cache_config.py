@@ -9,35 +9,73 @@ cache = Cache(
     }
 )
 
+# Keys purged by cache.invalidation on commit can be kept much longer
+LONG_CACHE_TIMEOUT = 24 * 60 * 60
+
 SERVICE_CACHE_KEY = 'all_services'
+SERVICE_CATALOG_CACHE_KEY = 'service_catalog'
 SERVICE_DETAIL_CACHE_KEY = 'service_{}'
 PROFESSIONAL_LIST_CACHE_KEY = 'proffesionals_{}'
+PROFESSIONAL_DETAIL_CACHE_KEY = 'professional_{}'
 DASHBOARD_STATS_CACHE_KEY = 'dashboard_stats_{}'
 
+# JWT revocation set, see utils.tokens
+REVOKED_TOKEN_CACHE_KEY = 'revoked_token_{}'
+USER_TOKENS_REVOKED_CACHE_KEY = 'tokens_revoked_before_{}_{}'
+
 def init_cache(app):
     cache.init_app(app)
     return cache
 
-def clear_service_cache(service_id = None):
+def get_redis_client():
+    """The Redis connection behind flask_caching, or None for other backends"""
+    return getattr(cache.cache, '_write_client', None)
+
+def delete_keys(keys):
+    """
+    Purge several keys at once. On Redis this is a single UNLINK round trip;
+    other backends delete key by key, because their delete_many stops at the
+    first key that is not cached.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    if callable(getattr(cache.cache, 'unlink', None)):
+        cache.unlink(*keys)
+    else:
+        for key in keys:
+            cache.delete(key)
+
+def service_cache_keys(service_id = None):
+    keys = {SERVICE_CACHE_KEY, SERVICE_CATALOG_CACHE_KEY}
+    if service_id:
+        keys.add(SERVICE_DETAIL_CACHE_KEY.format(service_id))
+        keys.add(PROFESSIONAL_LIST_CACHE_KEY.format(f'service_{service_id}'))
+    return keys
+
+def professional_cache_keys(professional_id = None, service_id = None):
+    keys = {PROFESSIONAL_LIST_CACHE_KEY.format('all')}
+    if professional_id:
+        keys.add(PROFESSIONAL_DETAIL_CACHE_KEY.format(professional_id))
     if service_id:
-        cache.delete(SERVICE_DETAIL_CACHE_KEY.format(service_id))
-        cache.delete(PROFESSIONAL_LIST_CACHE_KEY.format(f'service_{service_id}'))
+        keys.add(PROFESSIONAL_LIST_CACHE_KEY.format(f'service_{service_id}'))
+    return keys
+
+def dashboard_cache_keys(user_role, user_id = None):
+    if user_id:
+        return {DASHBOARD_STATS_CACHE_KEY.format(f'{user_role}_{user_id}')}
+    return {DASHBOARD_STATS_CACHE_KEY.format(user_role)}
 
-    cache.delete(SERVICE_CACHE_KEY)
+def clear_service_cache(service_id = None):
+    from cache.tiered_cache import invalidate
+    invalidate(service_cache_keys(service_id))
 
 def clear_professional_cache(professional_id=None, service_id=None):
     """Clear professional-related caches"""
-    if professional_id:
-        cache.delete(f'professional_{professional_id}')
-    
-    if service_id:
-        cache.delete(PROFESSIONAL_LIST_CACHE_KEY.format(f'service_{service_id}'))
-    
-    cache.delete(PROFESSIONAL_LIST_CACHE_KEY.format('all'))
+    from cache.tiered_cache import invalidate
+    invalidate(professional_cache_keys(professional_id, service_id))
 
 def clear_dashboard_cache(user_role, user_id=None):
     """Clear dashboard stats cache"""
-    if user_id:
-        cache.delete(DASHBOARD_STATS_CACHE_KEY.format(f'{user_role}_{user_id}'))
-    else:
-        cache.delete(DASHBOARD_STATS_CACHE_KEY.format(user_role))
+    from cache.tiered_cache import invalidate
+    invalidate(dashboard_cache_keys(user_role, user_id))
@@ -0,0 +1,80 @@
+from flask import current_app, request
+from models.models import Service
+from cache.cache_config import SERVICE_CATALOG_CACHE_KEY, LONG_CACHE_TIMEOUT
+from cache.tiered_cache import cached_value
+import hashlib
+
+
+def _service_fields(service):
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'base_price': service.base_price,
+        'time_required': service.time_required
+    }
+
+
+def _public_fields(service):
+    fields = _service_fields(service)
+    fields['base_price'] = float(service.base_price)
+    fields['is_active'] = service.is_active
+    return fields
+
+
+def _admin_fields(service):
+    fields = _service_fields(service)
+    fields['created_at'] = service.created_at
+    return fields
+
+
+# The shapes the service list is served in, keyed by view name
+CATALOG_VIEWS = {
+    'basic': _service_fields,      # /api/auth/services, /api/customer/services
+    'public': _public_fields,      # /api/customer/services-public
+    'admin': _admin_fields,        # /api/admin/services
+}
+
+
+def build_catalog():
+    """
+    Serialize every catalog view once. Bodies go through the app's JSON
+    provider, so they are byte-for-byte what jsonify() returned. The
+    version is a digest of the serialized views, so it only changes when
+    the catalog does.
+    """
+    services = Service.query.order_by(Service.id).all()
+    bodies = {
+        view: current_app.json.response([fields(service) for service in services]).get_data(as_text=True)
+        for view, fields in CATALOG_VIEWS.items()
+    }
+
+    digest = hashlib.sha256()
+    for view in sorted(bodies):
+        digest.update(bodies[view].encode())
+    version = digest.hexdigest()[:16]
+
+    return {
+        'version': version,
+        'views': {
+            view: {'body': body, 'etag': f'{version}-{view}'}
+            for view, body in bodies.items()
+        }
+    }
+
+
+def get_catalog():
+    """The current catalog, rebuilt only after a service change invalidates it"""
+    return cached_value(SERVICE_CATALOG_CACHE_KEY, build_catalog, timeout=LONG_CACHE_TIMEOUT)
+
+
+def catalog_response(view):
+    """
+    Serve a pre-serialized catalog view with a strong ETag. A request whose
+    If-None-Match carries the current ETag gets an empty 304.
+    """
+    entry = get_catalog()['views'][view]
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
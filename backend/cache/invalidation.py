@@ -0,0 +1,121 @@
+from sqlalchemy import event, inspect
+from models.models import db, Service, Professional, Customer, ServiceRequest, Review
+from cache.cache_config import service_cache_keys, professional_cache_keys, dashboard_cache_keys
+from cache.tiered_cache import invalidate
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Session.info key holding the cache keys made stale by the current transaction
+PENDING_KEYS = 'stale_cache_keys'
+
+
+def _values(obj, attr):
+    """Current and previous value of an attribute, so moves purge both sides"""
+    history = inspect(obj).attrs[attr].history
+    values = set(history.added) | set(history.unchanged) | set(history.deleted)
+    values.add(getattr(obj, attr, None))
+    return {value for value in values if value is not None}
+
+
+def _service_keys(obj):
+    return service_cache_keys(obj.id) | dashboard_cache_keys('admin')
+
+
+def _professional_keys(obj):
+    keys = professional_cache_keys(obj.id) | dashboard_cache_keys('admin')
+    for service_id in _values(obj, 'service_id'):
+        keys |= professional_cache_keys(service_id=service_id)
+    return keys
+
+
+def _customer_keys(obj):
+    return dashboard_cache_keys('admin')
+
+
+def _service_request_keys(obj):
+    keys = set(dashboard_cache_keys('admin'))
+    for professional_id in _values(obj, 'professional_id'):
+        keys |= professional_cache_keys(professional_id)
+    return keys
+
+
+def _review_keys(obj):
+    keys = set(dashboard_cache_keys('admin'))
+    service_request = obj.service_request
+    if service_request is None and obj.service_request_id:
+        service_request = db.session.get(ServiceRequest, obj.service_request_id)
+    if service_request is not None and service_request.professional_id:
+        keys |= professional_cache_keys(service_request.professional_id)
+    return keys
+
+
+# Cached data derived from each model, keyed by model class
+KEY_BUILDERS = {
+    Service: _service_keys,
+    Professional: _professional_keys,
+    Customer: _customer_keys,
+    ServiceRequest: _service_request_keys,
+    Review: _review_keys,
+}
+
+
+def stale_keys(obj):
+    builder = KEY_BUILDERS.get(type(obj))
+    return builder(obj) if builder else set()
+
+
+def collect_stale_keys(session, flush_context):
+    """
+    after_flush: record the cache keys affected by every changed instance.
+    Runs while the instances still carry their attribute history and ids.
+    """
+    pending = session.info.setdefault(PENDING_KEYS, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        pending |= stale_keys(obj)
+
+
+def invalidate_on_commit(keys, session=None):
+    """
+    Queue keys for the next commit. For changes made with bulk UPDATE or
+    DELETE statements, which bypass the flush and its attribute history.
+    """
+    session = session or db.session
+    session.info.setdefault(PENDING_KEYS, set()).update(keys)
+
+
+def purge_stale_keys(session):
+    """
+    after_commit: delete everything recorded by the committed transaction in
+    one batch (a single UNLINK round trip on the Redis backend) and tell the
+    other processes to drop their local copies.
+    """
+    keys = session.info.pop(PENDING_KEYS, None)
+    if not keys:
+        return
+    try:
+        invalidate(keys)
+    except Exception as e:
+        # The data is already committed; a failed purge must not look like a failed write
+        logger.warning(f"Failed to invalidate cache keys {sorted(keys)}: {e}")
+
+
+def discard_stale_keys(session):
+    """after_rollback: nothing was written, so nothing needs purging"""
+    session.info.pop(PENDING_KEYS, None)
+
+
+LISTENERS = (
+    ('after_flush', collect_stale_keys),
+    ('after_commit', purge_stale_keys),
+    ('after_rollback', discard_stale_keys),
+)
+
+
+def init_cache_invalidation(app=None):
+    """Attach the invalidation listeners to db.session (safe to call once per create_app)"""
+    for name, listener in LISTENERS:
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,239 @@
+from collections import OrderedDict
+from cache.cache_config import cache, delete_keys, get_redis_client
+import threading
+import logging
+import random
+import math
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Per-process tier in front of Redis
+LOCAL_CACHE_SIZE = int(os.getenv('LOCAL_CACHE_SIZE', 256))
+LOCAL_CACHE_TIMEOUT = int(os.getenv('LOCAL_CACHE_TIMEOUT', 5))  # seconds
+
+# Probabilistic early expiration: larger values recompute earlier
+EARLY_EXPIRATION_BETA = 1.0
+
+# Only one process recomputes a missing key; the others wait this long for it
+RECOMPUTE_LOCK_TIMEOUT = 30  # seconds
+RECOMPUTE_WAIT_INTERVAL = 0.05  # seconds
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+
+# Returned by LocalCache.get() for a miss in cached_value, where None is a value
+_MISSING = object()
+
+
+class LocalCache:
+    """
+    Thread-safe bounded LRU with a per-entry TTL. `generation` counts the
+    deletions so far: a value read or computed before a deletion can be
+    stored with set(..., generation=...) and is dropped if one happened
+    in between.
+    """
+
+    def __init__(self, max_size=LOCAL_CACHE_SIZE, timeout=LOCAL_CACHE_TIMEOUT):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None, generation=None):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (value, time.monotonic() + (self.timeout if timeout is None else timeout))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+local_cache = LocalCache()
+
+# Serializes recomputation of the same key between threads of one process
+_key_locks = {}
+_key_locks_guard = threading.Lock()
+
+# Pub/sub listener of this process, see _ensure_listener()
+_listener = None
+_listener_pid = None
+
+
+def _key_lock(key):
+    with _key_locks_guard:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def _should_recompute(entry):
+    """
+    XFetch: recompute before expiry with a probability that grows as the
+    expiry approaches and with how long the value took to compute, so one
+    caller refreshes a hot key early instead of every worker at once.
+    """
+    early = entry['delta'] * EARLY_EXPIRATION_BETA * -math.log(1.0 - random.random())
+    return time.time() + early >= entry['expires']
+
+
+def _lock_key(key):
+    return f'lock:{key}'
+
+
+def _compute(key, compute, timeout, generation):
+    """
+    Rebuild and store a value. When an invalidation reached this process
+    since `generation` was read, the value may predate the commit that
+    invalidated it, so it is returned without being stored. Otherwise it
+    is stored even when the compute outlived RECOMPUTE_LOCK_TIMEOUT.
+    """
+    started = time.perf_counter()
+    value = compute()
+    delta = time.perf_counter() - started
+    if local_cache.generation == generation:
+        cache.set(key, {'value': value, 'delta': delta, 'expires': time.time() + timeout}, timeout=timeout)
+    return value
+
+
+def _get_entry(key):
+    """Fetch the Redis entry for `key`, ignoring values cached in another format"""
+    entry = cache.get(key)
+    if isinstance(entry, dict) and 'expires' in entry:
+        return entry
+    return None
+
+
+def _wait_for(key):
+    """Wait for another process to finish recomputing `key`"""
+    deadline = time.monotonic() + RECOMPUTE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(RECOMPUTE_WAIT_INTERVAL)
+        entry = _get_entry(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cached_value(key, compute, timeout):
+    """
+    Return the value cached under `key`, calling `compute()` to rebuild it.
+
+    Reads go to the in-process LRU first and to Redis after that. A missing
+    or early-expiring value is recomputed by one caller at a time: the
+    others keep serving the previous value, or wait for the new one when
+    there is none. Values stay in Redis for `timeout` seconds unless a
+    commit invalidates them, see cache.invalidation. A value read or
+    computed while an invalidation arrived is returned but not kept, where
+    it would outlive the invalidation. None is cached like any other value.
+    """
+    _ensure_listener()
+
+    value = local_cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return value
+
+    generation = local_cache.generation
+    entry = _get_entry(key)
+    if entry is not None and not _should_recompute(entry):
+        local_cache.set(key, entry['value'], generation=generation)
+        return entry['value']
+
+    with _key_lock(key):
+        # Another thread may have refreshed the key while we waited
+        value = local_cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock_key = _lock_key(key)
+        if cache.add(lock_key, os.getpid(), timeout=RECOMPUTE_LOCK_TIMEOUT):
+            try:
+                value = _compute(key, compute, timeout, generation)
+            finally:
+                cache.delete(lock_key)
+        else:
+            if entry is None:
+                entry = _wait_for(key)
+            value = entry['value'] if entry is not None else _compute(key, compute, timeout, generation)
+
+    local_cache.set(key, value, generation=generation)
+    return value
+
+
+def invalidate(keys):
+    """
+    Purge keys from Redis and from the local tier of every process. Their
+    recompute locks go too, so the next reader recomputes right away rather
+    than waiting for an in-flight recompute, whose value will not be stored
+    since the deletion moves every local tier to a new generation.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    local_cache.delete_many(keys)
+    delete_keys(keys + [_lock_key(key) for key in keys])
+
+    client = get_redis_client()
+    if client is not None:
+        client.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
+
+def _handle_invalidation(message):
+    try:
+        local_cache.delete_many(json.loads(message['data']))
+    except (ValueError, TypeError) as e:
+        logger.warning(f"Ignoring malformed cache invalidation message: {e}")
+
+
+def _ensure_listener():
+    """
+    Subscribe this process to invalidation broadcasts. Started lazily and
+    re-started after a fork, since the subscriber thread is not inherited by
+    gunicorn or Celery children.
+    """
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+
+    with _key_locks_guard:
+        if _listener_pid == os.getpid():
+            return
+        _listener_pid = os.getpid()
+        local_cache.clear()
+
+        client = get_redis_client()
+        if client is None:
+            _listener = None
+            return
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: _handle_invalidation})
+            _listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception as e:
+            # Without the listener, local entries still expire after LOCAL_CACHE_TIMEOUT
+            logger.warning(f"Cache invalidation listener unavailable: {e}")
+            _listener = None
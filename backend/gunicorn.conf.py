@@ -0,0 +1,12 @@
+# gunicorn -c gunicorn.conf.py 'app:create_app()'
+#
+# /api/professional/available-requests/stream keeps a connection open for up
+# to STREAM_MAX_LIFETIME seconds. A sync worker would be tied up by each
+# stream, so the default is a gevent worker serving many connections at once.
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
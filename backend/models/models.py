@@ -1,11 +1,31 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import func, case, select, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime, timedelta
 import json
 
 db = SQLAlchemy()
 
+# Dialects whose INSERT supports ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def upsert_statement(dialect_name, model, values, index_elements, set_):
+    """
+    INSERT ... ON CONFLICT DO UPDATE for the counter rollups: atomic, where
+    an update-then-insert lets two concurrent first writes both insert.
+    None on dialects without it, which fall back to update-then-insert.
+    """
+    build = UPSERT_INSERTS.get(dialect_name)
+    if build is None:
+        return None
+    return build(model).values(**values).on_conflict_do_update(index_elements=index_elements, set_=set_)
+
 class User(db.Model, UserMixin):
     __tablename__ = 'users'
 
@@ -56,11 +76,11 @@ class Professional(db.Model):
     __tablename__ = 'professionals'
 
     id = db.Column(db.Integer, primary_key = True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable = False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable = False, index = True)
     service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable = False)
     experience = db.Column(db.Integer)
     description = db.Column(db.Text)
-    verification_status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
+    verification_status = db.Column(db.String(20), default='pending', index = True)  # pending, approved, rejected
     documents = db.Column(db.String(200))
     address = db.Column(db.Text)
     pin_code = db.Column(db.String(10))
@@ -73,7 +93,7 @@ class Customer(db.Model):
     __tablename__ = 'customers'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     address = db.Column(db.Text)
     pin_code = db.Column(db.String(10))
     
@@ -83,41 +103,346 @@ class Customer(db.Model):
 
 class ServiceRequest(db.Model):
     __tablename__ = 'service_requests'
+    __table_args__ = (
+        # Customer and professional request lists and dashboards
+        db.Index('ix_service_requests_customer_status', 'customer_id', 'service_status'),
+        db.Index('ix_service_requests_professional_status', 'professional_id', 'service_status'),
+        # Open request pool: service_id + status='requested' + professional_id IS NULL
+        db.Index('ix_service_requests_service_status_professional', 'service_id', 'service_status', 'professional_id'),
+        # Date range filters and (date_of_request, id) keyset pagination
+        db.Index('ix_service_requests_date_of_request', 'date_of_request', 'id'),
+    )
     
+    # active_history: the flush listeners (utils.monthly_metrics, utils.request_feed)
+    # diff old and new values, so they are loaded even when set on an expired instance
     id = db.Column(db.Integer, primary_key=True)
-    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False)
+    service_id = db.column_property(db.Column(db.Integer, db.ForeignKey('services.id'), nullable=False), active_history=True)
     customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
-    professional_id = db.Column(db.Integer, db.ForeignKey('professionals.id'), nullable=True)
-    date_of_request = db.Column(db.DateTime, default=datetime.utcnow)
+    professional_id = db.column_property(db.Column(db.Integer, db.ForeignKey('professionals.id'), nullable=True), active_history=True)
+    date_of_request = db.column_property(db.Column(db.DateTime, default=datetime.utcnow), active_history=True)
     date_of_completion = db.Column(db.DateTime, nullable=True)
-    service_status = db.Column(db.String(20), default='requested')  # requested, assigned, accepted, rejected, completed, closed
+    service_status = db.column_property(db.Column(db.String(20), default='requested'), active_history=True)  # requested, assigned, accepted, rejected, completed, closed
     remarks = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     review = db.relationship('Review', backref='service_request', uselist=False, cascade='all, delete-orphan')
 
+    @classmethod
+    def claim(cls, request_id, professional_id):
+        """
+        Move an open request to a professional with one conditional UPDATE
+        (compare-and-set on status and professional_id), so of several
+        concurrent claims exactly one succeeds. Returns True for the winner.
+        """
+        claimed = cls.query.filter(
+            cls.id == request_id,
+            cls.service_status == 'requested',
+            cls.professional_id == None
+        ).update({cls.professional_id: professional_id, cls.service_status: 'accepted'})
+        return claimed == 1
+
 
 class Review(db.Model):
     __tablename__ = 'reviews'
     
     id = db.Column(db.Integer, primary_key=True)
-    service_request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id'), nullable=False)
-    rating = db.Column(db.Integer, nullable=False)  # 1-5 stars
+    service_request_id = db.Column(db.Integer, db.ForeignKey('service_requests.id'), nullable=False, index=True)
+    rating = db.column_property(db.Column(db.Integer, nullable=False), active_history=True)  # 1-5 stars
     comments = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class ProfessionalStats(db.Model):
+    """
+    Rollup of per-professional rating and completion figures.
+
+    Maintained incrementally by the routes that add reviews or change a
+    request's status, and rebuilt from scratch by
+    tasks.maintenance_tasks.rebuild_professional_stats.
+    """
+    __tablename__ = 'professional_stats'
+
+    professional_id = db.Column(db.Integer, db.ForeignKey('professionals.id'), primary_key=True)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)  # requests currently in 'completed'
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    professional = db.relationship('Professional', backref=db.backref('stats', uselist=False, cascade='all, delete-orphan'))
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else None
+
+    @classmethod
+    def increment(cls, professional_id, **deltas):
+        """Atomically add deltas to a professional's counters, creating the row if needed"""
+        if not professional_id:
+            return
+
+        now = datetime.utcnow()
+        row = dict(professional_id=professional_id, review_count=0, rating_sum=0, completed_count=0, updated_at=now)
+        row.update(deltas)
+        statement = upsert_statement(
+            db.engine.dialect.name, cls, row, ['professional_id'],
+            dict({name: getattr(cls.__table__.c, name) + delta for name, delta in deltas.items()}, updated_at=now)
+        )
+        if statement is not None:
+            db.session.execute(statement)
+            return
+
+        # Other dialects: update, then insert when the row does not exist yet
+        updated = cls.query.filter_by(professional_id=professional_id).update(
+            {getattr(cls, name): getattr(cls, name) + delta for name, delta in deltas.items()},
+            synchronize_session=False
+        )
+        if not updated:
+            row = cls(professional_id=professional_id, review_count=0, rating_sum=0, completed_count=0)
+            for name, delta in deltas.items():
+                setattr(row, name, delta)
+            db.session.add(row)
+            db.session.flush()
+
+    @classmethod
+    def record_review(cls, service_request, rating):
+        cls.increment(service_request.professional_id, review_count=1, rating_sum=rating)
+
+    @classmethod
+    def record_status_change(cls, service_request, old_professional_id, old_status):
+        """
+        Update the rollup after a request's status or professional has changed.
+        completed_count follows requests moving into or out of 'completed', and
+        an existing review follows the request when it is reassigned.
+        """
+        new_professional_id = service_request.professional_id
+        new_status = service_request.service_status
+        reassigned = new_professional_id != old_professional_id
+
+        if old_status == 'completed' and (new_status != 'completed' or reassigned):
+            cls.increment(old_professional_id, completed_count=-1)
+        if new_status == 'completed' and (old_status != 'completed' or reassigned):
+            cls.increment(new_professional_id, completed_count=1)
+
+        if reassigned and service_request.review:
+            rating = service_request.review.rating
+            cls.increment(old_professional_id, review_count=-1, rating_sum=-rating)
+            cls.increment(new_professional_id, review_count=1, rating_sum=rating)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every professional's rollup row from service_requests and
+        reviews. On PostgreSQL the table is locked first, so an increment
+        either commits before the recompute reads (and is counted by it) or
+        waits until the rebuild has committed; otherwise one committed in
+        between would be deleted with the old rows. SQLite already runs the
+        DELETE and INSERT ... SELECT under its single write lock.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('LOCK TABLE professional_stats IN EXCLUSIVE MODE'))
+        aggregates = select(
+            Professional.id,
+            func.count(Review.id),
+            func.coalesce(func.sum(Review.rating), 0),
+            func.coalesce(func.sum(case((ServiceRequest.service_status == 'completed', 1), else_=0)), 0),
+            func.now()
+        ).outerjoin(
+            ServiceRequest, ServiceRequest.professional_id == Professional.id
+        ).outerjoin(
+            Review, Review.service_request_id == ServiceRequest.id
+        ).group_by(Professional.id)
+
+        cls.query.delete(synchronize_session=False)
+        db.session.execute(insert(cls).from_select(
+            ['professional_id', 'review_count', 'rating_sum', 'completed_count', 'updated_at'],
+            aggregates
+        ))
+        db.session.commit()
+
+
+class MonthlyReportDelivery(db.Model):
+    """
+    Tracks monthly report emails per customer and period ('YYYY-MM') so a
+    re-run of the monthly report job resumes where it stopped instead of
+    emailing customers twice.
+    """
+    __tablename__ = 'monthly_report_deliveries'
+    __table_args__ = (
+        db.UniqueConstraint('customer_id', 'period', name='uq_monthly_report_deliveries_customer_period'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id'), nullable=False)
+    period = db.Column(db.String(7), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, sent, skipped, failed
+    dispatched_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, default=0)  # runs that dispatched it
+    last_error = db.Column(db.Text, nullable=True)
+
+
+class MonthlyMetrics(db.Model):
+    """
+    Per-month, per-service rollup of service requests, keyed by the month a
+    request was made. Backs /api/admin/reports/monthly.
+
+    Kept current incrementally by utils.monthly_metrics as requests and
+    reviews change, and recomputed from source by
+    tasks.maintenance_tasks.finalize_monthly_metrics once a month has closed.
+    Revenue is the current base price of the service for every completed
+    request; a price change rescales the service's rows.
+    """
+    __tablename__ = 'monthly_metrics'
+
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id'), primary_key=True)
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    is_final = db.Column(db.Boolean, nullable=False, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    COUNTERS = ('request_count', 'completed_count', 'rating_sum', 'rating_count', 'revenue')
+
+    @staticmethod
+    def month_start(year, month):
+        return datetime(year, month, 1)
+
+    @staticmethod
+    def next_month(year, month):
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @classmethod
+    def in_months(cls, first, last):
+        """Filter for the rows from month `first` to `last`, both (year, month) and inclusive"""
+        return db.and_(
+            db.or_(cls.year > first[0], db.and_(cls.year == first[0], cls.month >= first[1])),
+            db.or_(cls.year < last[0], db.and_(cls.year == last[0], cls.month <= last[1]))
+        )
+
+    @classmethod
+    def recompute(cls, first, last, final=False):
+        """
+        Replace the rows from month `first` to `last` (inclusive) with
+        aggregates of service_requests and reviews, in one grouped query.
+        """
+        start = cls.month_start(*first)
+        end = cls.month_start(*cls.next_month(*last))
+        year = func.extract('year', ServiceRequest.date_of_request)
+        month = func.extract('month', ServiceRequest.date_of_request)
+        completed = ServiceRequest.service_status == 'completed'
+
+        aggregates = select(
+            year,
+            month,
+            ServiceRequest.service_id,
+            func.count(ServiceRequest.id),
+            func.coalesce(func.sum(case((completed, 1), else_=0)), 0),
+            func.coalesce(func.sum(Review.rating), 0),
+            func.count(Review.rating),
+            func.coalesce(func.sum(case((completed, Service.base_price), else_=0)), 0),
+            db.literal(final),
+            func.now()
+        ).join(
+            Service, Service.id == ServiceRequest.service_id
+        ).outerjoin(
+            Review, Review.service_request_id == ServiceRequest.id
+        ).where(
+            ServiceRequest.date_of_request >= start,
+            ServiceRequest.date_of_request < end
+        ).group_by(year, month, ServiceRequest.service_id)
+
+        cls.query.filter(cls.in_months(first, last)).delete(synchronize_session=False)
+        db.session.execute(insert(cls).from_select(
+            ['year', 'month', 'service_id', *cls.COUNTERS, 'is_final', 'updated_at'],
+            aggregates
+        ))
+
+    @classmethod
+    def open_month(cls, year, month):
+        """Create empty rows for a month so its increments are plain UPDATEs"""
+        existing = {row.service_id for row in db.session.query(cls.service_id).filter_by(year=year, month=month)}
+        for service_id, in db.session.query(Service.id):
+            if service_id not in existing:
+                db.session.add(cls(year=year, month=month, service_id=service_id,
+                                   **{name: 0 for name in cls.COUNTERS}))
+
+    @classmethod
+    def finalize_closed_months(cls):
+        """
+        Recompute and mark final every closed month since the first service
+        request that has no final rows yet, or that has rows changed since
+        it was finalized, then open the current month. Months are recomputed
+        in contiguous ranges. Returns the number of months recomputed.
+        """
+        today = datetime.utcnow()
+        current = (today.year, today.month)
+        first_request = db.session.query(func.min(ServiceRequest.date_of_request)).scalar()
+
+        months = []
+        if first_request:
+            final = set()
+            pending = set()
+            for row in db.session.query(cls.year, cls.month, cls.is_final).distinct():
+                (final if row.is_final else pending).add((row.year, row.month))
+
+            month = (first_request.year, first_request.month)
+            while month < current:
+                if month not in final or month in pending:
+                    months.append(month)
+                month = cls.next_month(*month)
+
+        ranges = []
+        for month in months:
+            if ranges and cls.next_month(*ranges[-1][1]) == month:
+                ranges[-1][1] = month
+            else:
+                ranges.append([month, month])
+        for first, last in ranges:
+            cls.recompute(first, last, final=True)
+
+        cls.open_month(*current)
+        db.session.commit()
+        return len(months)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every month that has service requests; closed months are final"""
+        first_request, last_request = db.session.query(
+            func.min(ServiceRequest.date_of_request), func.max(ServiceRequest.date_of_request)
+        ).one()
+        cls.query.delete(synchronize_session=False)
+        if first_request:
+            today = datetime.utcnow()
+            current = (today.year, today.month)
+            first = (first_request.year, first_request.month)
+            last = max((last_request.year, last_request.month), current)
+            if first < current:
+                previous = (current[0] - 1, 12) if current[1] == 1 else (current[0], current[1] - 1)
+                cls.recompute(first, previous, final=True)
+            cls.recompute(max(first, current), last)
+        cls.open_month(*current)
+        db.session.commit()
+
+
 class ExportJob(db.Model):
     __tablename__ = 'export_jobs'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     job_type = db.Column(db.String(50), nullable=False)  # 'service_requests', 'professionals', etc.
-    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
+    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed, expired
     file_path = db.Column(db.String(255), nullable=True)
     file_name = db.Column(db.String(255), nullable=True)
+    file_format = db.Column(db.String(20), default='csv')  # csv, parquet, arrow
     filter_params = db.Column(db.Text, nullable=True)  # JSON string of filter parameters
     error_message = db.Column(db.Text, nullable=True)
+    total_rows = db.Column(db.Integer, nullable=True)
+    processed_rows = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
     
@@ -130,8 +455,55 @@ class ExportJob(db.Model):
             'id': self.id,
             'job_type': self.job_type,
             'status': self.status,
+            'format': self.file_format or 'csv',
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows or 0,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None,
             'filter_params': json.loads(self.filter_params) if self.filter_params else {},
-            'file_url': f'/api/admin/reports/download/{self.file_name}' if self.file_name else None
-        }
\ No newline at end of file
+            'file_url': f'/api/admin/reports/download/{self.file_name}' if self.file_name and self.status != 'expired' else None
+        }
+
+class ReportJob(db.Model):
+    """
+    An admin report over a date range, computed once by
+    tasks.report_tasks.generate_admin_report. The HTML and PDF artifacts are
+    stored under reports/ named by a hash of their content, and every later
+    view or download is served from those files.
+    """
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index('ix_report_jobs_type_range', 'report_type', 'start_date', 'end_date'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    report_type = db.Column(db.String(50), nullable=False)  # service_performance, customer_activity, professional_performance
+    start_date = db.Column(db.DateTime, nullable=False)
+    end_date = db.Column(db.DateTime, nullable=False)  # exclusive
+    status = db.Column(db.String(20), default='pending')  # pending, processing, completed, failed
+    html_path = db.Column(db.String(255), nullable=True)
+    html_hash = db.Column(db.String(64), nullable=True)
+    pdf_path = db.Column(db.String(255), nullable=True)
+    pdf_hash = db.Column(db.String(64), nullable=True)
+    error_message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('report_jobs', lazy=True))
+
+    def to_dict(self):
+        """Convert job to a dictionary for API responses"""
+        return {
+            'id': self.id,
+            'report_type': self.report_type,
+            'status': self.status,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'error_message': self.error_message,
+            'view_url': f'/api/admin/reports/view/{self.id}',
+            'download_url': f'/api/admin/reports/download/{self.id}.pdf' if self.pdf_path or self.status != 'completed' else None
+        }
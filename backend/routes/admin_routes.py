@@ -1,45 +1,58 @@
 from flask import Blueprint, request, jsonify, send_file, current_app, make_response
 from flask_login import current_user
-from models.models import db, User, Service, Professional, Customer, ServiceRequest, Review, ExportJob
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from models.models import db, User, Service, Professional, Customer, ServiceRequest, Review, ExportJob, ProfessionalStats, ReportJob, MonthlyMetrics
+from sqlalchemy import func, desc, and_, or_
+from sqlalchemy.orm import joinedload, contains_eager
+from datetime import datetime, timedelta, timezone
 import os
 import csv
 import io
 import json
 from utils.auth import admin_required, get_current_user
-from tasks.export_tasks import export_service_requests_csv
-from cache.cache_config import cache, DASHBOARD_STATS_CACHE_KEY
+from utils.tokens import revoke_user_tokens, invalidate_user_claims
+from tasks.export_tasks import export_service_requests_csv, EXPORT_FORMATS, open_export
+from tasks.report_tasks import generate_admin_report, month_range
+from cache.cache_config import DASHBOARD_STATS_CACHE_KEY, LONG_CACHE_TIMEOUT
+from cache.tiered_cache import cached_value
+from cache.catalog import catalog_response
+from utils.service_requests import service_request_query, serialize_admin_request, filter_service_requests
+from utils.pagination import paginated_list, get_bool_arg
+from utils.stats import admin_stats, REQUEST_STATUSES
+from utils.monthly_metrics import report_months, monthly_totals, MAX_REPORT_MONTHS
+from utils.reports import REPORT_TYPES
 
 admin_bp = Blueprint('admin', __name__)
 
+# Reports over a range that had not ended when they were generated are
+# regenerated after this long; reports over a closed range never are
+REPORT_MAX_AGE = timedelta(hours=1)
+# Report jobs still pending after this long are treated as lost
+REPORT_JOB_TIMEOUT = timedelta(minutes=30)
+# Bytes read per chunk when streaming a gzipped export decompressed
+EXPORT_STREAM_CHUNK_SIZE = 64 * 1024
+
 # Dashboard Route
 @admin_bp.route('/dashboard', methods=['GET'])
 @admin_required
 def get_dashboard_data():
-    user = get_current_user()
-    cache_key = DASHBOARD_STATS_CACHE_KEY.format(f'admin_{user.id}')
-    
-    # Try to get from cache first
-    cached_stats = cache.get(cache_key)
-    if cached_stats:
-        return jsonify(cached_stats), 200
-    
+    # Shared by every admin and purged on commit by cache.invalidation
+    dashboard_data = cached_value(
+        DASHBOARD_STATS_CACHE_KEY.format('admin'),
+        _admin_dashboard_data,
+        timeout=LONG_CACHE_TIMEOUT
+    )
+    return jsonify(dashboard_data), 200
+
+def _admin_dashboard_data():
     # Count statistics
-    services_count = Service.query.count()
-    professionals_count = Professional.query.count()
-    customers_count = Customer.query.count()
-    requests_count = ServiceRequest.query.count()
+    stats = admin_stats()
     
     # Request status counts
-    status_counts = {}
-    status_results = db.session.query(
-        ServiceRequest.service_status, 
-        func.count(ServiceRequest.id)
-    ).group_by(ServiceRequest.service_status).all()
-    
-    for status, count in status_results:
-        status_counts[status] = count
+    status_counts = {
+        status: stats[status]
+        for status in REQUEST_STATUSES
+        if stats[status]
+    }
     
     # Popular services
     popular_services = db.session.query(
@@ -83,39 +96,23 @@ def get_dashboard_data():
     
     # Prepare response
     dashboard_data = {
-        'services_count': services_count,
-        'professionals_count': professionals_count,
-        'customers_count': customers_count,
-        'requests_count': requests_count,
+        'services_count': stats['services'],
+        'professionals_count': stats['professionals'],
+        'customers_count': stats['customers'],
+        'requests_count': stats['total'],
         'request_status_counts': status_counts,
         'popular_services': popular_services_list,
         'recent_requests': recent_requests_list
     }
     
-    # Cache the dashboard data for 5 minutes
-    cache.set(cache_key, dashboard_data, timeout=300)
-    
-    return jsonify(dashboard_data), 200
+    return dashboard_data
 
 
 # Service Management Routes
 @admin_bp.route('/services', methods=['GET'])
 @admin_required
 def get_services():
-    services = Service.query.all()
-    result = []
-    
-    for service in services:
-        result.append({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'base_price': service.base_price,
-            'time_required': service.time_required,
-            'created_at': service.created_at
-        })
-    
-    return jsonify(result), 200
+    return catalog_response('admin')
 
 
 @admin_bp.route('/services', methods=['POST'])
@@ -188,6 +185,8 @@ def delete_service(service_id):
     if service.professionals or service.service_requests:
         return jsonify({'message': 'Cannot delete service: it is being used by professionals or service requests'}), 400
     
+    # Without requests its monthly_metrics rows are only the zero rows open_month() created
+    MonthlyMetrics.query.filter_by(service_id=service.id).delete(synchronize_session=False)
     db.session.delete(service)
     db.session.commit()
     
@@ -198,26 +197,37 @@ def delete_service(service_id):
 @admin_bp.route('/professionals', methods=['GET'])
 @admin_required
 def get_professionals():
-    professionals = Professional.query.all()
-    result = []
-    
-    for professional in professionals:
-        result.append({
-            'id': professional.id,
-            'user_id': professional.user_id,
-            'username': professional.user.username,
-            'email': professional.user.email,
-            'service_id': professional.service_id,
-            'service_name': professional.service.name,
-            'experience': professional.experience,
-            'verification_status': professional.verification_status,
-            'documents': professional.documents,
-            'address': professional.address,
-            'pin_code': professional.pin_code,
-            'created_at': professional.user.created_at.isoformat() if professional.user.created_at else None
-        })
+    query = Professional.query.options(
+        joinedload(Professional.user),
+        joinedload(Professional.service)
+    )
     
-    return jsonify(result), 200
+    verification_status = request.args.get('verification_status')
+    if verification_status:
+        query = query.filter(Professional.verification_status == verification_status)
+    
+    service_id = request.args.get('service_id', type=int)
+    if service_id:
+        query = query.filter(Professional.service_id == service_id)
+    
+    return paginated_list(query, [Professional.id], _serialize_professional)
+
+
+def _serialize_professional(professional):
+    return {
+        'id': professional.id,
+        'user_id': professional.user_id,
+        'username': professional.user.username,
+        'email': professional.user.email,
+        'service_id': professional.service_id,
+        'service_name': professional.service.name,
+        'experience': professional.experience,
+        'verification_status': professional.verification_status,
+        'documents': professional.documents,
+        'address': professional.address,
+        'pin_code': professional.pin_code,
+        'created_at': professional.user.created_at.isoformat() if professional.user.created_at else None
+    }
 
 
 @admin_bp.route('/professionals/<int:professional_id>/verify', methods=['PUT'])
@@ -236,6 +246,9 @@ def verify_professional(professional_id):
     professional.verification_status = status
     db.session.commit()
     
+    # Access tokens carry the verification status
+    invalidate_user_claims(professional.user_id)
+    
     return jsonify({'message': f'Professional {status} successfully'}), 200
 
 
@@ -243,21 +256,28 @@ def verify_professional(professional_id):
 @admin_bp.route('/users', methods=['GET'])
 @admin_required
 def get_users():
-    users = User.query.filter(User.role != 'admin').all()
-    result = []
+    query = User.query.filter(User.role != 'admin')
     
-    for user in users:
-        user_data = {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'role': user.role,
-            'is_active': user.is_active,
-            'created_at': user.created_at
-        }
-        result.append(user_data)
+    role = request.args.get('role')
+    if role:
+        query = query.filter(User.role == role)
     
-    return jsonify(result), 200
+    is_active = get_bool_arg('is_active')
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    
+    return paginated_list(query, [User.id], _serialize_user)
+
+
+def _serialize_user(user):
+    return {
+        'id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'role': user.role,
+        'is_active': user.is_active,
+        'created_at': user.created_at
+    }
 
 
 @admin_bp.route('/users/<int:user_id>/toggle-status', methods=['PUT'])
@@ -272,6 +292,9 @@ def toggle_user_status(user_id):
     user.is_active = not user.is_active
     db.session.commit()
     
+    if not user.is_active:
+        revoke_user_tokens(user.id)
+    
     status = 'activated' if user.is_active else 'deactivated'
     return jsonify({'message': f'User {status} successfully'}), 200
 
@@ -280,37 +303,14 @@ def toggle_user_status(user_id):
 @admin_bp.route('/service-requests', methods=['GET'])
 @admin_required
 def get_service_requests():
-    requests = ServiceRequest.query.all()
-    result = []
+    query = filter_service_requests(service_request_query(), request.args)
     
-    for request in requests:
-        customer = Customer.query.get(request.customer_id)
-        customer_user = User.query.get(customer.user_id) if customer else None
-        
-        professional = None
-        professional_user = None
-        if request.professional_id:
-            professional = Professional.query.get(request.professional_id)
-            if professional:
-                professional_user = User.query.get(professional.user_id)
-        
-        service = Service.query.get(request.service_id)
-        
-        result.append({
-            'id': request.id,
-            'service_id': request.service_id,
-            'service_name': service.name if service else 'Unknown Service',
-            'customer_id': request.customer_id,
-            'customer_name': customer_user.username if customer_user else 'Unknown Customer',
-            'professional_id': request.professional_id,
-            'professional_name': professional_user.username if professional_user else None,
-            'date_of_request': request.date_of_request.isoformat() if request.date_of_request else None,
-            'date_of_completion': request.date_of_completion.isoformat() if request.date_of_completion else None,
-            'service_status': request.service_status,
-            'remarks': request.remarks
-        })
-    
-    return jsonify(result), 200
+    return paginated_list(
+        query,
+        [ServiceRequest.date_of_request, ServiceRequest.id],
+        serialize_admin_request,
+        descending=True
+    )
 
 
 @admin_bp.route('/service-requests/<int:request_id>', methods=['GET'])
@@ -372,8 +372,12 @@ def assign_professional(request_id):
     if not professional:
         return jsonify({'message': 'Professional not found'}), 404
     
-    service_request.professional_id = professional_id
+    old_professional_id = service_request.professional_id
+    old_status = service_request.service_status
+    
+    service_request.professional_id = professional.id
     service_request.service_status = 'assigned'
+    ProfessionalStats.record_status_change(service_request, old_professional_id, old_status)
     db.session.commit()
     
     return jsonify({'message': 'Professional assigned successfully'}), 200
@@ -394,11 +398,13 @@ def update_request_status(request_id):
     if status not in valid_statuses:
         return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
     
+    old_status = service_request.service_status
     service_request.service_status = status
     
     if status == 'completed':
         service_request.date_of_completion = datetime.utcnow()
     
+    ProfessionalStats.record_status_change(service_request, service_request.professional_id, old_status)
     db.session.commit()
     
     return jsonify({'message': 'Request status updated successfully'}), 200
@@ -408,38 +414,22 @@ def update_request_status(request_id):
 @admin_bp.route('/dashboard-summary', methods=['GET'])
 @admin_required
 def dashboard_summary():
-    total_services = Service.query.count()
-    total_professionals = Professional.query.count()
-    total_customers = Customer.query.count()
-    total_service_requests = ServiceRequest.query.count()
-    pending_approvals = Professional.query.filter_by(verification_status='pending').count()
-    
-    # Service request status counts
-    requested = ServiceRequest.query.filter_by(service_status='requested').count()
-    assigned = ServiceRequest.query.filter_by(service_status='assigned').count()
-    accepted = ServiceRequest.query.filter_by(service_status='accepted').count()
-    completed = ServiceRequest.query.filter_by(service_status='completed').count()
-    closed = ServiceRequest.query.filter_by(service_status='closed').count()
-    
-    # Average ratings calculation
-    reviews = Review.query.all()
-    total_ratings = sum(review.rating for review in reviews) if reviews else 0
-    avg_rating = total_ratings / len(reviews) if reviews else 0
+    stats = admin_stats()
     
     summary = {
-        'total_services': total_services,
-        'total_professionals': total_professionals,
-        'total_customers': total_customers,
-        'total_service_requests': total_service_requests,
-        'pending_approvals': pending_approvals,
+        'total_services': stats['services'],
+        'total_professionals': stats['professionals'],
+        'total_customers': stats['customers'],
+        'total_service_requests': stats['total'],
+        'pending_approvals': stats['pending_approvals'],
         'service_request_stats': {
-            'requested': requested,
-            'assigned': assigned,
-            'accepted': accepted,
-            'completed': completed,
-            'closed': closed
+            'requested': stats['requested'],
+            'assigned': stats['assigned'],
+            'accepted': stats['accepted'],
+            'completed': stats['completed'],
+            'closed': stats['closed']
         },
-        'average_rating': avg_rating
+        'average_rating': stats['avg_rating'] or 0
     }
     
     return jsonify(summary), 200
@@ -449,24 +439,33 @@ def dashboard_summary():
 @admin_bp.route('/customers', methods=['GET'])
 @admin_required
 def get_customers():
-    customers = Customer.query.all()
-    result = []
+    query = Customer.query.join(User, Customer.user_id == User.id).options(
+        contains_eager(Customer.user)
+    )
     
-    for customer in customers:
-        user = User.query.get(customer.user_id)
-        if user:
-            result.append({
-                'id': customer.id,
-                'user_id': customer.user_id,
-                'username': user.username,
-                'email': user.email,
-                'address': customer.address,
-                'pin_code': customer.pin_code,
-                'is_active': user.is_active,
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            })
+    pin_code = request.args.get('pin_code')
+    if pin_code:
+        query = query.filter(Customer.pin_code == pin_code)
     
-    return jsonify(result), 200
+    is_active = get_bool_arg('is_active')
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    
+    return paginated_list(query, [Customer.id], _serialize_customer)
+
+
+def _serialize_customer(customer):
+    user = customer.user
+    return {
+        'id': customer.id,
+        'user_id': customer.user_id,
+        'username': user.username,
+        'email': user.email,
+        'address': customer.address,
+        'pin_code': customer.pin_code,
+        'is_active': user.is_active,
+        'created_at': user.created_at.isoformat() if user.created_at else None
+    }
 
 
 @admin_bp.route('/customers/<int:customer_id>/status', methods=['PUT'])
@@ -485,6 +484,9 @@ def update_customer_status(customer_id):
     user.is_active = data['is_active']
     db.session.commit()
     
+    if not user.is_active:
+        revoke_user_tokens(user.id)
+    
     status = 'activated' if user.is_active else 'deactivated'
     return jsonify({'message': f'Customer {status} successfully'}), 200
 
@@ -509,6 +511,11 @@ def create_export_job():
     if not data:
         return jsonify({'message': 'No data provided'}), 400
     
+    # Output format, CSV unless a columnar format is asked for
+    file_format = data.pop('format', None) or 'csv'
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({'message': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    
     user = get_current_user()
     
     # Create a new export job in the database
@@ -516,6 +523,7 @@ def create_export_job():
         user_id=user.id,
         job_type='service_requests',
         status='pending',
+        file_format=file_format,
         filter_params=json.dumps(data)
     )
     
@@ -549,6 +557,9 @@ def download_export(filename):
     # Find the job with this filename
     job = ExportJob.query.filter_by(file_name=filename).first()
     
+    if job and job.status == 'expired':
+        return jsonify({'message': 'Export file has expired, please export again'}), 410
+    
     if not job or not job.file_path or job.status != 'completed':
         # If no job found with this filename, generate a sample file
         return generate_sample_export(filename)
@@ -558,7 +569,62 @@ def download_export(filename):
         return jsonify({'message': 'Export file not found'}), 404
     
     # Return the file
-    return send_file(job.file_path, as_attachment=True, download_name=job.file_name)
+    return _send_export_file(job)
+
+def _send_export_file(job):
+    """
+    Send an export as stored; send_file adds ETag, Last-Modified and
+    Content-Length and answers conditional and Range requests, so an
+    interrupted download resumes where it stopped. With
+    EXPORT_ACCEL_REDIRECT_PREFIX set, nginx sends the file (its internal
+    location should add Content-Encoding for .gz files when the client
+    accepts gzip); with USE_X_SENDFILE, send_file hands it to the server.
+
+    Gzipped files go out with Content-Encoding: gzip to clients that accept
+    it, and otherwise as the .gz file itself. `?decompress=true` is the
+    explicit fallback for clients that can do neither: the file is streamed
+    decompressed, without Content-Length or Range support.
+    """
+    content_type = EXPORT_FORMATS[job.file_format or 'csv']['content_type']
+    download_name = job.file_name
+    encoding = 'gzip' if job.file_path.endswith('.gz') else None
+    
+    if encoding and get_bool_arg('decompress'):
+        def decompressed():
+            with open_export(job.file_path) as export_file:
+                while True:
+                    chunk = export_file.read(EXPORT_STREAM_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    yield chunk
+        
+        response = current_app.response_class(decompressed(), mimetype=content_type)
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        return response
+    
+    content_encoding = None
+    if encoding and request.accept_encodings[encoding]:
+        content_encoding = encoding
+    elif encoding:
+        content_type = 'application/gzip'
+        download_name = f'{download_name}.gz'
+    
+    accel_prefix = current_app.config.get('EXPORT_ACCEL_REDIRECT_PREFIX')
+    if accel_prefix:
+        response = current_app.response_class(mimetype=content_type)
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{os.path.basename(job.file_path)}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    else:
+        response = send_file(job.file_path, mimetype=content_type, as_attachment=True,
+                             download_name=download_name, conditional=True)
+        # Werkzeug only sets this on range responses; advertise it up front
+        response.headers.setdefault('Accept-Ranges', 'bytes')
+    
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    if encoding:
+        response.vary.add('Accept-Encoding')
+    return response
 
 def generate_sample_export(filename):
     """Generate a sample export file for demonstration purposes"""
@@ -601,63 +667,118 @@ def generate_sample_export(filename):
 @admin_bp.route('/reports/monthly', methods=['GET'])
 @admin_required
 def get_monthly_reports():
-    """Get monthly reports for the last 6 months"""
-    # Calculate the last 6 months
-    today = datetime.now()
-    months = []
-    
-    for i in range(6):
-        month = today.month - i
-        year = today.year
-        
-        if month <= 0:
-            month += 12
-            year -= 1
-        
+    """
+    Get monthly reports for the last 6 months (or `months`, up to 120),
+    read from the monthly_metrics rollup
+    """
+    count = max(1, min(request.args.get('months', 6, type=int) or 6, MAX_REPORT_MONTHS))
+    months = report_months(count)
+    totals = monthly_totals(months)
+    
+    result = []
+    for year, month in months:
         start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end_date = datetime(year, month + 1, 1) - timedelta(days=1)
-        
-        # Count requests in this month
-        requests_count = ServiceRequest.query.filter(
-            ServiceRequest.date_of_request >= start_date,
-            ServiceRequest.date_of_request <= end_date
-        ).count()
-        
-        # Count completed requests
-        completed_count = ServiceRequest.query.filter(
-            ServiceRequest.date_of_request >= start_date,
-            ServiceRequest.date_of_request <= end_date,
-            ServiceRequest.service_status == 'completed'
-        ).count()
-        
-        # Calculate average rating
-        avg_rating = db.session.query(func.avg(Review.rating)).join(
-            ServiceRequest, Review.service_request_id == ServiceRequest.id
-        ).filter(
-            ServiceRequest.date_of_request >= start_date,
-            ServiceRequest.date_of_request <= end_date
-        ).scalar() or 0
-        
-        # Calculate revenue (for demo - would be from actual data in a real app)
-        # In this example, we'll calculate it as $50 per completed request
-        revenue = completed_count * 50
+        row = totals.get((year, month))
+        rating_count = row.rating_count if row else 0
         
-        # Add month data to result
-        months.append({
+        result.append({
             'month': start_date.strftime('%B %Y'),
             'created_at': (start_date + timedelta(days=1)).isoformat(),
-            'requests_count': requests_count,
-            'completed_count': completed_count,
-            'revenue': revenue,
-            'avg_rating': float(avg_rating),
+            'requests_count': int(row.request_count) if row else 0,
+            'completed_count': int(row.completed_count) if row else 0,
+            'revenue': float(row.revenue) if row else 0,
+            'avg_rating': float(row.rating_sum) / rating_count if rating_count else 0.0,
             'html_url': f'/api/admin/reports/view/{year}-{month:02d}',
             'pdf_url': f'/api/admin/reports/download/{year}-{month:02d}.pdf'
         })
     
-    return jsonify(months), 200
+    return jsonify(result), 200
+
+def _parse_report_date(value, end=False):
+    """
+    Parse an ISO date or datetime as naive UTC. A plain end date covers the
+    whole day, so it is moved to the next midnight (report ranges are
+    half-open).
+    """
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def _report_job(report_type, start_date, end_date):
+    """
+    Reuse a report of the same type and range that is still being generated,
+    or whose artifacts are still current, otherwise queue a new one
+    """
+    now = datetime.utcnow()
+    job = ReportJob.query.filter(
+        ReportJob.report_type == report_type,
+        ReportJob.start_date == start_date,
+        ReportJob.end_date == end_date,
+        or_(
+            and_(ReportJob.status.in_(('pending', 'processing')), ReportJob.created_at >= now - REPORT_JOB_TIMEOUT),
+            and_(ReportJob.status == 'completed', or_(
+                ReportJob.completed_at >= end_date,
+                ReportJob.completed_at >= now - REPORT_MAX_AGE
+            ))
+        )
+    ).order_by(ReportJob.id.desc()).first()
+    if job:
+        return job
+
+    job = ReportJob(
+        user_id=get_current_user().id,
+        report_type=report_type,
+        start_date=start_date,
+        end_date=end_date,
+        status='pending'
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    generate_admin_report.delay(job.id)
+    return job
+
+def _find_report_job(report_id):
+    """
+    A report by job ID, or the service performance report of a 'YYYY-MM'
+    month as linked from /reports/monthly
+    """
+    if report_id.isdigit():
+        return db.session.get(ReportJob, int(report_id))
+    try:
+        start_date, end_date = month_range(report_id)
+    except ValueError:
+        return None
+    return _report_job('service_performance', start_date, end_date)
+
+def _send_report_artifact(report_id, artifact):
+    """Serve a stored report artifact, or the job status while it is not ready"""
+    job = _find_report_job(report_id)
+    if not job:
+        return jsonify({'message': 'Report not found'}), 404
+    
+    if job.status == 'failed':
+        return jsonify({'message': 'Report generation failed', 'job': job.to_dict()}), 500
+    
+    if job.status == 'completed' and job.html_path and not os.path.exists(job.html_path):
+        # The stored artifacts were removed: generate them again
+        job.status = 'pending'
+        db.session.commit()
+        generate_admin_report.delay(job.id)
+    
+    if job.status != 'completed':
+        return jsonify({'message': 'Report is being generated', 'job': job.to_dict()}), 202
+    
+    if artifact == 'pdf':
+        if not job.pdf_path or not os.path.exists(job.pdf_path):
+            return jsonify({'message': 'PDF is not available for this report'}), 404
+        return send_file(job.pdf_path, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'{job.report_type}_report_{job.id}.pdf', etag=job.pdf_hash)
+    
+    return send_file(job.html_path, mimetype='text/html', etag=job.html_hash)
 
 @admin_bp.route('/reports/generate', methods=['POST'])
 @admin_required
@@ -671,246 +792,54 @@ def generate_report():
     
     try:
         # Parse date strings
-        start_date = datetime.fromisoformat(data['start_date'].replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(data['end_date'].replace('Z', '+00:00'))
-    except (ValueError, TypeError):
+        start_date = _parse_report_date(data['start_date'])
+        end_date = _parse_report_date(data['end_date'], end=True)
+    except (ValueError, TypeError, AttributeError):
         return jsonify({'message': 'Invalid date format. Use ISO format (YYYY-MM-DD)'}), 400
     
     # Validate date range
-    if start_date > end_date:
+    if start_date >= end_date:
         return jsonify({'message': 'Start date must be before end date'}), 400
     
     # Validate report type
     report_type = data['report_type']
-    if report_type not in ['service_performance', 'customer_activity', 'professional_performance']:
+    if report_type not in REPORT_TYPES:
         return jsonify({'message': 'Invalid report type'}), 400
     
-    # Log report generation
-    print(f"Generating {report_type} report from {start_date} to {end_date}")
+    # Computed once in the background; repeat requests for the range share the job
+    job = _report_job(report_type, start_date, end_date)
     
-    # Generate a report ID (would be from database in real app)
-    report_id = f"{int(datetime.now().timestamp())}"
-    
-    # In a real app, this would trigger a background task to generate the report
     return jsonify({
         'message': 'Report generation started successfully',
-        'report_id': report_id,
-        'status': 'processing',
-        'download_url': f'/api/admin/reports/download/{report_id}.pdf',
-        'view_url': f'/api/admin/reports/view/{report_id}'
+        'report_id': str(job.id),
+        'status': job.status,
+        'download_url': f'/api/admin/reports/download/{job.id}.pdf',
+        'view_url': f'/api/admin/reports/view/{job.id}',
+        'job': job.to_dict()
     }), 200
 
+@admin_bp.route('/reports/report-status/<int:report_id>', methods=['GET'])
+@admin_required
+def check_report_status(report_id):
+    """Check the status of a report job"""
+    job = db.session.get(ReportJob, report_id)
+
+    if not job:
+        return jsonify({'message': 'Report not found'}), 404
+
+    return jsonify(job.to_dict()), 200
+
 @admin_bp.route('/reports/view/<report_id>', methods=['GET'])
 @admin_required
 def view_report(report_id):
-    """View a report in HTML format"""
-    # In a real app, this would retrieve a report from storage
-    # For demo purposes, we'll just return a simple HTML response
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Report {report_id}</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; }}
-            h1 {{ color: #4a86e8; }}
-            table {{ border-collapse: collapse; width: 100%; margin-top: 20px; }}
-            th, td {{ padding: 8px; text-align: left; border-bottom: 1px solid #ddd; }}
-            th {{ background-color: #f2f2f2; }}
-        </style>
-    </head>
-    <body>
-        <h1>Service Activity Report</h1>
-        <p>Report ID: {report_id}</p>
-        <p>Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        
-        <h2>Summary</h2>
-        <table>
-            <tr>
-                <th>Metric</th>
-                <th>Value</th>
-            </tr>
-            <tr>
-                <td>Total Service Requests</td>
-                <td>{ServiceRequest.query.count()}</td>
-            </tr>
-            <tr>
-                <td>Completed Requests</td>
-                <td>{ServiceRequest.query.filter_by(service_status='completed').count()}</td>
-            </tr>
-            <tr>
-                <td>Average Rating</td>
-                <td>{db.session.query(func.avg(Review.rating)).scalar() or 0:.1f} / 5.0</td>
-            </tr>
-        </table>
-        
-        <h2>Service Performance</h2>
-        <table>
-            <tr>
-                <th>Service</th>
-                <th>Requests</th>
-                <th>Avg. Rating</th>
-            </tr>
-            <tr>
-                <td>Plumbing</td>
-                <td>42</td>
-                <td>4.2</td>
-            </tr>
-            <tr>
-                <td>Electrical</td>
-                <td>38</td>
-                <td>4.5</td>
-            </tr>
-            <tr>
-                <td>Cleaning</td>
-                <td>26</td>
-                <td>4.0</td>
-            </tr>
-        </table>
-    </body>
-    </html>
-    """
-    
-    response = make_response(html_content)
-    response.headers["Content-Type"] = "text/html"
-    
-    return response
+    """View a report in HTML format, served from its stored artifact"""
+    return _send_report_artifact(report_id, 'html')
 
 @admin_bp.route('/reports/download/<filename>.pdf', methods=['GET'])
 @admin_required
 def download_report_pdf(filename):
-    """Download a report in PDF format"""
-    # In a real app, this would retrieve a PDF from storage or generate one
-    # For demo purposes, we'll create a simple PDF with reportlab
-    
-    try:
-        # We'll use StringIO to receive the PDF data
-        from io import BytesIO
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-        from reportlab.lib.styles import getSampleStyleSheet
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        styles = getSampleStyleSheet()
-        elements = []
-        
-        # Add title
-        title = Paragraph(f"A-Z Household Services Report", styles['Title'])
-        elements.append(title)
-        elements.append(Spacer(1, 20))
-        
-        # Add report info
-        report_info = Paragraph(f"Report ID: {filename}", styles['Normal'])
-        elements.append(report_info)
-        elements.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-        elements.append(Spacer(1, 20))
-        
-        # Add summary data
-        elements.append(Paragraph("Summary", styles['Heading2']))
-        
-        data = [
-            ["Metric", "Value"],
-            ["Total Service Requests", str(ServiceRequest.query.count())],
-            ["Completed Requests", str(ServiceRequest.query.filter_by(service_status='completed').count())],
-            ["Average Rating", f"{db.session.query(func.avg(Review.rating)).scalar() or 0:.1f} / 5.0"]
-        ]
-        
-        # Create table
-        table = Table(data, colWidths=[300, 200])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (1, 0), 'CENTER'),
-            ('FONTNAME', (0, 0), (1, 0), 'Helvetica-Bold'),
-            ('BOTTOMPADDING', (0, 0), (1, 0), 12),
-            ('BACKGROUND', (0, 1), (1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(table)
-        elements.append(Spacer(1, 20))
-        
-        # Add service performance section
-        elements.append(Paragraph("Service Performance", styles['Heading2']))
-        
-        # Get service performance data
-        service_data = db.session.query(
-            Service.name,
-            func.count(ServiceRequest.id).label('request_count'),
-            func.avg(Review.rating).label('avg_rating')
-        ).outerjoin(
-            ServiceRequest, Service.id == ServiceRequest.service_id
-        ).outerjoin(
-            Review, ServiceRequest.id == Review.service_request_id
-        ).group_by(Service.name).order_by(func.count(ServiceRequest.id).desc()).limit(5).all()
-        
-        if service_data:
-            service_table_data = [["Service", "Requests", "Avg. Rating"]]
-            
-            for service in service_data:
-                service_table_data.append([
-                    service.name,
-                    str(service.request_count),
-                    f"{service.avg_rating or 0:.1f}"
-                ])
-                
-            service_table = Table(service_table_data, colWidths=[200, 150, 150])
-            service_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (2, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (2, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (2, 0), 'CENTER'),
-                ('FONTNAME', (0, 0), (2, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (2, 0), 12),
-                ('BACKGROUND', (0, 1), (2, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(service_table)
-        else:
-            elements.append(Paragraph("No service data available", styles['Normal']))
-        
-        # Build the PDF
-        doc.build(elements)
-        
-        # Get the PDF data
-        pdf_data = buffer.getvalue()
-        buffer.close()
-        
-        # Create response
-        response = make_response(pdf_data)
-        response.headers["Content-Disposition"] = f"attachment; filename={filename}.pdf"
-        response.headers["Content-Type"] = "application/pdf"
-        
-        return response
-    
-    except Exception as e:
-        print(f"Error generating PDF: {str(e)}")
-        # Fallback to text version if PDF generation fails
-        report_content = f"""
-        A-Z Household Services Report
-        =============================
-        
-        Report ID: {filename}
-        Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-        
-        Summary:
-        - Total Service Requests: {ServiceRequest.query.count()}
-        - Completed Requests: {ServiceRequest.query.filter_by(service_status='completed').count()}
-        - Average Rating: {db.session.query(func.avg(Review.rating)).scalar() or 0:.1f} / 5.0
-        
-        This is a placeholder for a real PDF report.
-        In a production environment, this would be a properly formatted PDF document.
-        """
-        
-        # Create response with the report content
-        response = make_response(report_content)
-        response.headers["Content-Disposition"] = f"attachment; filename={filename}.pdf"
-        response.headers["Content-Type"] = "application/pdf"
-        
-        return response
+    """Download a report in PDF format, served from its stored artifact"""
+    return _send_report_artifact(filename, 'pdf')
 
 # Public endpoint for professionals data
 @admin_bp.route('/professionals-public', methods=['GET'])
@@ -1,10 +1,11 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.utils import secure_filename
 from models.models import db, User, Professional, Customer, Service
 import os
-import jwt
-from datetime import datetime, timedelta
+from cache.catalog import catalog_response
+from utils.auth import get_current_user, get_bearer_token, verify_jwt_token
+from utils.tokens import issue_tokens, revoke_token, claim_token, RevocationUnavailable
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -36,15 +37,8 @@ def login():
     login_user(user)
     print(f"Login successful for user: {user.username}, role: {user.role}")
     
-    # Generate JWT token
-    token_expiry = datetime.utcnow() + timedelta(days=1)
-    token_payload = {
-        'user_id': user.id,
-        'username': user.username,
-        'role': user.role,
-        'exp': token_expiry
-    }
-    token = jwt.encode(token_payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+    # Generate access and refresh tokens
+    tokens = issue_tokens(user)
     print(f"Generated token for user: {user.username}")
 
     return jsonify({
@@ -55,17 +49,64 @@ def login():
             'email': user.email,
             'role': user.role
         },
-        'token': token
+        **tokens
     }), 200
 
 
+@auth_bp.route('/refresh', methods = ['POST'])
+def refresh():
+    data = request.get_json(silent=True) or {}
+    refresh_token = data.get('refresh_token')
+    if not refresh_token:
+        return jsonify({'message': 'Missing refresh token'}), 400
+
+    payload = verify_jwt_token(refresh_token, expected_type='refresh')
+    if not payload and g.get('auth_unavailable'):
+        return jsonify({'message': 'Authentication is temporarily unavailable'}), 503
+    if not payload:
+        return jsonify({'message': 'Invalid or expired refresh token'}), 401
+
+    user = User.query.get(payload.get('user_id'))
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+
+    if not user.is_active:
+        return jsonify({'message': 'Account is deactivated'}), 403
+
+    # Refresh tokens are single use: the new pair replaces this one, and a
+    # concurrent or replayed use of the same token loses the claim
+    try:
+        claimed = claim_token(payload)
+    except RevocationUnavailable:
+        return jsonify({'message': 'Authentication is temporarily unavailable'}), 503
+    if not claimed:
+        return jsonify({'message': 'Invalid or expired refresh token'}), 401
+
+    return jsonify(issue_tokens(user)), 200
+
+
 @auth_bp.route('/logout', methods = ['POST'])
 def logout():
+    # Revoke the bearer token and, if sent, the refresh token
+    token = get_bearer_token()
+    payload = verify_jwt_token(token) if token else None
+    if payload:
+        revoke_token(payload)
+
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        refresh_payload = verify_jwt_token(data['refresh_token'], expected_type='refresh')
+        if refresh_payload:
+            revoke_token(refresh_payload)
+
     # Check if the user is logged in before attempting to log them out
     if current_user.is_authenticated:
         print(f"Logging out user: {current_user.username}")
         logout_user()
         return jsonify({'message': 'Logged out successfully'}), 200
+    elif payload:
+        print(f"Logging out token user: {payload.get('username')}")
+        return jsonify({'message': 'Logged out successfully'}), 200
     else:
         print("Logout attempt for non-logged in user")
         return jsonify({'message': 'No user logged in'}), 200
@@ -186,24 +227,9 @@ def register_professional():
 
 @auth_bp.route('/user-info', methods=['GET'])
 def get_user_info():
-    # First check if user is authenticated through session
-    if current_user.is_authenticated:
-        user = current_user
-    else:
-        # Check if user is authenticated via JWT token
-        auth_header = request.headers.get('Authorization')
-        if auth_header and auth_header.startswith('Bearer '):
-            token = auth_header.split(' ')[1]
-            try:
-                payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-                user_id = payload.get('user_id')
-                user = User.query.get(user_id)
-                if not user:
-                    return jsonify({'message': 'User not found'}), 404
-            except:
-                return jsonify({'message': 'Invalid token'}), 401
-        else:
-            return jsonify({'message': 'Authentication required'}), 401
+    user = get_current_user()
+    if not user:
+        return jsonify({'message': 'Authentication required'}), 401
     
     user_data = {
         'id': user.id,
@@ -235,19 +261,7 @@ def get_user_info():
 @auth_bp.route('/services', methods=['GET'])
 def get_public_services():
     """Public endpoint to get all services without authentication"""
-    services = Service.query.all()
-    result = []
-    
-    for service in services:
-        result.append({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'base_price': service.base_price,
-            'time_required': service.time_required
-        })
-    
-    return jsonify(result), 200
+    return catalog_response('basic')
 
 
 @auth_bp.route('/change-password', methods=['PUT'])
@@ -1,11 +1,16 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_login import login_required, current_user
-from models.models import db, User, Customer, Service, ServiceRequest, Review, Professional
+from models.models import db, User, Customer, Service, ServiceRequest, Review, Professional, ProfessionalStats
 from datetime import datetime
-from sqlalchemy import or_
 from sqlalchemy.sql import func
-from utils.auth import customer_required, get_current_user
-from cache.cache_config import cache, SERVICE_CACHE_KEY
+from sqlalchemy.orm import joinedload
+from utils.auth import customer_required, get_current_user, current_customer_id
+from cache.catalog import catalog_response
+from utils.service_requests import service_request_query, serialize_customer_request, filter_service_requests
+from utils.pagination import paginated_list, is_paginated_request, get_page_limit
+from utils.search import service_search, professional_search
+from utils.request_matching import reindex_customer_requests
+from utils.stats import customer_stats
 
 customer_bp = Blueprint('customer', __name__)
 
@@ -37,11 +42,15 @@ def update_profile():
     
     if 'address' in data:
         customer.address = data['address']
+    pin_code_changed = 'pin_code' in data and data['pin_code'] != customer.pin_code
     if 'pin_code' in data:
         customer.pin_code = data['pin_code']
     
     db.session.commit()
     
+    if pin_code_changed:
+        reindex_customer_requests(customer.id, customer.pin_code)
+    
     return jsonify({'message': 'Profile updated successfully'}), 200
 
 
@@ -49,88 +58,69 @@ def update_profile():
 @customer_bp.route('/services', methods=['GET'])
 @customer_required
 def get_services():
-    services = Service.query.all()
-    result = []
-    
-    for service in services:
-        result.append({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'base_price': service.base_price,
-            'time_required': service.time_required
-        })
-    
-    return jsonify(result), 200
+    return catalog_response('basic')
+
+
+def _serialize_service(service):
+    return {
+        'id': service.id,
+        'name': service.name,
+        'description': service.description,
+        'base_price': service.base_price,
+        'time_required': service.time_required
+    }
+
+
+def _empty_list():
+    if is_paginated_request():
+        return jsonify({'items': [], 'next_cursor': None, 'limit': get_page_limit()}), 200
+    return jsonify([]), 200
 
 
 @customer_bp.route('/search-services', methods=['GET'])
 @customer_required
 def search_services():
+    """
+    Search services by name and description, best matches first. Every
+    word of `query` is matched as a prefix. Pass `limit`/`cursor` to page.
+    """
     search_query = request.args.get('query', '')
     
     if not search_query:
         return jsonify({'message': 'Search query is required'}), 400
     
-    # Search for services by name or description
-    services = Service.query.filter(
-        or_(
-            Service.name.ilike(f'%{search_query}%'),
-            Service.description.ilike(f'%{search_query}%')
-        )
-    ).all()
+    match = service_search(search_query)
+    if match is None:
+        return _empty_list()
     
-    result = []
-    for service in services:
-        result.append({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'base_price': service.base_price,
-            'time_required': service.time_required
-        })
+    query = db.session.query(Service, match.c.search_rank).join(
+        match, match.c.id == Service.id
+    ).order_by(match.c.search_rank, Service.id)
     
-    return jsonify(result), 200
+    return paginated_list(
+        query,
+        [match.c.search_rank, Service.id],
+        lambda row: _serialize_service(row.Service),
+        row_key=lambda row: (row.search_rank, row.Service.id)
+    )
 
 
 # Service Request Management Routes
 @customer_bp.route('/service-requests', methods=['GET'])
 @customer_required
 def get_service_requests():
-    user = get_current_user()
     # Get all service requests made by this customer
-    service_requests = ServiceRequest.query.filter_by(
-        customer_id=user.customer.id
-    ).all()
-    
-    result = []
-    for req in service_requests:
-        professional_name = None
-        if req.professional:
-            professional_name = req.professional.user.username
-        
-        # Get the service details
-        service = Service.query.get(req.service_id)
-            
-        result.append({
-            'id': req.id,
-            'service_id': req.service_id,
-            'service_name': req.service.name,
-            'service': {
-                'name': service.name,
-                'base_price': float(service.base_price),
-                'time_required': service.time_required
-            },
-            'professional_id': req.professional_id,
-            'professional_name': professional_name,
-            'date_of_request': req.date_of_request,
-            'date_of_completion': req.date_of_completion,
-            'service_status': req.service_status,
-            'remarks': req.remarks,
-            'has_review': req.review is not None
-        })
+    query = service_request_query().filter_by(
+        customer_id=current_customer_id()
+    )
+    query = filter_service_requests(query, request.args)
     
-    return jsonify(result), 200
+    return paginated_list(
+        query,
+        [ServiceRequest.date_of_request, ServiceRequest.id],
+        serialize_customer_request,
+        descending=True
+    )
 
 
 @customer_bp.route('/service-requests', methods=['POST'])
@@ -183,6 +173,7 @@ def update_service_request(request_id):
             return jsonify({'message': 'Can only close completed service requests'}), 400
         
         service_request.service_status = 'closed'
+        ProfessionalStats.record_status_change(service_request, service_request.professional_id, 'completed')
         db.session.commit()
         
         return jsonify({'message': 'Service request closed successfully'}), 200
@@ -253,6 +244,7 @@ def add_review(request_id):
     )
     
     db.session.add(new_review)
+    ProfessionalStats.record_review(service_request, rating)
     db.session.commit()
     
     return jsonify({'message': 'Review added successfully'}), 201
@@ -262,22 +254,15 @@ def add_review(request_id):
 @customer_bp.route('/dashboard-summary', methods=['GET'])
 @customer_required
 def dashboard_summary():
-    user = get_current_user()
-    customer = user.customer
-    
     # Count requests by status
-    total_requests = ServiceRequest.query.filter_by(customer_id=customer.id).count()
-    requested = ServiceRequest.query.filter_by(customer_id=customer.id, service_status='requested').count()
-    accepted = ServiceRequest.query.filter_by(customer_id=customer.id, service_status='accepted').count()
-    completed = ServiceRequest.query.filter_by(customer_id=customer.id, service_status='completed').count()
-    closed = ServiceRequest.query.filter_by(customer_id=customer.id, service_status='closed').count()
+    stats = customer_stats(current_customer_id())
     
     summary = {
-        'total_requests': total_requests,
-        'requested': requested,
-        'accepted': accepted,
-        'completed': completed,
-        'closed': closed
+        'total_requests': stats['total'],
+        'requested': stats['requested'],
+        'accepted': stats['accepted'],
+        'completed': stats['completed'],
+        'closed': stats['closed']
     }
     
     return jsonify(summary), 200
@@ -285,108 +270,88 @@ def dashboard_summary():
 @customer_bp.route('/dashboard/stats', methods=['GET'])
 @customer_required
 def get_dashboard_stats():
-    user = get_current_user()
-    customer = user.customer
-    
-    # Count active requests (requested, assigned, accepted)
-    active_count = ServiceRequest.query.filter_by(customer_id=customer.id).filter(
-        ServiceRequest.service_status.in_(['requested', 'assigned', 'accepted', 'in_progress'])
-    ).count()
-    
-    # Count completed requests
-    completed_count = ServiceRequest.query.filter_by(
-        customer_id=customer.id, 
-        service_status='completed'
-    ).count()
-    
-    # Count available services
-    services_count = Service.query.filter_by(is_active=True).count()
+    counts = customer_stats(current_customer_id())
     
     stats = {
-        'active': active_count,
-        'completed': completed_count,
-        'services': services_count
+        'active': counts['active'],
+        'completed': counts['completed'],
+        'services': counts['active_services']
     }
     
     return jsonify(stats), 200
 
+def _serialize_professional(professional):
+    # Ratings and completion counts come from the professional_stats rollup
+    stats = professional.stats
+    avg_rating = stats.avg_rating if stats else None
+    
+    return {
+        'id': professional.id,
+        'name': professional.user.username,
+        'service_id': professional.service_id,
+        'service_name': professional.service.name,
+        'experience': professional.experience,
+        'description': professional.description,
+        'avg_rating': float(avg_rating) if avg_rating else None,
+        'review_count': stats.review_count if stats else 0,
+        'completed_services': stats.completed_count if stats else 0
+    }
+
+
 @customer_bp.route('/professionals', methods=['GET'])
 @customer_required
 def get_professionals():
+    """
+    Approved professionals, optionally of one service. With `query` they are
+    searched by name, service and description, best matches first.
+    Pass `limit`/`cursor` to page.
+    """
     # Get query parameters
     service_id = request.args.get('service_id', type=int)
     search_query = request.args.get('query', '')
     
     # Start with base query for verified professionals
-    query = Professional.query.filter_by(verification_status='approved')
+    query = Professional.query.filter_by(verification_status='approved').options(
+        joinedload(Professional.user),
+        joinedload(Professional.service),
+        joinedload(Professional.stats)
+    )
     
     # Add service filter if provided
     if service_id:
         query = query.filter_by(service_id=service_id)
     
-    # Add search query filter if provided
-    if search_query:
-        query = query.join(User).filter(
-            User.username.ilike(f'%{search_query}%')
-        )
+    if not search_query:
+        return paginated_list(query.order_by(Professional.id), [Professional.id], _serialize_professional)
     
-    # Execute query
-    professionals = query.all()
+    match = professional_search(search_query)
+    if match is None:
+        return _empty_list()
     
-    # Prepare results
-    result = []
-    for professional in professionals:
-        # Get average rating from reviews
-        avg_rating = db.session.query(func.avg(Review.rating)).join(
-            ServiceRequest, ServiceRequest.id == Review.service_request_id
-        ).filter(
-            ServiceRequest.professional_id == professional.id
-        ).scalar()
-        
-        # Get review count
-        review_count = db.session.query(func.count(Review.id)).join(
-            ServiceRequest, ServiceRequest.id == Review.service_request_id
-        ).filter(
-            ServiceRequest.professional_id == professional.id
-        ).scalar()
-        
-        # Get completed services count
-        completed_count = ServiceRequest.query.filter_by(
-            professional_id=professional.id,
-            service_status='completed'
-        ).count()
-        
-        result.append({
-            'id': professional.id,
-            'name': professional.user.username,
-            'service_id': professional.service_id,
-            'service_name': professional.service.name,
-            'experience': professional.experience,
-            'description': professional.description,
-            'avg_rating': float(avg_rating) if avg_rating else None,
-            'review_count': review_count or 0,
-            'completed_services': completed_count
-        })
+    query = query.add_columns(match.c.search_rank).join(
+        match, match.c.id == Professional.id
+    ).order_by(match.c.search_rank, Professional.id)
     
-    return jsonify(result), 200
+    return paginated_list(
+        query,
+        [match.c.search_rank, Professional.id],
+        lambda row: _serialize_professional(row.Professional),
+        row_key=lambda row: (row.search_rank, row.Professional.id)
+    )
 
 @customer_bp.route('/service-requests/active', methods=['GET'])
 @customer_required
 def get_active_requests():
-    user = get_current_user()
-    customer = user.customer
-    
     # Get active requests (requested, assigned, accepted, in_progress)
-    active_requests = ServiceRequest.query.filter_by(customer_id=customer.id).filter(
+    active_requests = service_request_query().filter_by(customer_id=current_customer_id()).filter(
         ServiceRequest.service_status.in_(['requested', 'assigned', 'accepted', 'in_progress', 'completed'])
     ).order_by(ServiceRequest.date_of_request.desc()).all()
     
     result = []
     for request in active_requests:
-        service = Service.query.get(request.service_id)
-        professional = None
-        if request.professional_id:
-            professional = Professional.query.get(request.professional_id)
+        service = request.service
+        professional = request.professional
+        if professional:
             professional_data = {
                 'id': professional.id,
                 'user': {
@@ -417,26 +382,4 @@ def get_active_requests():
 # Service Browsing Routes (public)
 @customer_bp.route('/services-public', methods=['GET'])
 def get_services_public():
-    # Try to get from cache first
-    cached_services = cache.get(SERVICE_CACHE_KEY)
-    if cached_services:
-        return jsonify(cached_services), 200
-    
-    # If not in cache, get from database
-    services = Service.query.all()
-    result = []
-    
-    for service in services:
-        result.append({
-            'id': service.id,
-            'name': service.name,
-            'description': service.description,
-            'base_price': float(service.base_price),
-            'time_required': service.time_required,
-            'is_active': service.is_active
-        })
-    
-    # Store in cache for 5 minutes
-    cache.set(SERVICE_CACHE_KEY, result, timeout=300)
-    
-    return jsonify(result), 200
\ No newline at end of file
+    return catalog_response('public')
\ No newline at end of file
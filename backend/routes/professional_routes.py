@@ -1,35 +1,30 @@
-from flask import Blueprint, request, jsonify
-from flask_login import login_required, current_user
-from models.models import db, User, Professional, ServiceRequest, Service
+from flask import Blueprint, request, jsonify, Response, current_app
+from models.models import db, User, Professional, ServiceRequest, Service, ProfessionalStats
 from datetime import datetime
-from functools import wraps
+from utils.service_requests import (
+    service_request_query, serialize_professional_request, serialize_available_request,
+    filter_service_requests
+)
+from utils.pagination import paginated_list, is_paginated_request, get_page_limit, InvalidCursor
+from utils.stats import professional_stats
+from cache.invalidation import invalidate_on_commit, stale_keys
+from utils.request_matching import nearest_requests_query, nearest_available_requests
+from utils.request_feed import subscribe_available_requests, available_requests_stream, queue_claimed_request
+from utils.auth import approved_professional_required, get_current_professional, current_professional_id
 
 professional_bp = Blueprint('professional', __name__)
 
-# Custom decorator to check if user is a professional
-def professional_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or not current_user.is_professional():
-            return jsonify({'message': 'Professional access required'}), 403
-        if current_user.professional.verification_status != 'approved':
-            return jsonify({'message': 'Your account is not yet approved'}), 403
-        return f(*args, **kwargs)
-    return decorated_function
-
-
 # Profile Management Routes
 @professional_bp.route('/profile', methods=['GET'])
-@login_required
-@professional_required
+@approved_professional_required
 def get_profile():
-    professional = current_user.professional
+    professional = get_current_professional()
     
     profile_data = {
         'id': professional.id,
         'user_id': professional.user_id,
-        'username': current_user.username,
-        'email': current_user.email,
+        'username': professional.user.username,
+        'email': professional.user.email,
         'service_id': professional.service_id,
         'service_name': professional.service.name,
         'experience': professional.experience,
@@ -41,10 +36,9 @@ def get_profile():
 
 
 @professional_bp.route('/profile', methods=['PUT'])
-@login_required
-@professional_required
+@approved_professional_required
 def update_profile():
-    professional = current_user.professional
+    professional = get_current_professional()
     data = request.get_json()
     
     if 'description' in data:
@@ -59,91 +53,81 @@ def update_profile():
 
 # Service Request Management Routes
 @professional_bp.route('/service-requests', methods=['GET'])
-@login_required
-@professional_required
+@approved_professional_required
 def get_service_requests():
     # Get all service requests assigned to this professional
-    professional = current_user.professional
-    print(f"Looking for requests with professional_id={professional.id}")
-    
-    service_requests = ServiceRequest.query.filter_by(
-        professional_id=professional.id
-    ).all()
-    
-    print(f"Found {len(service_requests)} professional requests")
-    
-    result = []
-    for req in service_requests:
-        # Get the service details
-        service = Service.query.get(req.service_id)
-        
-        result.append({
-            'id': req.id,
-            'service_id': req.service_id,
-            'service_name': req.service.name,
-            'service': {
-                'name': service.name,
-                'base_price': float(service.base_price),
-                'time_required': service.time_required
-            },
-            'customer_id': req.customer_id,
-            'customer_name': req.customer.user.username,
-            'customer_address': req.customer.address if hasattr(req.customer, 'address') else None,
-            'customer_pin_code': req.customer.pin_code if hasattr(req.customer, 'pin_code') else None,
-            'date_of_request': req.date_of_request,
-            'date_of_completion': req.date_of_completion,
-            'service_status': req.service_status,
-            'remarks': req.remarks
-        })
-    
-    return jsonify(result), 200
+    professional_id = current_professional_id()
+    print(f"Looking for requests with professional_id={professional_id}")
+    
+    query = service_request_query().filter_by(
+        professional_id=professional_id
+    )
+    query = filter_service_requests(query, request.args)
+    
+    return paginated_list(
+        query,
+        [ServiceRequest.date_of_request, ServiceRequest.id],
+        serialize_professional_request,
+        descending=True
+    )
 
 
 @professional_bp.route('/available-requests', methods=['GET'])
-@login_required
-@professional_required
+@approved_professional_required
 def get_available_requests():
-    # Get service requests that match the professional's service type and are in 'requested' status
-    professional = current_user.professional
-    
-    # Diagnostic print to debug
-    print(f"Looking for requests with service_id={professional.service_id}, status='requested', professional_id=None")
-    
-    available_requests = ServiceRequest.query.filter_by(
-        service_id=professional.service_id,
-        service_status='requested'
-    ).filter(ServiceRequest.professional_id == None).all()
-    
-    print(f"Found {len(available_requests)} available requests")
-    
-    result = []
-    for req in available_requests:
-        # Get the service details
-        service = Service.query.get(req.service_id)
-        
-        result.append({
-            'id': req.id,
-            'service_id': req.service_id,
-            'service_name': req.service.name,
-            'service': {
-                'name': service.name,
-                'base_price': float(service.base_price),
-                'time_required': service.time_required
-            },
-            'customer_id': req.customer_id,
-            'customer_name': req.customer.user.username,
-            'customer_address': req.customer.address,
-            'customer_pin_code': req.customer.pin_code,
-            'date_of_request': req.date_of_request,
-            'remarks': req.remarks
-        })
-    
-    return jsonify(result), 200
+    """
+    Open requests for the professional's service, nearest pincode first.
+    Pass `limit`/`cursor` to page through them from the matching index.
+    """
+    professional = get_current_professional()
+    
+    if not is_paginated_request():
+        available_requests = nearest_requests_query(professional.service_id, professional.pin_code).all()
+        return jsonify([serialize_available_request(req) for req in available_requests]), 200
+    
+    limit = get_page_limit()
+    try:
+        available_requests, next_cursor = nearest_available_requests(
+            professional.service_id, professional.pin_code, limit,
+            cursor=request.args.get('cursor')
+        )
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
+    
+    return jsonify({
+        'items': [serialize_available_request(req) for req in available_requests],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }), 200
+
+
+@professional_bp.route('/available-requests/stream', methods=['GET'])
+@approved_professional_required
+def stream_available_requests():
+    """
+    Server-sent events replacing polling of /available-requests: a snapshot
+    of the open requests for the professional's service, then a delta each
+    time a request enters or leaves the pool.
+    """
+    professional = get_current_professional()
+    
+    # Subscribe before taking the snapshot so no change falls in between
+    pubsub = subscribe_available_requests(professional.service_id)
+    if pubsub is None:
+        return jsonify({'message': 'Live updates are not available'}), 503
+    
+    available_requests = nearest_requests_query(professional.service_id, professional.pin_code).all()
+    snapshot = current_app.json.dumps([serialize_available_request(req) for req in available_requests])
+    
+    return Response(
+        available_requests_stream(pubsub, snapshot),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @professional_bp.route('/service-requests/<int:request_id>/action', methods=['PUT'])
-@login_required
-@professional_required
+@approved_professional_required
 def update_service_request(request_id):
     service_request = ServiceRequest.query.get_or_404(request_id)
     data = request.get_json()
@@ -154,17 +138,29 @@ def update_service_request(request_id):
     action = data['action']
     
     # Check if the service request belongs to this professional's service type
-    professional = current_user.professional
+    professional = get_current_professional()
     if service_request.service_id != professional.service_id:
         return jsonify({'message': 'This service request does not match your expertise'}), 403
     
+    old_professional_id = service_request.professional_id
+    old_status = service_request.service_status
+    
     # Handle different actions
     if action == 'accept':
         if service_request.service_status != 'requested':
             return jsonify({'message': 'This request can no longer be accepted'}), 400
         
-        service_request.professional_id = professional.id
-        service_request.service_status = 'accepted'
+        # Compare-and-set, so two professionals cannot both accept the request
+        if not ServiceRequest.claim(service_request.id, professional.id):
+            db.session.rollback()
+            winner = db.session.query(ServiceRequest.professional_id).filter_by(id=request_id).scalar()
+            return jsonify({
+                'message': 'This request has already been accepted by another professional',
+                'professional_id': winner
+            }), 409
+        
+        invalidate_on_commit(stale_keys(service_request))
+        queue_claimed_request(service_request)
     
     elif action == 'reject':
         if service_request.professional_id != professional.id or service_request.service_status not in ['assigned', 'accepted']:
@@ -183,6 +179,7 @@ def update_service_request(request_id):
     else:
         return jsonify({'message': 'Invalid action'}), 400
     
+    ProfessionalStats.record_status_change(service_request, old_professional_id, old_status)
     db.session.commit()
     
     return jsonify({'message': f'Service request {action}ed successfully'}), 200
@@ -190,80 +187,36 @@ def update_service_request(request_id):
 
 # Dashboard Summary Route
 @professional_bp.route('/dashboard-summary', methods=['GET'])
-@login_required
-@professional_required
+@approved_professional_required
 def dashboard_summary():
-    professional = current_user.professional
+    professional = get_current_professional()
     
     # Count requests by status
-    total_requests = ServiceRequest.query.filter_by(professional_id=professional.id).count()
-    accepted_requests = ServiceRequest.query.filter_by(professional_id=professional.id, service_status='accepted').count()
-    completed_requests = ServiceRequest.query.filter_by(professional_id=professional.id, service_status='completed').count()
-    closed_requests = ServiceRequest.query.filter_by(professional_id=professional.id, service_status='closed').count()
-    
-    # Get average rating
-    from sqlalchemy import func
-    from models.models import Review
-    
-    avg_rating = db.session.query(func.avg(Review.rating)).join(
-        ServiceRequest, ServiceRequest.id == Review.service_request_id
-    ).filter(ServiceRequest.professional_id == professional.id).scalar() or 0
-    
-    # Available requests
-    available_requests = ServiceRequest.query.filter_by(
-        service_id=professional.service_id,
-        service_status='requested',
-        professional_id=None
-    ).count()
+    stats = professional_stats(professional)
     
     summary = {
-        'total_requests': total_requests,
-        'accepted_requests': accepted_requests,
-        'completed_requests': completed_requests,
-        'closed_requests': closed_requests,
-        'available_requests': available_requests,
-        'average_rating': float(avg_rating)
+        'total_requests': stats['total'],
+        'accepted_requests': stats['accepted'],
+        'completed_requests': stats['completed'],
+        'closed_requests': stats['closed'],
+        'available_requests': stats['available'],
+        'average_rating': float(stats['avg_rating'] or 0)
     }
     
     return jsonify(summary), 200
 
 @professional_bp.route('/dashboard/stats', methods=['GET'])
-@login_required
-@professional_required
+@approved_professional_required
 def get_dashboard_stats():
-    professional = current_user.professional
-    
-    # Count active requests (assigned, accepted)
-    active_count = ServiceRequest.query.filter_by(professional_id=professional.id).filter(
-        ServiceRequest.service_status.in_(['assigned', 'accepted'])
-    ).count()
-    
-    # Count completed requests
-    completed_count = ServiceRequest.query.filter_by(
-        professional_id=professional.id, 
-        service_status='completed'
-    ).count()
-    
-    # Count available requests
-    available_count = ServiceRequest.query.filter_by(
-        service_id=professional.service_id,
-        service_status='requested',
-        professional_id=None
-    ).count()
-    
-    # Get average rating
-    from sqlalchemy import func
-    from models.models import Review
+    professional = get_current_professional()
     
-    avg_rating = db.session.query(func.avg(Review.rating)).join(
-        ServiceRequest, ServiceRequest.id == Review.service_request_id
-    ).filter(ServiceRequest.professional_id == professional.id).scalar() or 0
+    counts = professional_stats(professional)
     
     stats = {
-        'active': active_count,
-        'completed': completed_count,
-        'available': available_count,
-        'rating': float(avg_rating)
+        'active': counts['active'],
+        'completed': counts['completed'],
+        'available': counts['available'],
+        'rating': float(counts['avg_rating'] or 0)
     }
     
     return jsonify(stats), 200
\ No newline at end of file
@@ -1,6 +1,28 @@
 from celery import Celery
-from flask import Flask
-import os 
+from celery.signals import worker_process_init
+from flask import Flask, has_app_context
+import os
+
+# Flask app shared by every task in a worker process, see get_worker_app()
+_worker_app = None
+
+def get_worker_app():
+    """
+    Returns the Flask app for this worker process, building it on first use.
+    create_app() registers blueprints, runs db.create_all() and checks for the
+    admin user, so it should happen once per process rather than once per task.
+    """
+    global _worker_app
+    if _worker_app is None:
+        from app import create_app
+        _worker_app = create_app()
+    return _worker_app
+
+@worker_process_init.connect
+def init_worker_app(**kwargs):
+    # Build the app (and its engine) after the worker has forked so each
+    # child process gets its own connection pool
+    get_worker_app()
 
 def make_celery(app=None):
 
@@ -8,18 +30,20 @@ def make_celery(app=None):
         'household_services',
         broker = os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
         backend = os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
-        include = ['tasks.scheduled_tasks', 'tasks.report_tasks' , 'tasks.export_tasks']
+        include = ['tasks.scheduled_tasks', 'tasks.report_tasks' , 'tasks.export_tasks', 'tasks.maintenance_tasks', 'tasks.mail_tasks']
     )
 
-    if app:
-        class ContextTask(celery.Task):
-            def __call__(self, *args, **kwargs):
-                with app.app_context():
-                    return self.run(*args,**kwargs)
-        
-        celery.Task = ContextTask
+    class ContextTask(celery.Task):
+        def __call__(self, *args, **kwargs):
+            # Tasks called inline (e.g. from a request) reuse the active app
+            if not app and has_app_context():
+                return self.run(*args,**kwargs)
+            with (app or get_worker_app()).app_context():
+                return self.run(*args,**kwargs)
+
+    celery.Task = ContextTask
+
 
-    
     celery.conf.beat_schedule = {
         'daily-reminders': {
             'task': 'tasks.scheduled_tasks.send_daily_reminders',
@@ -28,7 +52,19 @@ def make_celery(app=None):
          'monthly-reports': {
             'task': 'tasks.report_tasks.generate_monthly_reports',
             'schedule': 30.0,
-            'options': {'day_of_month': 1} 
+            'options': {'day_of_month': 1}
+        },
+        'rebuild-professional-stats': {
+            'task': 'tasks.maintenance_tasks.rebuild_professional_stats',
+            'schedule': 24 * 60 * 60
+        },
+        'finalize-monthly-metrics': {
+            'task': 'tasks.maintenance_tasks.finalize_monthly_metrics',
+            'schedule': 24 * 60 * 60
+        },
+        'cleanup-expired-exports': {
+            'task': 'tasks.export_tasks.cleanup_expired_exports',
+            'schedule': 6 * 60 * 60
         },
     }
 
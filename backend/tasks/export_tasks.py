@@ -1,8 +1,14 @@
 from tasks.celery_config import make_celery
-from models.models import db, ServiceRequest, Professional, User, Service, Customer, ExportJob
+from models.models import db, ServiceRequest, Professional, User, Service, Customer, Review, ExportJob, ProfessionalStats
+from sqlalchemy import func, case
+from utils.service_requests import service_request_export_query, iter_batches
 from flask import current_app
-from flask_mail import Mail, Message
+from flask_mail import Message
+from utils.mailer import send_batch
+from functools import partial
 import os
+import gzip
+import time
 import csv
 from datetime import datetime, timedelta
 import io
@@ -10,154 +16,272 @@ import uuid
 import json
 
 celery = make_celery()
-mail = Mail()
+
+# Rows fetched and written per batch when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# Rows buffered per fetch when streaming grouped admin reports
+REPORT_BATCH_SIZE = 1000
+
+# Export file formats: file extension, download content type, the name used in
+# emails and the content coding the file is stored with. CSV is gzipped on disk
+# and served as-is with Content-Encoding; Parquet and Arrow compress their
+# column data internally with zstd.
+EXPORT_FORMATS = {
+    'csv': {'extension': 'csv', 'content_type': 'text/csv', 'label': 'CSV', 'encoding': 'gzip'},
+    'parquet': {'extension': 'parquet', 'content_type': 'application/vnd.apache.parquet', 'label': 'Apache Parquet', 'encoding': None},
+    'arrow': {'extension': 'arrow', 'content_type': 'application/vnd.apache.arrow.file', 'label': 'Apache Arrow', 'encoding': None},
+}
+
+# gzip level for CSV exports: close to the size of level 9 at a fraction of the time
+EXPORT_GZIP_LEVEL = 6
+# Codec for the column data of Parquet and Arrow exports
+EXPORT_COLUMNAR_COMPRESSION = 'zstd'
+# Days a finished export is kept before cleanup_expired_exports deletes it
+EXPORT_RETENTION_DAYS = 7
+
+
+def export_directory():
+    return os.path.join(current_app.root_path, 'exports')
+
+
+def stored_export_name(filename, file_format):
+    """Name of an export on disk: gzipped files carry a .gz suffix after the download name"""
+    return f"{filename}.gz" if EXPORT_FORMATS[file_format]['encoding'] == 'gzip' else filename
+
+
+def open_export(filepath, mode='rb', **kwargs):
+    """Opens an export file, transparently (de)compressing gzipped ones"""
+    if filepath.endswith('.gz'):
+        if 'w' in mode:
+            kwargs.setdefault('compresslevel', EXPORT_GZIP_LEVEL)
+        return gzip.open(filepath, mode, **kwargs)
+    return open(filepath, mode, **kwargs)
+
+
+def write_csv_export(query, filepath, on_batch=None):
+    """
+    Writes the service request export query to a CSV file, one keyset batch
+    at a time, gzipped when the path ends in .gz
+    """
+    with open_export(filepath, 'wt', newline='') as csvfile:
+        fieldnames = [
+            'ID', 'Service', 'Customer', 'Professional', 'Date Requested',
+            'Date Completed', 'Status', 'Remarks', 'Rating'
+        ]
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        
+        writer.writeheader()
+        for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+            writer.writerows({
+                'ID': row.id,
+                'Service': row.service_name,
+                'Customer': row.customer_name,
+                'Professional': row.professional_name or 'Not Assigned',
+                'Date Requested': row.date_of_request.strftime('%Y-%m-%d'),
+                'Date Completed': row.date_of_completion.strftime('%Y-%m-%d') if row.date_of_completion else 'Not Completed',
+                'Status': row.service_status,
+                'Remarks': row.remarks or '',
+                'Rating': row.rating if row.rating is not None else 'No Rating'
+            } for row in batch)
+            
+            if on_batch:
+                on_batch(batch)
+
+
+def export_schema(pa):
+    """
+    Typed columns of a columnar export, named after the columns of
+    service_request_export_query(). Missing values stay null instead of the
+    CSV placeholders, and dates keep their time as timestamps.
+    """
+    return pa.schema([
+        ('id', pa.int64()),
+        ('service_name', pa.string()),
+        ('customer_name', pa.string()),
+        ('professional_name', pa.string()),
+        ('date_of_request', pa.timestamp('us')),
+        ('date_of_completion', pa.timestamp('us')),
+        ('service_status', pa.string()),
+        ('remarks', pa.string()),
+        ('rating', pa.int8()),
+    ])
+
+
+def write_columnar_export(query, filepath, on_batch=None, file_format='parquet'):
+    """
+    Writes the service request export query to a Parquet file or an Arrow IPC
+    file. Each keyset batch of rows is transposed into one Arrow record batch
+    (a Parquet row group), so memory stays bounded by the batch size.
+    Requires pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError(f"{EXPORT_FORMATS[file_format]['label']} exports require pyarrow")
+    
+    schema = export_schema(pa)
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(filepath, schema, compression=EXPORT_COLUMNAR_COMPRESSION)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=EXPORT_COLUMNAR_COMPRESSION)
+        writer = pa.ipc.new_file(filepath, schema, options=options)
+    
+    with writer:
+        for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+            columns = zip(*batch)
+            writer.write_batch(pa.record_batch(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                schema=schema
+            ))
+            
+            if on_batch:
+                on_batch(batch)
+
+
+EXPORT_WRITERS = {
+    'csv': write_csv_export,
+    'parquet': partial(write_columnar_export, file_format='parquet'),
+    'arrow': partial(write_columnar_export, file_format='arrow'),
+}
 
 @celery.task
 def export_service_requests_csv(job_id):
     """
-    Exports service requests to a CSV file based on the parameters stored in an ExportJob
+    Exports service requests to a CSV, Parquet or Arrow file, in the job's
+    format, based on the parameters stored in an ExportJob
     
     Args:
         job_id: ID of the ExportJob to process
     
     Returns:
-        The path to the generated CSV file
+        The path to the generated file
     """
-    from app import create_app
-    app = create_app()
-    
-    with app.app_context():
-        try:
-            # Get the job from the database
-            job = ExportJob.query.get(job_id)
-            if not job:
-                print(f"Job {job_id} not found")
-                return None
-            
-            # Update job status
-            job.status = 'processing'
-            db.session.commit()
-            
-            # Parse the filter parameters
-            params = json.loads(job.filter_params) if job.filter_params else {}
-            
-            # Build the query based on filters
-            query = ServiceRequest.query
-            
-            if params.get('professional_id'):
-                query = query.filter(ServiceRequest.professional_id == params['professional_id'])
-            
-            if params.get('service_id'):
-                query = query.filter(ServiceRequest.service_id == params['service_id'])
-            
-            if params.get('status') and params['status'] != 'all':
-                query = query.filter(ServiceRequest.service_status == params['status'])
-            
-            if params.get('date_range'):
-                date_range = params['date_range']
-                today = datetime.now()
-                
-                if date_range == 'today':
-                    start_date = datetime(today.year, today.month, today.day)
-                    query = query.filter(ServiceRequest.date_of_request >= start_date)
-                elif date_range == 'this_week':
-                    # Start of week (Monday)
-                    start_date = today - timedelta(days=today.weekday())
-                    start_date = datetime(start_date.year, start_date.month, start_date.day)
-                    query = query.filter(ServiceRequest.date_of_request >= start_date)
-                elif date_range == 'this_month':
-                    start_date = datetime(today.year, today.month, 1)
-                    query = query.filter(ServiceRequest.date_of_request >= start_date)
-                elif date_range == 'last_month':
-                    # Last month
-                    if today.month == 1:
-                        start_date = datetime(today.year - 1, 12, 1)
-                        end_date = datetime(today.year, today.month, 1)
-                    else:
-                        start_date = datetime(today.year, today.month - 1, 1)
-                        end_date = datetime(today.year, today.month, 1)
-                    query = query.filter(ServiceRequest.date_of_request >= start_date, 
-                                         ServiceRequest.date_of_request < end_date)
-            
-            # Get the service requests
-            service_requests = query.all()
-            
-            # Generate a unique filename
-            filename = f"service_requests_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.csv"
-            filepath = os.path.join(current_app.root_path, 'exports', filename)
-            
-            # Ensure the exports directory exists
-            os.makedirs(os.path.dirname(filepath), exist_ok=True)
-            
-            # Write the CSV file
-            with open(filepath, 'w', newline='') as csvfile:
-                fieldnames = [
-                    'ID', 'Service', 'Customer', 'Professional', 'Date Requested',
-                    'Date Completed', 'Status', 'Remarks', 'Rating'
-                ]
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for req in service_requests:
-                    professional_name = req.professional.user.username if req.professional else 'Not Assigned'
-                    rating = req.review.rating if req.review else 'No Rating'
-                    
-                    writer.writerow({
-                        'ID': req.id,
-                        'Service': req.service.name,
-                        'Customer': req.customer.user.username,
-                        'Professional': professional_name,
-                        'Date Requested': req.date_of_request.strftime('%Y-%m-%d'),
-                        'Date Completed': req.date_of_completion.strftime('%Y-%m-%d') if req.date_of_completion else 'Not Completed',
-                        'Status': req.service_status,
-                        'Remarks': req.remarks or '',
-                        'Rating': rating
-                    })
+    try:
+        # Get the job from the database
+        job = ExportJob.query.get(job_id)
+        if not job:
+            print(f"Job {job_id} not found")
+            return None
+        
+        # Update job status
+        job.status = 'processing'
+        db.session.commit()
+        
+        # Parse the filter parameters
+        params = json.loads(job.filter_params) if job.filter_params else {}
+        
+        # Build the query based on filters
+        query = service_request_export_query()
+        
+        if params.get('professional_id'):
+            query = query.filter(ServiceRequest.professional_id == params['professional_id'])
+        
+        if params.get('service_id'):
+            query = query.filter(ServiceRequest.service_id == params['service_id'])
+        
+        if params.get('status') and params['status'] != 'all':
+            query = query.filter(ServiceRequest.service_status == params['status'])
+        
+        if params.get('date_range'):
+            date_range = params['date_range']
+            today = datetime.now()
             
-            # Update the job with the file information
-            job.status = 'completed'
-            job.file_path = filepath
-            job.file_name = filename
-            job.completed_at = datetime.utcnow()
+            if date_range == 'today':
+                start_date = datetime(today.year, today.month, today.day)
+                query = query.filter(ServiceRequest.date_of_request >= start_date)
+            elif date_range == 'this_week':
+                # Start of week (Monday)
+                start_date = today - timedelta(days=today.weekday())
+                start_date = datetime(start_date.year, start_date.month, start_date.day)
+                query = query.filter(ServiceRequest.date_of_request >= start_date)
+            elif date_range == 'this_month':
+                start_date = datetime(today.year, today.month, 1)
+                query = query.filter(ServiceRequest.date_of_request >= start_date)
+            elif date_range == 'last_month':
+                # Last month
+                if today.month == 1:
+                    start_date = datetime(today.year - 1, 12, 1)
+                    end_date = datetime(today.year, today.month, 1)
+                else:
+                    start_date = datetime(today.year, today.month - 1, 1)
+                    end_date = datetime(today.year, today.month, 1)
+                query = query.filter(ServiceRequest.date_of_request >= start_date, 
+                                     ServiceRequest.date_of_request < end_date)
+        
+        # Record the size of the export for progress reporting
+        job.total_rows = query.order_by(None).count()
+        job.processed_rows = 0
+        db.session.commit()
+        
+        # Generate a unique filename
+        file_format = job.file_format or 'csv'
+        extension = EXPORT_FORMATS[file_format]['extension']
+        filename = f"service_requests_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.{extension}"
+        filepath = os.path.join(export_directory(), stored_export_name(filename, file_format))
+        
+        # Ensure the exports directory exists
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        
+        def record_progress(batch):
+            # Record progress after each batch
+            job.processed_rows += len(batch)
             db.session.commit()
-            
-            # If an email is provided, send the CSV as an attachment
-            if params.get('email'):
-                send_csv_email(params['email'], filepath, filename)
-            
-            return filepath
-            
-        except Exception as e:
-            print(f"Error in export task: {str(e)}")
-            
-            # Update job with error information
-            try:
-                if job:
-                    job.status = 'failed'
-                    job.error_message = str(e)
-                    db.session.commit()
-            except Exception as inner_e:
-                print(f"Failed to update job status: {str(inner_e)}")
-            
-            return None
+        
+        # Stream the file batch by batch
+        EXPORT_WRITERS[file_format](query, filepath, record_progress)
+        
+        # Update the job with the file information
+        job.status = 'completed'
+        job.file_path = filepath
+        job.file_name = filename
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        
+        # If an email is provided, send the CSV as an attachment
+        if params.get('email'):
+            send_csv_email(params['email'], filepath, filename, file_format)
+        
+        return filepath
+        
+    except Exception as e:
+        print(f"Error in export task: {str(e)}")
+        
+        # Update job with error information
+        try:
+            if job:
+                job.status = 'failed'
+                job.error_message = str(e)
+                db.session.commit()
+        except Exception as inner_e:
+            print(f"Failed to update job status: {str(inner_e)}")
+        
+        return None
 
 
-def send_csv_email(email, filepath, filename):
+def send_csv_email(email, filepath, filename, file_format='csv'):
     """
-    Sends an email with the CSV file attached
+    Sends an email with the exported file attached
     
     Args:
         email: Email address to send to
-        filepath: Path to the CSV file
-        filename: Name of the CSV file
+        filepath: Path to the exported file
+        filename: Name of the exported file
+        file_format: Format of the file, one of EXPORT_FORMATS
     """
+    if file_format == 'csv':
+        description = "This file contains your requested data in CSV format which can be opened with spreadsheet applications like Excel or Google Sheets."
+    else:
+        description = f"This file contains your requested data in {EXPORT_FORMATS[file_format]['label']} format which can be loaded with pandas, Polars or Spark."
+    
     subject = "Your Exported Service Requests"
     body = f"""Hello,
 
 Thank you for using A-Z Household Services.
 
 Please find attached the exported service requests data you requested. 
-This file contains your requested data in CSV format which can be opened with spreadsheet applications like Excel or Google Sheets.
+{description}
 
 File: {filename}
 Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
@@ -177,15 +301,62 @@ A-Z Household Services Team
             sender=os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
         )
         
-        with open(filepath, 'rb') as csv_file:
-            msg.attach(filename, 'text/csv', csv_file.read())
+        # Attached decompressed, under the download name
+        with open_export(filepath, 'rb') as export_file:
+            msg.attach(filename, EXPORT_FORMATS[file_format]['content_type'], export_file.read())
         
-        mail.send(msg)
-        print(f"Email successfully sent to {email}")
+        result = send_batch([msg])
+        if result['failed']:
+            print(f"Failed to send email to {email} after retries")
+        else:
+            print(f"Email successfully sent to {email}")
     except Exception as e:
         print(f"Failed to send email to {email}: {str(e)}")
 
 
+@celery.task
+def cleanup_expired_exports(retention_days=None):
+    """
+    Deletes export files older than the retention period (EXPORT_RETENTION_DAYS
+    in the app config) and marks their jobs expired, so their download links
+    answer 410 instead of a missing file. Files in the exports directory that
+    no live job points to (admin CSV reports, leftovers of failed jobs) are
+    removed once they are as old.
+    
+    Returns:
+        A summary of what was removed
+    """
+    retention_days = retention_days or current_app.config.get('EXPORT_RETENTION_DAYS', EXPORT_RETENTION_DAYS)
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    
+    expired_jobs = ExportJob.query.filter(
+        ExportJob.status == 'completed',
+        ExportJob.completed_at < cutoff
+    ).all()
+    for job in expired_jobs:
+        if job.file_path and os.path.exists(job.file_path):
+            os.remove(job.file_path)
+        job.status = 'expired'
+    db.session.commit()
+    
+    removed_files = 0
+    directory = export_directory()
+    if os.path.isdir(directory):
+        live = {
+            row.file_path for row in db.session.query(ExportJob.file_path).filter(
+                ExportJob.status.in_(('pending', 'processing', 'completed')),
+                ExportJob.file_path != None
+            )
+        }
+        oldest_mtime = time.time() - retention_days * 24 * 60 * 60
+        for entry in os.scandir(directory):
+            if entry.is_file() and entry.path not in live and entry.stat().st_mtime < oldest_mtime:
+                os.remove(entry.path)
+                removed_files += 1
+    
+    return f'{len(expired_jobs)} exports expired and {removed_files} stale files removed at {datetime.now()}'
+
+
 @celery.task
 def generate_admin_report_csv(report_type, email=None):
     """
@@ -198,39 +369,55 @@ def generate_admin_report_csv(report_type, email=None):
     Returns:
         The path to the generated CSV file
     """
-    from app import create_app
-    app = create_app()
+    # Generate a unique filename
+    filename = f"{report_type}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    filepath = os.path.join(export_directory(), filename)
     
-    with app.app_context():
-        # Generate a unique filename
-        filename = f"{report_type}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        filepath = os.path.join(current_app.root_path, 'exports', filename)
-        
-        # Ensure the exports directory exists
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Generate different reports based on type
-        if report_type == 'professionals':
-            generate_professionals_report(filepath)
-        elif report_type == 'customers':
-            generate_customers_report(filepath)
-        elif report_type == 'services':
-            generate_services_report(filepath)
-        elif report_type == 'requests':
-            generate_requests_report(filepath)
-        else:
-            return None
-        
-        # If an email is provided, send the CSV as an attachment
-        if email:
-            send_csv_email(email, filepath, filename)
-        
-        return filepath
+    # Ensure the exports directory exists
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    
+    # Generate different reports based on type
+    if report_type == 'professionals':
+        generate_professionals_report(filepath)
+    elif report_type == 'customers':
+        generate_customers_report(filepath)
+    elif report_type == 'services':
+        generate_services_report(filepath)
+    elif report_type == 'requests':
+        generate_requests_report(filepath)
+    else:
+        return None
+    
+    # If an email is provided, send the CSV as an attachment
+    if email:
+        send_csv_email(email, filepath, filename)
+    
+    return filepath
 
 
 def generate_professionals_report(filepath):
     """Generates a report of all professionals and their status"""
-    professionals = Professional.query.all()
+    # One query: completed count and average rating come from the professional_stats rollup
+    rows = db.session.query(
+        Professional.id,
+        User.username,
+        User.email,
+        Service.name.label('service_name'),
+        Professional.experience,
+        Professional.verification_status,
+        User.created_at,
+        func.coalesce(ProfessionalStats.completed_count, 0).label('completed_requests'),
+        case(
+            (ProfessionalStats.review_count > 0, ProfessionalStats.rating_sum * 1.0 / ProfessionalStats.review_count),
+            else_=0
+        ).label('avg_rating')
+    ).join(
+        User, User.id == Professional.user_id
+    ).join(
+        Service, Service.id == Professional.service_id
+    ).outerjoin(
+        ProfessionalStats, ProfessionalStats.professional_id == Professional.id
+    ).order_by(Professional.id).yield_per(REPORT_BATCH_SIZE)
     
     with open(filepath, 'w', newline='') as csvfile:
         fieldnames = [
@@ -240,37 +427,38 @@ def generate_professionals_report(filepath):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for prof in professionals:
-            # Count completed requests
-            completed_requests = ServiceRequest.query.filter_by(
-                professional_id=prof.id,
-                service_status='completed'
-            ).count()
-            
-            # Calculate average rating
-            from sqlalchemy import func
-            from models.models import Review
-            
-            avg_rating = db.session.query(func.avg(Review.rating)).join(
-                ServiceRequest, ServiceRequest.id == Review.service_request_id
-            ).filter(ServiceRequest.professional_id == prof.id).scalar() or 0
-            
+        for row in rows:
             writer.writerow({
-                'ID': prof.id,
-                'Username': prof.user.username,
-                'Email': prof.user.email,
-                'Service': prof.service.name,
-                'Experience': prof.experience,
-                'Verification Status': prof.verification_status,
-                'Date Joined': prof.user.created_at.strftime('%Y-%m-%d'),
-                'Completed Requests': completed_requests,
-                'Average Rating': f"{avg_rating:.1f}"
+                'ID': row.id,
+                'Username': row.username,
+                'Email': row.email,
+                'Service': row.service_name,
+                'Experience': row.experience,
+                'Verification Status': row.verification_status,
+                'Date Joined': row.created_at.strftime('%Y-%m-%d'),
+                'Completed Requests': row.completed_requests,
+                'Average Rating': f"{row.avg_rating:.1f}"
             })
 
 
 def generate_customers_report(filepath):
     """Generates a report of all customers and their activity"""
-    customers = Customer.query.all()
+    # One grouped query over customers LEFT JOIN service_requests
+    rows = db.session.query(
+        Customer.id,
+        User.username,
+        User.email,
+        Customer.pin_code,
+        User.created_at,
+        func.count(ServiceRequest.id).label('total_requests'),
+        func.coalesce(func.sum(case((ServiceRequest.service_status == 'closed', 1), else_=0)), 0).label('completed_requests')
+    ).join(
+        User, User.id == Customer.user_id
+    ).outerjoin(
+        ServiceRequest, ServiceRequest.customer_id == Customer.id
+    ).group_by(
+        Customer.id, User.id
+    ).order_by(Customer.id).yield_per(REPORT_BATCH_SIZE)
     
     with open(filepath, 'w', newline='') as csvfile:
         fieldnames = [
@@ -280,28 +468,44 @@ def generate_customers_report(filepath):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for customer in customers:
-            # Count requests
-            total_requests = ServiceRequest.query.filter_by(customer_id=customer.id).count()
-            completed_requests = ServiceRequest.query.filter_by(
-                customer_id=customer.id, 
-                service_status='closed'
-            ).count()
-            
+        for row in rows:
             writer.writerow({
-                'ID': customer.id,
-                'Username': customer.user.username,
-                'Email': customer.user.email,
-                'Pin Code': customer.pin_code,
-                'Date Joined': customer.user.created_at.strftime('%Y-%m-%d'),
-                'Total Requests': total_requests,
-                'Completed Requests': completed_requests
+                'ID': row.id,
+                'Username': row.username,
+                'Email': row.email,
+                'Pin Code': row.pin_code,
+                'Date Joined': row.created_at.strftime('%Y-%m-%d'),
+                'Total Requests': row.total_requests,
+                'Completed Requests': row.completed_requests
             })
 
 
 def generate_services_report(filepath):
     """Generates a report of all services and their usage"""
-    services = Service.query.all()
+    # Professionals are counted in a pre-aggregated subquery so joining them
+    # does not multiply the request rows of the main GROUP BY
+    professional_counts = db.session.query(
+        Professional.service_id,
+        func.count(Professional.id).label('professionals_count')
+    ).group_by(Professional.service_id).subquery()
+    
+    rows = db.session.query(
+        Service.id,
+        Service.name,
+        Service.base_price,
+        Service.time_required,
+        func.coalesce(professional_counts.c.professionals_count, 0).label('professionals_count'),
+        func.count(ServiceRequest.id).label('total_requests'),
+        func.coalesce(func.avg(Review.rating), 0).label('avg_rating')
+    ).outerjoin(
+        professional_counts, professional_counts.c.service_id == Service.id
+    ).outerjoin(
+        ServiceRequest, ServiceRequest.service_id == Service.id
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    ).group_by(
+        Service.id, professional_counts.c.professionals_count
+    ).order_by(Service.id).yield_per(REPORT_BATCH_SIZE)
     
     with open(filepath, 'w', newline='') as csvfile:
         fieldnames = [
@@ -311,35 +515,21 @@ def generate_services_report(filepath):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for service in services:
-            # Count professionals
-            professionals_count = Professional.query.filter_by(service_id=service.id).count()
-            
-            # Count requests
-            total_requests = ServiceRequest.query.filter_by(service_id=service.id).count()
-            
-            # Calculate average rating
-            from sqlalchemy import func
-            from models.models import Review
-            
-            avg_rating = db.session.query(func.avg(Review.rating)).join(
-                ServiceRequest, ServiceRequest.id == Review.service_request_id
-            ).filter(ServiceRequest.service_id == service.id).scalar() or 0
-            
+        for row in rows:
             writer.writerow({
-                'ID': service.id,
-                'Name': service.name,
-                'Base Price': f"${service.base_price:.2f}",
-                'Time Required': service.time_required,
-                'Professionals Count': professionals_count,
-                'Total Requests': total_requests,
-                'Average Rating': f"{avg_rating:.1f}"
+                'ID': row.id,
+                'Name': row.name,
+                'Base Price': f"${row.base_price:.2f}",
+                'Time Required': row.time_required,
+                'Professionals Count': row.professionals_count,
+                'Total Requests': row.total_requests,
+                'Average Rating': f"{row.avg_rating:.1f}"
             })
 
 
 def generate_requests_report(filepath):
     """Generates a report of all service requests"""
-    requests = ServiceRequest.query.all()
+    query = service_request_export_query()
     
     with open(filepath, 'w', newline='') as csvfile:
         fieldnames = [
@@ -350,24 +540,22 @@ def generate_requests_report(filepath):
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for req in requests:
-            professional_name = req.professional.user.username if req.professional else 'Not Assigned'
-            rating = req.review.rating if req.review else 'No Rating'
-            
-            # Calculate days to complete
-            days_to_complete = ''
-            if req.date_of_completion and req.date_of_request:
-                delta = req.date_of_completion - req.date_of_request
-                days_to_complete = delta.days
-            
-            writer.writerow({
-                'ID': req.id,
-                'Service': req.service.name,
-                'Customer': req.customer.user.username,
-                'Professional': professional_name,
-                'Date Requested': req.date_of_request.strftime('%Y-%m-%d'),
-                'Date Completed': req.date_of_completion.strftime('%Y-%m-%d') if req.date_of_completion else 'Not Completed',
-                'Status': req.service_status,
-                'Rating': rating,
-                'Days to Complete': days_to_complete
-            })
\ No newline at end of file
+        for batch in iter_batches(query, EXPORT_BATCH_SIZE):
+            for row in batch:
+                # Calculate days to complete
+                days_to_complete = ''
+                if row.date_of_completion and row.date_of_request:
+                    delta = row.date_of_completion - row.date_of_request
+                    days_to_complete = delta.days
+                
+                writer.writerow({
+                    'ID': row.id,
+                    'Service': row.service_name,
+                    'Customer': row.customer_name,
+                    'Professional': row.professional_name or 'Not Assigned',
+                    'Date Requested': row.date_of_request.strftime('%Y-%m-%d'),
+                    'Date Completed': row.date_of_completion.strftime('%Y-%m-%d') if row.date_of_completion else 'Not Completed',
+                    'Status': row.service_status,
+                    'Rating': row.rating if row.rating is not None else 'No Rating',
+                    'Days to Complete': days_to_complete
+                })
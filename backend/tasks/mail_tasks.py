@@ -0,0 +1,34 @@
+from tasks.celery_config import make_celery
+from utils.mailer import (
+    send_batch, chunked, message_to_dict, message_from_dict,
+    MAIL_BATCH_SIZE, MAIL_MAX_RETRIES
+)
+from celery import group
+
+celery = make_celery()
+
+@celery.task(bind=True, max_retries=MAIL_MAX_RETRIES)
+def send_mail_batch(self, payloads):
+    """
+    Sends a chunk of serialized messages over one SMTP connection.
+    Messages that still fail after the in-batch retries are re-queued
+    on their own with a countdown.
+    """
+    result = send_batch([message_from_dict(payload) for payload in payloads])
+    print(f"Sent {result['sent']} emails at {result['rate']:.1f} msg/s")
+
+    if result['failed']:
+        raise self.retry(
+            args=[[message_to_dict(msg) for msg in result['failed']]],
+            countdown=60 * (self.request.retries + 1)
+        )
+
+    return result['sent']
+
+
+def queue_mail(messages, batch_size=MAIL_BATCH_SIZE):
+    """Fans messages out across workers as send_mail_batch chunks"""
+    payloads = [message_to_dict(msg) for msg in messages]
+    if not payloads:
+        return None
+    return group(send_mail_batch.s(chunk) for chunk in chunked(payloads, batch_size)).apply_async()
@@ -0,0 +1,34 @@
+from tasks.celery_config import make_celery
+from models.models import ProfessionalStats, MonthlyMetrics
+from datetime import datetime
+
+celery = make_celery()
+
+@celery.task
+def rebuild_professional_stats():
+    """
+    Rebuilds the professional_stats rollup from service_requests and reviews.
+    The routes keep it up to date incrementally; this repairs any drift.
+    """
+    ProfessionalStats.rebuild()
+
+    return f'professional stats rebuilt at {datetime.now()}'
+
+
+@celery.task
+def finalize_monthly_metrics():
+    """
+    Recomputes from service_requests and reviews every closed month whose
+    monthly_metrics rows are missing or not final yet, marks them final, and
+    opens the current month's rows so its increments are plain UPDATEs.
+    Closed months of a database upgraded while the app was already writing
+    current-month rows are backfilled the same way; an empty table is
+    rebuilt whole.
+    """
+    if not MonthlyMetrics.query.first():
+        MonthlyMetrics.rebuild()
+        return f'monthly metrics rebuilt at {datetime.now()}'
+
+    months = MonthlyMetrics.finalize_closed_months()
+
+    return f'{months} months finalized at {datetime.now()}'
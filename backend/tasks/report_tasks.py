@@ -1,47 +1,258 @@
 from tasks.celery_config import make_celery
-from models.models import db, ServiceRequest, Customer, User, Review
-from flask_mail import Mail, Message
+from models.models import db, ServiceRequest, Customer, User, Review, MonthlyReportDelivery, ReportJob
+from utils.reports import build_report
+from flask import current_app
+from flask_mail import Message
+from utils.mailer import send_batch
+from celery import chord
+from celery.exceptions import MaxRetriesExceededError
+from collections import defaultdict
 from datetime import datetime, timedelta
 import os 
-from sqlalchemy import func
+import hashlib
+from sqlalchemy import func, or_
+from sqlalchemy.orm import joinedload
 import jinja2
 import pdfkit
 
 celery = make_celery()
-mail = Mail()
 
-@celery.task
-def generate_monthly_reports():
+REPORT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'reports')
 
-    from app import create_app
-    app = create_app()
 
-    with app.app_context():
+def get_report_env():
+    """
+    The app's report template environment, created on first use. It keeps
+    compiled templates in memory, so each is compiled once per worker
+    process, and persists their bytecode in REPORT_TEMPLATE_CACHE_DIR
+    across restarts.
+    """
+    env = current_app.extensions.get('report_env')
+    if env is None:
+        env = current_app.extensions.setdefault('report_env', jinja2.Environment(
+            loader=jinja2.FileSystemLoader(REPORT_TEMPLATE_DIR),
+            bytecode_cache=jinja2.FileSystemBytecodeCache(current_app.config['REPORT_TEMPLATE_CACHE_DIR']),
+            autoescape=jinja2.select_autoescape(['html']),
+            auto_reload=False,
+            cache_size=50
+        ))
+    return env
 
-        today = datetime.today()
-        first_day_of_month = datetime(today.year, today.month, 1)
-        last_month_end = first_day_of_month = timedelta(days=1)
-        last_month_start = datetime(last_month_end.year, last_month_end.month, 1)
 
-        customers = Customer.query.join(ServiceRequest).filter(
-            ServiceRequest.date_of_request >= last_month_start,
-            ServiceRequest.date_of_request <= last_month_end,
-        ).distinct().all()
+def get_report_template(name):
+    return get_report_env().get_template(name)
 
-        for customer in customers:
-            if customer.user and customer.user.email:
-                generate_customer_report(customer, last_month_start, last_month_end)
 
-    return f'monthly report generated at {datetime.now()}'
-    
-def generate_customer_report(customer, start_date, end_date):
+# Customers handled per report subtask (one prefetch query and one SMTP connection each)
+REPORT_CHUNK_SIZE = 200
+# Deliveries still pending after this long are treated as lost and dispatched again
+REPORT_DISPATCH_TIMEOUT = timedelta(hours=1)
+# Runs that may dispatch a delivery before it is marked failed and left alone
+REPORT_MAX_ATTEMPTS = 3
+
+
+def month_range(period):
+    """Returns [start, end) datetimes for a 'YYYY-MM' period"""
+    start = datetime.strptime(period, '%Y-%m')
+    if start.month == 12:
+        end = datetime(start.year + 1, 1, 1)
+    else:
+        end = datetime(start.year, start.month + 1, 1)
+    return start, end
+
+
+def previous_period():
+    first_day_of_month = datetime.today().replace(day=1)
+    return (first_day_of_month - timedelta(days=1)).strftime('%Y-%m')
+
+
+def fail_exhausted_deliveries(period):
+    """
+    Marks failed the pending deliveries of the period that have used up
+    REPORT_MAX_ATTEMPTS and whose last dispatch is stale, so the runs stop
+    picking them up. Returns how many were marked.
+    """
+    stale_before = datetime.utcnow() - REPORT_DISPATCH_TIMEOUT
+    failed = MonthlyReportDelivery.query.filter(
+        MonthlyReportDelivery.period == period,
+        MonthlyReportDelivery.status == 'pending',
+        MonthlyReportDelivery.attempts >= REPORT_MAX_ATTEMPTS,
+        MonthlyReportDelivery.dispatched_at < stale_before
+    ).update({MonthlyReportDelivery.status: 'failed'}, synchronize_session=False)
+    db.session.commit()
+    return failed
+
 
-    service_requests = ServiceRequest.query.filter(
-        ServiceRequest.customer_id == customer.id,
+def claim_customer_chunk(period, start_date, end_date, after_id):
+    """
+    Returns the next chunk of customer IDs with activity in the period that
+    still need a report, and records them as pending deliveries, counting
+    the attempt. Customers already sent (or skipped or failed), or
+    dispatched recently, are left out so a re-run only picks up what a
+    previous run did not finish.
+    """
+    stale_before = datetime.utcnow() - REPORT_DISPATCH_TIMEOUT
+    handled = db.session.query(MonthlyReportDelivery.id).filter(
+        MonthlyReportDelivery.customer_id == ServiceRequest.customer_id,
+        MonthlyReportDelivery.period == period,
+        or_(
+            MonthlyReportDelivery.status != 'pending',
+            MonthlyReportDelivery.dispatched_at >= stale_before
+        )
+    ).exists()
+
+    customer_ids = [row.customer_id for row in db.session.query(ServiceRequest.customer_id).filter(
         ServiceRequest.date_of_request >= start_date,
-        ServiceRequest.date_of_request <= end_date
+        ServiceRequest.date_of_request < end_date,
+        ServiceRequest.customer_id > after_id,
+        ~handled
+    ).distinct().order_by(ServiceRequest.customer_id).limit(REPORT_CHUNK_SIZE)]
+
+    if not customer_ids:
+        return []
+
+    now = datetime.utcnow()
+    existing = MonthlyReportDelivery.query.filter(
+        MonthlyReportDelivery.period == period,
+        MonthlyReportDelivery.customer_id.in_(customer_ids)
     ).all()
-    
+    for delivery in existing:
+        delivery.dispatched_at = now
+        delivery.attempts = (delivery.attempts or 0) + 1
+
+    claimed = {delivery.customer_id for delivery in existing}
+    db.session.add_all([
+        MonthlyReportDelivery(customer_id=customer_id, period=period, status='pending', dispatched_at=now, attempts=1)
+        for customer_id in customer_ids if customer_id not in claimed
+    ])
+    db.session.commit()
+
+    return customer_ids
+
+
+@celery.task
+def generate_monthly_reports(period=None):
+    """
+    Coordinator: pages through the customers active in the period (last month
+    by default) and dispatches one generate_report_chunk subtask per chunk,
+    with finalize_monthly_reports as the chord callback.
+    """
+    period = period or previous_period()
+    start_date, end_date = month_range(period)
+
+    failed = fail_exhausted_deliveries(period)
+    if failed:
+        print(f"Monthly reports for {period}: {failed} customers failed after {REPORT_MAX_ATTEMPTS} attempts")
+
+    chunks = []
+    last_id = 0
+    while True:
+        customer_ids = claim_customer_chunk(period, start_date, end_date, last_id)
+        if not customer_ids:
+            break
+        chunks.append(generate_report_chunk.s(customer_ids, period))
+        last_id = customer_ids[-1]
+
+    if not chunks:
+        return f'no monthly reports left to send for {period}'
+
+    chord(chunks)(finalize_monthly_reports.s(period))
+
+    return f'monthly reports for {period} dispatched in {len(chunks)} chunks at {datetime.now()}'
+
+
+@celery.task(bind=True, max_retries=3)
+def generate_report_chunk(self, customer_ids, period):
+    """
+    Renders and emails the monthly report for a chunk of customers. All of
+    the chunk's requests are prefetched in one query and the emails share one
+    SMTP connection. Each delivery is marked sent as soon as its email is
+    accepted. Customers whose email failed keep the error and stay pending
+    and the chunk retries; customers already sent are skipped. Once the
+    retries are used up, deliveries on their last attempt are marked failed.
+    """
+    start_date, end_date = month_range(period)
+
+    deliveries = {
+        delivery.customer_id: delivery
+        for delivery in MonthlyReportDelivery.query.filter(
+            MonthlyReportDelivery.period == period,
+            MonthlyReportDelivery.customer_id.in_(customer_ids),
+            MonthlyReportDelivery.status == 'pending'
+        )
+    }
+    if not deliveries:
+        return 0
+
+    customers = Customer.query.options(joinedload(Customer.user)).filter(
+        Customer.id.in_(list(deliveries))
+    ).all()
+
+    requests_by_customer = defaultdict(list)
+    for req in ServiceRequest.query.options(
+        joinedload(ServiceRequest.service),
+        joinedload(ServiceRequest.review)
+    ).filter(
+        ServiceRequest.customer_id.in_(list(deliveries)),
+        ServiceRequest.date_of_request >= start_date,
+        ServiceRequest.date_of_request < end_date
+    ).order_by(ServiceRequest.customer_id, ServiceRequest.date_of_request):
+        requests_by_customer[req.customer_id].append(req)
+
+    messages = {}
+    for customer in customers:
+        if customer.user and customer.user.email:
+            messages[customer.id] = generate_customer_report(customer, requests_by_customer[customer.id], start_date)
+        else:
+            deliveries[customer.id].status = 'skipped'
+
+    customer_by_message = {id(msg): customer_id for customer_id, msg in messages.items()}
+    db.session.commit()
+
+    def mark_sent(msg):
+        # Committed per message, so a crash mid-batch does not resend the
+        # emails that already went out
+        delivery = deliveries[customer_by_message[id(msg)]]
+        delivery.status = 'sent'
+        delivery.sent_at = datetime.utcnow()
+        db.session.commit()
+
+    errors = {}
+
+    def record_error(msg, error):
+        errors[customer_by_message[id(msg)]] = str(error)
+
+    result = send_batch(list(messages.values()), on_sent=mark_sent, on_failed=record_error)
+
+    if result['failed']:
+        failed = [deliveries[customer_by_message[id(msg)]] for msg in result['failed']]
+        for delivery in failed:
+            delivery.last_error = errors.get(delivery.customer_id)
+        db.session.commit()
+        try:
+            raise self.retry(countdown=60 * (self.request.retries + 1))
+        except MaxRetriesExceededError:
+            # Return instead of failing so the chord callback still records
+            # the run; the failed customers stay pending for the next run
+            # unless this was their last attempt
+            for delivery in failed:
+                if delivery.attempts >= REPORT_MAX_ATTEMPTS:
+                    delivery.status = 'failed'
+            db.session.commit()
+            print(f"Monthly reports for {period}: giving up on {len(result['failed'])} emails after {self.max_retries} retries")
+
+    return result['sent']
+
+
+@celery.task
+def finalize_monthly_reports(results, period):
+    sent = sum(results)
+    print(f"Monthly reports for {period}: {sent} emails sent")
+    return f'monthly reports for {period} completed at {datetime.now()} ({sent} sent)'
+
+
+def generate_customer_report(customer, service_requests, start_date):
+    """Builds the monthly report email for one customer from their prefetched requests"""
     # Calculate statistics
     total_requests = len(service_requests)
     completed_requests = sum(1 for req in service_requests if req.service_status in ['completed', 'closed'])
@@ -65,120 +276,30 @@ def generate_customer_report(customer, start_date, end_date):
     # Optional: Convert HTML to PDF
     # pdf_file = convert_html_to_pdf(report_html)
     
-    # Send the report by email
+    # Build the report email; the chunk task sends it in a batch
     month_name = start_date.strftime("%B %Y")
     subject = f"Your Monthly Activity Report - {month_name}"
     
-    try:
-        msg = Message(
-            subject=subject,
-            recipients=[customer.user.email],
-            html=report_html,
-            sender=os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
-        )
-        
-        # If using PDF:
-        # if pdf_file:
-        #     with app.open_resource(pdf_file) as fp:
-        #         msg.attach(f"monthly_report_{month_name.replace(' ', '_')}.pdf", "application/pdf", fp.read())
-        
-        mail.send(msg)
-    except Exception as e:
-        print(f"Failed to send report to {customer.user.email}: {str(e)}")
+    msg = Message(
+        subject=subject,
+        recipients=[customer.user.email],
+        html=report_html,
+        sender=os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
+    )
+    
+    # If using PDF:
+    # if pdf_file:
+    #     with app.open_resource(pdf_file) as fp:
+    #         msg.attach(f"monthly_report_{month_name.replace(' ', '_')}.pdf", "application/pdf", fp.read())
+    
+    return msg
 
 
 def render_report_template(customer, service_requests, total_requests, completed_requests, total_cost, avg_rating, month_name):
     """
     Renders the HTML template for the monthly report
     """
-    template_str = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Monthly Activity Report - {{ month_name }}</title>
-        <style>
-            body { font-family: Arial, sans-serif; margin: 0; padding: 20px; color: #333; }
-            .container { max-width: 800px; margin: 0 auto; }
-            .header { text-align: center; margin-bottom: 30px; }
-            .header h1 { color: #2c3e50; margin-bottom: 10px; }
-            .summary { background-color: #f8f9fa; padding: 20px; border-radius: 5px; margin-bottom: 30px; }
-            .summary-grid { display: grid; grid-template-columns: repeat(2, 1fr); gap: 20px; }
-            .summary-item { text-align: center; }
-            .summary-item h3 { margin-bottom: 5px; color: #2980b9; }
-            .requests-table { width: 100%; border-collapse: collapse; margin-bottom: 30px; }
-            .requests-table th { background-color: #2980b9; color: white; text-align: left; padding: 10px; }
-            .requests-table td { border-bottom: 1px solid #ddd; padding: 10px; }
-            .footer { margin-top: 50px; text-align: center; font-size: 12px; color: #7f8c8d; }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>Monthly Activity Report</h1>
-                <p>{{ month_name }}</p>
-                <p>Prepared for: {{ customer.user.username }}</p>
-            </div>
-            
-            <div class="summary">
-                <h2>Monthly Summary</h2>
-                <div class="summary-grid">
-                    <div class="summary-item">
-                        <h3>{{ total_requests }}</h3>
-                        <p>Total Service Requests</p>
-                    </div>
-                    <div class="summary-item">
-                        <h3>{{ completed_requests }}</h3>
-                        <p>Completed Requests</p>
-                    </div>
-                    <div class="summary-item">
-                        <h3>${{ "%.2f"|format(total_cost) }}</h3>
-                        <p>Total Service Cost</p>
-                    </div>
-                    <div class="summary-item">
-                        <h3>{{ "%.1f"|format(avg_rating) }}/5</h3>
-                        <p>Average Rating</p>
-                    </div>
-                </div>
-            </div>
-            
-            <h2>Service Request Details</h2>
-            {% if service_requests %}
-            <table class="requests-table">
-                <thead>
-                    <tr>
-                        <th>Service</th>
-                        <th>Date</th>
-                        <th>Status</th>
-                        <th>Price</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {% for request in service_requests %}
-                    <tr>
-                        <td>{{ request.service.name }}</td>
-                        <td>{{ request.date_of_request.strftime('%Y-%m-%d') }}</td>
-                        <td>{{ request.service_status }}</td>
-                        <td>${{ "%.2f"|format(request.service.base_price) }}</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-            {% else %}
-            <p>No service requests were made during this period.</p>
-            {% endif %}
-            
-            <div class="footer">
-                <p>Thank you for using A-Z Household Services!</p>
-                <p>If you have any questions about this report, please contact customer support.</p>
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-    
-    template = jinja2.Template(template_str)
-    return template.render(
+    return get_report_template('monthly_report.html').render(
         customer=customer,
         service_requests=service_requests,
         total_requests=total_requests,
@@ -207,4 +328,136 @@ def convert_html_to_pdf(html_content):
     except Exception as e:
         print(f"Failed to convert HTML to PDF: {str(e)}")
         return None
-        
\ No newline at end of file
+        
+
+def store_report_artifact(content, report_type, extension):
+    """
+    Writes a report artifact under reports/, named by the SHA-256 of its
+    content, and returns its path and hash. Identical content is stored
+    once, and the file is written aside and renamed so a reader never sees
+    a partial artifact.
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    filepath = os.path.join(current_app.root_path, 'reports', f"{report_type}_{digest[:16]}.{extension}")
+
+    if not os.path.exists(filepath):
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        partial = f"{filepath}.{os.getpid()}.tmp"
+        with open(partial, 'wb') as artifact:
+            artifact.write(content)
+        os.replace(partial, filepath)
+
+    return filepath, digest
+
+
+def render_admin_report_pdf(report, report_id, html_content):
+    """
+    Renders an admin report to PDF with reportlab, or with wkhtmltopdf from
+    the HTML when reportlab is not installed. Returns None when neither is
+    available.
+    """
+    try:
+        from io import BytesIO
+        from reportlab.lib.pagesizes import letter, landscape
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+        from reportlab.lib.styles import getSampleStyleSheet
+    except ImportError:
+        pdf_file = convert_html_to_pdf(html_content)
+        if not pdf_file:
+            return None
+        with open(pdf_file, 'rb') as pdf:
+            content = pdf.read()
+        os.remove(pdf_file)
+        return content
+
+    buffer = BytesIO()
+    pagesize = landscape(letter) if len(report['columns']) > 5 else letter
+    doc = SimpleDocTemplate(buffer, pagesize=pagesize)
+    styles = getSampleStyleSheet()
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+    elements = [
+        Paragraph(f"A-Z Household Services - {report['title']} Report", styles['Title']),
+        Spacer(1, 20),
+        Paragraph(f"Period: {report['period']}", styles['Normal']),
+        Paragraph(f"Report ID: {report_id}", styles['Normal']),
+        Paragraph(f"Generated: {report['generated_at'].strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Spacer(1, 20),
+        Paragraph("Summary", styles['Heading2']),
+    ]
+
+    summary = Table([["Metric", "Value"]] + [list(item) for item in report['summary']], colWidths=[300, 200])
+    summary.setStyle(table_style)
+    elements += [summary, Spacer(1, 20), Paragraph(report['title'], styles['Heading2'])]
+
+    if report['rows']:
+        details = Table([report['columns']] + report['rows'], repeatRows=1)
+        details.setStyle(table_style)
+        elements.append(details)
+    else:
+        elements.append(Paragraph("No activity in this period", styles['Normal']))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+@celery.task
+def generate_admin_report(job_id):
+    """
+    Computes the admin report of a ReportJob once and stores its HTML and
+    PDF artifacts, which the admin report routes then serve from disk.
+
+    Args:
+        job_id: ID of the ReportJob to process
+
+    Returns:
+        The path to the stored HTML report
+    """
+    job = ReportJob.query.get(job_id)
+    if not job:
+        print(f"Report job {job_id} not found")
+        return None
+    if job.status == 'completed' and job.html_path and os.path.exists(job.html_path):
+        return job.html_path
+
+    try:
+        job.status = 'processing'
+        db.session.commit()
+
+        report = build_report(job.report_type, job.start_date, job.end_date)
+        html_content = get_report_template('admin_report.html').render(report=report, report_id=job.id)
+        job.html_path, job.html_hash = store_report_artifact(html_content.encode('utf-8'), job.report_type, 'html')
+
+        pdf_content = render_admin_report_pdf(report, job.id, html_content)
+        if pdf_content is not None:
+            job.pdf_path, job.pdf_hash = store_report_artifact(pdf_content, job.report_type, 'pdf')
+        else:
+            job.pdf_path, job.pdf_hash = None, None
+
+        job.status = 'completed'
+        job.error_message = None
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+
+        return job.html_path
+
+    except Exception as e:
+        print(f"Error in report task: {str(e)}")
+        db.session.rollback()
+
+        try:
+            job.status = 'failed'
+            job.error_message = str(e)
+            db.session.commit()
+        except Exception as inner_e:
+            print(f"Failed to update report job status: {str(inner_e)}")
+
+        return None
@@ -1,48 +1,50 @@
 from tasks.celery_config import make_celery
 from models.models import db, ServiceRequest, Professional, User
-from flask_mail import Mail, Message
+from flask_mail import Message
+from utils.mailer import send_batch
 from datetime import datetime, timedelta
 import requests
 import os 
 
 celery = make_celery()
-mail = Mail()
 
 @celery.task
 def send_daily_reminders():
 
-    from app import create_app
-    app = create_app()
+    pending_requests = ServiceRequest.query.filter_by(service_status='pending').all()
 
-    with app.app_context():
+    professionals_to_notify = {}
 
-        pending_requests = ServiceRequest.query.filter_by(service_status='pending').all()
-
-        professionals_to_notify = {}
+    for req in pending_requests:
+        if req.professional_id and req.professional_id not in professionals_to_notify:
+            professionals_to_notify[req.professional_id] = []
+        
+        if req.professional_id:
+            professionals_to_notify[req.professional_id].append({
+                'request_id': req.id,
+                'service_name': req.service.name,
+                'customer_name': req.customer.user.username,
+                'date_of_request': req.date_of_request
+            })
 
-        for req in pending_requests:
-            if req.professional_id and req.professional_id not in professionals_to_notify:
-                professionals_to_notify[req.professional_id] = []
-            
-            if req.professional_id:
-                professionals_to_notify[req.professional_id].append({
-                    'request_id': req.id,
-                    'service_name': req.service.name,
-                    'customer_name': req.customer.user.username,
-                    'date_of_request': req.date_of_request
-                })
+    
+    messages = []
+    for prof_id, reqs in professionals_to_notify.items():
+        prof = Professional.query.get(prof_id)
+        if prof and prof.user:
+            msg = build_remainder_notification(prof.user, reqs)
+            if msg:
+                messages.append(msg)
 
-        
-        for prof_id, reqs in professionals_to_notify.items():
-            prof = Professional.query.get(prof_id)
-            if prof and prof.user:
-                send_remainder_notification(prof.user, reqs)
+    # Send every reminder over one SMTP connection
+    if messages:
+        send_batch(messages)
 
 
-def send_remainder_notification(user, reqs):
+def build_remainder_notification(user, reqs):
 
     if not user.email:
-        return
+        return None
     
     subject = "Reminder: You have pending service requests"
     
@@ -56,15 +58,9 @@ def send_remainder_notification(user, reqs):
     body += "\nPlease log in to your account to manage these requests.\n\n"
     body += "Thank you,\nA-Z Household Services Team"
 
-
-    try:
-        msg = Message(
-            subject = subject,
-            recipients = [user.email],
-            body = body,
-            sender = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@household-services.com')
-        )
-        mail.send(msg)
-
-    except Exception as e:
-        print(f'Error sending email to {user.email}: {e}')
+    return Message(
+        subject = subject,
+        recipients = [user.email],
+        body = body,
+        sender = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@household-services.com')
+    )
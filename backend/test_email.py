@@ -76,7 +76,47 @@ You can now use the email notification features in the application.
         print("4. Check your .env file contains all required mail settings")
         return False
 
+def test_batch_throughput(recipient=None, count=100):
+    """
+    Compare one SMTP connection per message against utils.mailer.send_batch.
+    Point MAIL_SERVER/MAIL_PORT at a local debugging server first, e.g.
+    `python -m aiosmtpd -n -l localhost:8025` with MAIL_PORT=8025 MAIL_USE_TLS=False
+    """
+    import time
+    from utils.mailer import send_batch
+
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER=os.getenv('MAIL_SERVER', 'localhost'),
+        MAIL_PORT=int(os.getenv('MAIL_PORT', 8025)),
+        MAIL_USE_TLS=os.getenv('MAIL_USE_TLS', 'False').lower() in ('true', '1', 't'),
+        MAIL_USERNAME=os.getenv('MAIL_USERNAME', None),
+        MAIL_PASSWORD=os.getenv('MAIL_PASSWORD', None),
+        MAIL_DEFAULT_SENDER=os.getenv('MAIL_DEFAULT_SENDER', 'noreply@household-services.com')
+    )
+    mail = Mail(app)
+    recipient = recipient or 'test@example.com'
+
+    with app.app_context():
+        messages = [
+            Message(subject=f"Batch test {i}", recipients=[recipient], body="Batch delivery test")
+            for i in range(count)
+        ]
+
+        start = time.perf_counter()
+        for msg in messages:
+            mail.send(msg)
+        single = count / (time.perf_counter() - start)
+        print(f"One connection per message: {single:.1f} msg/s")
+
+        result = send_batch(messages)
+        print(f"Batched connection: {result['rate']:.1f} msg/s ({result['sent']} sent, {len(result['failed'])} failed)")
+
+
 if __name__ == "__main__":
     import sys
     recipient = sys.argv[1] if len(sys.argv) > 1 else None
-    test_email(recipient) 
\ No newline at end of file
+    if len(sys.argv) > 2:
+        test_batch_throughput(recipient, int(sys.argv[2]))
+    else:
+        test_email(recipient) 
\ No newline at end of file
@@ -0,0 +1,97 @@
+import os
+
+# In-memory database and a cache without Redis, set before the app is imported
+os.environ['DATABASE_URI'] = 'sqlite://'
+
+import pytest
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from cache.cache_config import cache
+
+cache.config['CACHE_TYPE'] = 'NullCache'
+
+from app import create_app
+from models.models import db, User, Customer, Professional, Service, ServiceRequest, Review
+
+PASSWORD = 'password'
+STATUSES = ['requested', 'assigned', 'accepted', 'completed', 'closed']
+
+
+def seed(services=3, customers=10, professionals=10, requests=50):
+    service_rows = [Service(name=f'Service {i}', description=f'Service {i}', base_price=100 + i, time_required=60)
+                    for i in range(services)]
+    db.session.add_all(service_rows)
+    db.session.flush()
+
+    customer_rows = []
+    for i in range(customers):
+        user = User(username=f'customer{i}', email=f'customer{i}@example.com', role='customer')
+        user.set_password(PASSWORD)
+        customer_rows.append(Customer(user=user, address=f'Address {i}', pin_code=f'6000{i:02d}'))
+    professional_rows = []
+    for i in range(professionals):
+        user = User(username=f'professional{i}', email=f'professional{i}@example.com', role='professional')
+        user.set_password(PASSWORD)
+        professional_rows.append(Professional(user=user, service_id=service_rows[i % services].id,
+                                              experience=i, verification_status='approved'))
+    db.session.add_all(customer_rows + professional_rows)
+    db.session.flush()
+
+    for i in range(requests):
+        status = STATUSES[i % len(STATUSES)]
+        # Every request of the first customer and professional, so their lists are full pages
+        professional = professional_rows[0] if status != 'requested' else None
+        service_request = ServiceRequest(
+            service_id=professional.service_id if professional else service_rows[0].id,
+            customer_id=customer_rows[0].id if i % 2 else customer_rows[i % customers].id,
+            professional_id=professional.id if professional else None,
+            service_status=status,
+            date_of_request=datetime(2026, 1 + i % 9, 1 + i % 28),
+            date_of_completion=datetime(2026, 10, 1) if status in ('completed', 'closed') else None
+        )
+        db.session.add(service_request)
+        db.session.flush()
+        if status in ('completed', 'closed'):
+            db.session.add(Review(service_request_id=service_request.id, rating=1 + i % 5, comments='Good'))
+    db.session.commit()
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        seed()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, username, password=PASSWORD):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+class QueryCounter:
+    """Counts the statements sent to the database inside a `with` block"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
@@ -0,0 +1,76 @@
+"""
+The hot service request queries use the composite indexes declared on
+ServiceRequest. Checked with EXPLAIN QUERY PLAN on the in-memory SQLite
+database, and with EXPLAIN on PostgreSQL when DATABASE_URL points to an
+empty PostgreSQL database the tests may create tables in.
+"""
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from models.models import db, ServiceRequest, Review
+from utils.service_requests import service_request_query, available_requests_query
+
+POSTGRES_URL = os.getenv('DATABASE_URL', '')
+
+HOT_QUERIES = {
+    'customer request list': (
+        lambda: service_request_query().filter_by(customer_id=1).filter(ServiceRequest.service_status == 'requested'),
+        'ix_service_requests_customer_status'),
+    'customer active requests': (
+        lambda: service_request_query().filter_by(customer_id=1).filter(
+            ServiceRequest.service_status.in_(['requested', 'assigned', 'accepted', 'in_progress', 'completed'])
+        ),
+        'ix_service_requests_customer_status'),
+    'professional request list': (
+        lambda: service_request_query().filter_by(professional_id=1).filter(ServiceRequest.service_status == 'accepted'),
+        'ix_service_requests_professional_status'),
+    'available request pool': (
+        lambda: available_requests_query(1).order_by(ServiceRequest.id),
+        'ix_service_requests_service_status_professional'),
+    'requests in a date range': (
+        lambda: db.session.query(ServiceRequest.id).filter(
+            ServiceRequest.date_of_request >= datetime(2026, 1, 1),
+            ServiceRequest.date_of_request < datetime(2026, 2, 1)
+        ),
+        'ix_service_requests_date_of_request'),
+    'review of a request': (
+        lambda: Review.query.filter_by(service_request_id=1),
+        'ix_reviews_service_request_id'),
+}
+
+
+def compiled(query, dialect):
+    return str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_sqlite_plan_uses_index(app, name):
+    build_query, index = HOT_QUERIES[name]
+    with app.app_context():
+        sql = compiled(build_query(), db.engine.dialect)
+        plan = [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    assert any(index in line for line in plan), '\n'.join(plan)
+
+
+@pytest.fixture(scope='module')
+def postgres_engine(app):
+    if not POSTGRES_URL.startswith('postgresql'):
+        pytest.skip('DATABASE_URL does not point to PostgreSQL')
+    engine = create_engine(POSTGRES_URL)
+    with app.app_context():
+        db.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_postgres_plan_uses_index(app, postgres_engine, name):
+    build_query, index = HOT_QUERIES[name]
+    with app.app_context():
+        sql = compiled(build_query(), postgres_engine.dialect)
+    with postgres_engine.connect() as conn:
+        # Empty tables are cheaper to scan; only ask whether the index can be used
+        conn.execute(text('SET enable_seqscan = off'))
+        plan = [row[0] for row in conn.execute(text(f'EXPLAIN {sql}'))]
+    assert any(index in line for line in plan), '\n'.join(plan)
@@ -0,0 +1,69 @@
+import smtplib
+from contextlib import contextmanager
+from flask_mail import Message
+from utils import mailer
+from utils.mailer import send_batch
+
+
+class FakeConnection:
+    """Stands in for a flask_mail connection and refuses some recipients"""
+
+    def __init__(self, refused, delivered):
+        self.refused = refused
+        self.delivered = delivered
+
+    def send(self, msg):
+        recipient = msg.recipients[0]
+        if recipient in self.refused:
+            raise smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')})
+        self.delivered.append(recipient)
+
+
+def fake_mail(app, monkeypatch, refused):
+    delivered = []
+
+    @contextmanager
+    def connect():
+        yield FakeConnection(refused, delivered)
+
+    monkeypatch.setattr(app.extensions['mail'], 'connect', connect)
+    monkeypatch.setattr(mailer.time, 'sleep', lambda seconds: None)
+    return delivered
+
+
+def messages(*recipients):
+    return [Message(subject='Test', recipients=[recipient], body='Test', sender='noreply@example.com')
+            for recipient in recipients]
+
+
+def test_rejected_recipient_does_not_stop_the_batch(app, monkeypatch):
+    delivered = fake_mail(app, monkeypatch, refused={'bad@example.com'})
+    batch = messages('a@example.com', 'bad@example.com', 'c@example.com', 'd@example.com')
+
+    with app.app_context():
+        result = send_batch(batch)
+
+    assert delivered == ['a@example.com', 'c@example.com', 'd@example.com']
+    assert result['sent'] == 3
+    assert [msg.recipients for msg in result['failed']] == [['bad@example.com']]
+
+
+def test_on_sent_is_called_for_delivered_messages_only(app, monkeypatch):
+    fake_mail(app, monkeypatch, refused={'bad@example.com'})
+    acknowledged = []
+
+    with app.app_context():
+        send_batch(messages('bad@example.com', 'a@example.com'), on_sent=lambda msg: acknowledged.append(msg.recipients[0]))
+
+    assert acknowledged == ['a@example.com']
+
+
+def test_on_failed_gets_the_rejection_of_every_attempt(app, monkeypatch):
+    fake_mail(app, monkeypatch, refused={'bad@example.com'})
+    rejected = []
+
+    with app.app_context():
+        send_batch(messages('bad@example.com', 'a@example.com'), max_retries=1,
+                   on_failed=lambda msg, error: rejected.append((msg.recipients[0], type(error))))
+
+    assert rejected == [('bad@example.com', smtplib.SMTPRecipientsRefused)] * 2
@@ -0,0 +1,21 @@
+from models.models import db, Professional, ProfessionalStats
+
+
+def stats(professional_id):
+    row = db.session.get(ProfessionalStats, professional_id, populate_existing=True)
+    return row and (row.review_count, row.rating_sum, row.completed_count)
+
+
+def test_increment_creates_then_adds_to_the_row(app):
+    with app.app_context():
+        professional_id = Professional.query.order_by(Professional.id.desc()).first().id
+        ProfessionalStats.query.filter_by(professional_id=professional_id).delete()
+        try:
+            ProfessionalStats.increment(professional_id, review_count=1, rating_sum=4)
+            assert stats(professional_id) == (1, 4, 0)
+
+            ProfessionalStats.increment(professional_id, review_count=1, rating_sum=5, completed_count=1)
+            assert stats(professional_id) == (2, 9, 1)
+        finally:
+            db.session.rollback()
+
@@ -0,0 +1,47 @@
+"""
+The list endpoints load their rows and relationships in a fixed number of
+queries. A lazy load that sneaks into a serializer turns into one query per
+row, which these budgets catch. Run from backend/ with `python -m pytest`.
+"""
+import pytest
+from conftest import login, QueryCounter
+
+# Statements per request, including the authentication lookup
+QUERY_BUDGET = 3
+
+# The admin user create_app() adds
+ADMIN_PASSWORD = 'admin123'
+
+LIST_ENDPOINTS = {
+    'admin': [
+        '/api/admin/service-requests',
+        '/api/admin/customers',
+        '/api/admin/users',
+        '/api/admin/professionals',
+        '/api/admin/services',
+    ],
+    'customer0': [
+        '/api/customer/service-requests',
+        '/api/customer/service-requests/active',
+        '/api/customer/professionals',
+        '/api/customer/services',
+    ],
+    'professional0': [
+        '/api/professional/service-requests',
+        '/api/professional/available-requests',
+    ],
+}
+
+
+@pytest.mark.parametrize('username,url', [
+    (username, url) for username, urls in LIST_ENDPOINTS.items() for url in urls
+])
+def test_list_endpoint_query_budget(client, username, url):
+    headers = login(client, username, ADMIN_PASSWORD) if username == 'admin' else login(client, username)
+
+    with QueryCounter() as queries:
+        response = client.get(url, headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json(), 'seed data should make the list non-empty'
+    assert queries.count <= QUERY_BUDGET, '\n'.join(queries.statements)
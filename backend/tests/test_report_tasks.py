@@ -0,0 +1,54 @@
+import os
+from datetime import datetime
+from models.models import db, MonthlyReportDelivery
+from tasks.report_tasks import (
+    REPORT_DISPATCH_TIMEOUT, REPORT_MAX_ATTEMPTS, claim_customer_chunk, fail_exhausted_deliveries, get_report_template,
+    month_range
+)
+
+PERIOD = '2026-03'
+
+
+def claim_all():
+    return claim_customer_chunk(PERIOD, *month_range(PERIOD), after_id=0)
+
+
+def expire_dispatches():
+    MonthlyReportDelivery.query.filter_by(period=PERIOD).update(
+        {MonthlyReportDelivery.dispatched_at: datetime.utcnow() - REPORT_DISPATCH_TIMEOUT * 2})
+    db.session.commit()
+
+
+def test_unsent_deliveries_stop_after_max_attempts(app):
+    with app.app_context():
+        try:
+            customer_ids = claim_all()
+            assert customer_ids
+
+            for _ in range(2, REPORT_MAX_ATTEMPTS + 1):
+                expire_dispatches()
+                assert fail_exhausted_deliveries(PERIOD) == 0
+                assert claim_all() == customer_ids
+
+            deliveries = MonthlyReportDelivery.query.filter_by(period=PERIOD).all()
+            assert {delivery.attempts for delivery in deliveries} == {REPORT_MAX_ATTEMPTS}
+
+            expire_dispatches()
+            assert fail_exhausted_deliveries(PERIOD) == len(customer_ids)
+            assert claim_all() == []
+            assert {delivery.status for delivery in MonthlyReportDelivery.query.filter_by(period=PERIOD)} == {'failed'}
+        finally:
+            MonthlyReportDelivery.query.filter_by(period=PERIOD).delete()
+            db.session.commit()
+
+
+def test_report_templates_are_compiled_once_into_the_app_cache_dir(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, 'REPORT_TEMPLATE_CACHE_DIR', str(tmp_path))
+    with app.app_context():
+        app.extensions.pop('report_env', None)
+        try:
+            template = get_report_template('monthly_report.html')
+            assert get_report_template('monthly_report.html') is template
+            assert os.listdir(tmp_path)
+        finally:
+            app.extensions.pop('report_env', None)
@@ -0,0 +1,46 @@
+import pytest
+from cachelib import SimpleCache
+from cache import tiered_cache
+from cache.cache_config import cache
+from cache.tiered_cache import cached_value, invalidate, local_cache
+
+
+@pytest.fixture
+def redis_tier(app, monkeypatch):
+    """A working shared tier in place of the NullCache the suite runs with"""
+    monkeypatch.setitem(app.extensions['cache'], cache, SimpleCache())
+    local_cache.clear()
+    with app.app_context():
+        yield
+    local_cache.clear()
+
+
+def test_cached_none_is_a_hit(redis_tier):
+    calls = []
+    compute = lambda: calls.append(1)
+
+    assert cached_value('tiered_none', compute, timeout=60) is None
+    # Served by the local tier alone
+    cache.clear()
+    assert cached_value('tiered_none', compute, timeout=60) is None
+    assert len(calls) == 1
+
+
+def test_recompute_outliving_the_lock_is_stored(redis_tier):
+    def slow_compute():
+        # The recompute lock expires before the value is ready
+        cache.delete(tiered_cache._lock_key('tiered_slow'))
+        return 'fresh'
+
+    assert cached_value('tiered_slow', slow_compute, timeout=60) == 'fresh'
+    assert tiered_cache._get_entry('tiered_slow')['value'] == 'fresh'
+
+
+def test_value_computed_across_an_invalidation_is_not_stored(redis_tier):
+    def racing_compute():
+        invalidate(['tiered_racing'])
+        return 'stale'
+
+    assert cached_value('tiered_racing', racing_compute, timeout=60) == 'stale'
+    assert tiered_cache._get_entry('tiered_racing') is None
+    assert cached_value('tiered_racing', lambda: 'fresh', timeout=60) == 'fresh'
@@ -0,0 +1,111 @@
+import pytest
+from cachelib import SimpleCache
+from cache.cache_config import cache
+from models.models import db, User
+from utils.tokens import revoke_user_tokens
+from conftest import PASSWORD
+
+
+class UnreachableCache(SimpleCache):
+    """A cache whose reads and adds fail, like Redis during an outage"""
+
+    def get_many(self, *keys):
+        raise ConnectionError('cache unreachable')
+
+    def add(self, key, value, timeout=None):
+        raise ConnectionError('cache unreachable')
+
+
+def use_cache(app, monkeypatch, backend):
+    # The tests run with NullCache, which cannot hold a revocation
+    monkeypatch.setitem(app.extensions['cache'], cache, backend)
+
+
+@pytest.fixture
+def token_client(app, monkeypatch):
+    use_cache(app, monkeypatch, SimpleCache())
+    # No session cookie, so every request authenticates with its token
+    return app.test_client(use_cookies=False)
+
+
+def login(client, username, password=PASSWORD):
+    response = client.post('/api/auth/login', json={'username': username, 'password': password})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def bearer(tokens):
+    return {'Authorization': f"Bearer {tokens['token']}"}
+
+
+def refresh(client, tokens):
+    return client.post('/api/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+
+
+def test_refresh_token_is_single_use(token_client):
+    tokens = login(token_client, 'customer2')
+
+    first = refresh(token_client, tokens)
+    assert first.status_code == 200
+    assert refresh(token_client, tokens).status_code == 401
+    # The new pair works
+    assert refresh(token_client, first.get_json()).status_code == 200
+
+
+def test_logout_revokes_access_and_refresh_tokens(token_client):
+    tokens = login(token_client, 'customer3')
+    assert token_client.get('/api/customer/service-requests', headers=bearer(tokens)).status_code == 200
+
+    response = token_client.post('/api/auth/logout', headers=bearer(tokens),
+                                 json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+
+    assert token_client.get('/api/customer/service-requests', headers=bearer(tokens)).status_code == 401
+    assert refresh(token_client, tokens).status_code == 401
+
+
+def test_revoke_user_tokens_revokes_every_issued_token(app, token_client):
+    tokens = login(token_client, 'customer4')
+    other = login(token_client, 'customer4')
+
+    with app.app_context():
+        user = User.query.filter_by(username='customer4').one()
+        revoke_user_tokens(user.id)
+
+    for pair in (tokens, other):
+        assert token_client.get('/api/customer/service-requests', headers=bearer(pair)).status_code == 401
+        assert refresh(token_client, pair).status_code == 401
+
+
+def test_unreachable_cache_allows_reads_only(app, monkeypatch):
+    client = app.test_client(use_cookies=False)
+    use_cache(app, monkeypatch, SimpleCache())
+    customer = login(client, 'customer5')
+    admin = login(client, 'admin', 'admin123')
+
+    use_cache(app, monkeypatch, UnreachableCache())
+    # Reads fall back to the user row
+    assert client.get('/api/customer/service-requests', headers=bearer(customer)).status_code == 200
+    # Writes, admin requests and refreshes are refused
+    assert client.post('/api/customer/service-requests', headers=bearer(customer), json={}).status_code == 503
+    assert client.get('/api/admin/users', headers=bearer(admin)).status_code == 503
+    assert refresh(client, customer).status_code == 503
+
+
+def test_unreachable_cache_rejects_deactivated_users(app, monkeypatch):
+    client = app.test_client(use_cookies=False)
+    use_cache(app, monkeypatch, SimpleCache())
+    tokens = login(client, 'customer6')
+
+    with app.app_context():
+        user = User.query.filter_by(username='customer6').one()
+        user.is_active = False
+        db.session.commit()
+    try:
+        use_cache(app, monkeypatch, UnreachableCache())
+        assert client.get('/api/customer/service-requests', headers=bearer(tokens)).status_code == 401
+    finally:
+        with app.app_context():
+            user = User.query.filter_by(username='customer6').one()
+            user.is_active = True
+            db.session.commit()
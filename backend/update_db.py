@@ -22,6 +22,49 @@ with app.app_context():
     except Exception as e:
         print(f"Error adding column: {e}")
         
+    # Add export progress columns to export_jobs table if they don't exist
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('ALTER TABLE export_jobs ADD COLUMN total_rows INTEGER'))
+            conn.commit()
+        print("Added total_rows column to export_jobs table")
+    except Exception as e:
+        print(f"Error adding column: {e}")
+
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('ALTER TABLE export_jobs ADD COLUMN processed_rows INTEGER DEFAULT 0'))
+            conn.commit()
+        print("Added processed_rows column to export_jobs table")
+    except Exception as e:
+        print(f"Error adding column: {e}")
+        
+    # Add the export file format column to export_jobs table if it doesn't exist
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text("ALTER TABLE export_jobs ADD COLUMN file_format VARCHAR(20) DEFAULT 'csv'"))
+            conn.commit()
+        print("Added file_format column to export_jobs table")
+    except Exception as e:
+        print(f"Error adding column: {e}")
+        
+    # Add the delivery attempt columns to monthly_report_deliveries table if they don't exist
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('ALTER TABLE monthly_report_deliveries ADD COLUMN attempts INTEGER DEFAULT 0'))
+            conn.commit()
+        print("Added attempts column to monthly_report_deliveries table")
+    except Exception as e:
+        print(f"Error adding column: {e}")
+
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('ALTER TABLE monthly_report_deliveries ADD COLUMN last_error TEXT'))
+            conn.commit()
+        print("Added last_error column to monthly_report_deliveries table")
+    except Exception as e:
+        print(f"Error adding column: {e}")
+
     # Recreate the database
     # db.drop_all()
     # db.create_all()
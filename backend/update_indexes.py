@@ -0,0 +1,23 @@
+from app import create_app, db
+from models.models import Professional, Customer, ServiceRequest, Review
+
+app = create_app()
+
+with app.app_context():
+    # Add the indexes declared on the models to an existing database
+    for model in (ServiceRequest, Review, Professional, Customer):
+        for index in model.__table__.indexes:
+            try:
+                index.create(bind=db.engine, checkfirst=True)
+                print(f"Created index {index.name}")
+            except Exception as e:
+                print(f"Error creating index {index.name}: {e}")
+
+    # Refresh planner statistics so the new indexes are picked up
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(db.text('ANALYZE'))
+            conn.commit()
+        print("Analyzed database")
+    except Exception as e:
+        print(f"Error analyzing database: {e}")
@@ -0,0 +1,13 @@
+from app import create_app, db
+from models.models import MonthlyMetrics
+
+app = create_app()
+
+with app.app_context():
+    # Create the monthly_metrics table if needed and fill it from existing data.
+    # Run once when upgrading: the nightly finalize_monthly_metrics task also
+    # backfills closed months, but only after the first night.
+    db.create_all()
+    MonthlyMetrics.rebuild()
+    months = db.session.query(MonthlyMetrics.year, MonthlyMetrics.month).distinct().count()
+    print(f"Rebuilt monthly metrics for {months} months")
@@ -0,0 +1,10 @@
+from app import create_app, db
+from models.models import ProfessionalStats
+
+app = create_app()
+
+with app.app_context():
+    # Create the professional_stats table if needed and fill it from existing data
+    db.create_all()
+    ProfessionalStats.rebuild()
+    print(f"Rebuilt professional stats for {ProfessionalStats.query.count()} professionals")
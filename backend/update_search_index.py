@@ -0,0 +1,15 @@
+from app import create_app, db
+from utils.search import rebuild_search_index
+
+app = create_app()
+
+with app.app_context():
+    # create_app() creates a missing search index; this refills an existing
+    # one, e.g. after rows were changed with the triggers disabled
+    try:
+        if rebuild_search_index():
+            print("Rebuilt search index")
+        else:
+            print(f"No full-text search for {db.engine.dialect.name}, searches use LIKE")
+    except Exception as e:
+        print(f"Error rebuilding search index: {e}")
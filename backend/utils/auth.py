@@ -1,21 +1,50 @@
-from flask import request, jsonify, current_app
-from flask.globals import _request_ctx_stack
+from flask import request, jsonify, current_app, g
 from flask_login import current_user
-from models.models import User
+from models.models import db, User, Professional
+from sqlalchemy.orm import joinedload
+from cache.tiered_cache import LocalCache
+from utils.tokens import JWT_CLAIMS_MODE, token_type, is_revoked, RevocationUnavailable
 from functools import wraps
+import hashlib
+import time
 import jwt
 import logging
+import os
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def verify_jwt_token(token):
+# Per-request auth tracing is only logged when AUTH_DEBUG is set
+AUTH_DEBUG = os.getenv('AUTH_DEBUG', 'False').lower() in ('true', '1', 't')
+if AUTH_DEBUG:
+    logger.setLevel(logging.DEBUG)
+
+# Verified token payloads, keyed by token hash and kept until the token expires
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 1024))
+_token_cache = LocalCache(max_size=TOKEN_CACHE_SIZE)
+
+# Marks "no authenticated user" on g, since None means "not resolved yet"
+_ANONYMOUS = object()
+
+# When the revocation set cannot be read, only read-only requests with a
+# non-admin access token go on, and then through the database-backed user
+# lookup rather than the token claims. Everything else is refused with 503.
+REVOCATION_FALLBACK_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def _token_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def _decode_jwt_token(token):
+    key = _token_key(token)
+    payload = _token_cache.get(key)
+    if payload is not None:
+        return payload
+
     try:
-        logger.info(f"Verifying JWT token: {token[:10]}...")
+        logger.debug("Verifying JWT token: %s...", token[:10])
         payload = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=['HS256'])
-        logger.info(f"Token valid, payload: {payload}")
-        return payload
+        logger.debug("Token valid, payload: %s", payload)
     except jwt.ExpiredSignatureError:
         logger.warning("Token expired")
         return None
@@ -26,39 +55,177 @@ def verify_jwt_token(token):
         logger.error(f"Token verification error: {str(e)}")
         return None
 
-def get_current_user():
+    expires_in = payload.get('exp', 0) - time.time()
+    if expires_in > 0:
+        _token_cache.set(key, payload, timeout=expires_in)
+    return payload
+
+def verify_jwt_token(token, expected_type='access'):
+    """
+    Return the payload of a valid, unrevoked token of the expected type.
+    Signature checks are cached per process; the revocation set is not.
+    """
+    payload = _decode_jwt_token(token)
+    if payload is None:
+        return None
+
+    if token_type(payload) != expected_type:
+        logger.warning(f"Expected {expected_type} token, got {token_type(payload)} token")
+        return None
+
+    try:
+        revoked = is_revoked(payload)
+    except RevocationUnavailable as e:
+        if not _revocation_fallback_allowed(payload, expected_type):
+            logger.warning(f"Token refused, revocation check unavailable: {e}")
+            g.auth_unavailable = True
+            return None
+        logger.warning(f"Revocation check unavailable, checking the user in the database: {e}")
+        g.revocation_unchecked = True
+        revoked = False
+
+    if revoked:
+        logger.warning("Token revoked")
+        return None
+
+    return payload
+
+def _revocation_fallback_allowed(payload, expected_type):
+    return (expected_type == 'access' and payload.get('role') != 'admin'
+            and request.method in REVOCATION_FALLBACK_METHODS)
+
+def get_bearer_token():
+    auth_header = request.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return None
+
+def _resolve_token_claims():
+    token = get_bearer_token()
+    if not token:
+        logger.warning("No Authorization header with Bearer token found")
+        return None
+
+    logger.debug("Found token in Authorization header: %s...", token[:10])
+    payload = verify_jwt_token(token)
+    if not payload:
+        logger.warning("Invalid or expired token")
+    return payload
+
+def get_token_claims():
+    """Verified claims of this request's bearer token, memoized on g"""
+    claims = g.get('token_claims')
+    if claims is None:
+        claims = _resolve_token_claims() or _ANONYMOUS
+        g.token_claims = claims
+    return None if claims is _ANONYMOUS else claims
+
+def load_user(user_id):
     """
-    Get the current user from either session or JWT token
+    Load a user together with their customer or professional profile in one
+    joined query, so role and verification checks need no further queries.
+    Also used as the flask_login user loader.
     """
+    return User.query.options(
+        joinedload(User.customer),
+        joinedload(User.professional)
+    ).filter(User.id == user_id).first()
+
+def _resolve_current_user():
     if current_user.is_authenticated:
-        logger.info(f"User authenticated via session: {current_user.username} (ID: {current_user.id})")
+        logger.debug("User authenticated via session: %s (ID: %s)", current_user.username, current_user.id)
         return current_user
-    
+
     # Check if user is authenticated via JWT token
-    auth_header = request.headers.get('Authorization')
-    if auth_header and auth_header.startswith('Bearer '):
-        token = auth_header.split(' ')[1]
-        logger.info(f"Found token in Authorization header: {token[:10]}...")
-        payload = verify_jwt_token(token)
-        
-        if payload:
-            user_id = payload.get('user_id')
-            if user_id:
-                user = User.query.get(user_id)
-                if user:
-                    logger.info(f"User authenticated via token: {user.username} (ID: {user.id})")
-                    return user
-                else:
-                    logger.warning(f"User ID {user_id} from token not found in database")
+    payload = get_token_claims()
+    if payload:
+        user_id = payload.get('user_id')
+        if user_id:
+            user = load_user(user_id)
+            if user and g.get('revocation_unchecked') and not user.is_active:
+                logger.warning(f"User ID {user_id} from unchecked token is deactivated")
+                return None
+            if user:
+                logger.debug("User authenticated via token: %s (ID: %s)", user.username, user.id)
+                return user
             else:
-                logger.warning("No user_id in token payload")
+                logger.warning(f"User ID {user_id} from token not found in database")
         else:
-            logger.warning("Invalid or expired token")
-    else:
-        logger.warning("No Authorization header with Bearer token found")
-    
+            logger.warning("No user_id in token payload")
+
     return None
 
+def get_current_user():
+    """
+    Get the current user from either session or JWT token.
+    Resolved once per request and memoized on g.
+    """
+    user = g.get('current_user')
+    if user is None:
+        user = _resolve_current_user() or _ANONYMOUS
+        g.current_user = user
+    return None if user is _ANONYMOUS else user
+
+def _uses_token_claims():
+    # Session logins already load the User row through flask_login, and a
+    # token whose revocation could not be checked is checked against it
+    if not JWT_CLAIMS_MODE or current_user.is_authenticated:
+        return False
+    get_token_claims()
+    return not g.get('revocation_unchecked')
+
+def get_current_identity():
+    """
+    (username, role) of the caller, or None. In claims mode a bearer token
+    is trusted as is, without loading the user.
+    """
+    if _uses_token_claims():
+        claims = get_token_claims()
+        return (claims['username'], claims['role']) if claims and claims.get('role') else None
+
+    user = get_current_user()
+    return (user.username, user.role) if user else None
+
+def current_profile_id(role):
+    """
+    The caller's customer or professional id, taken from the token claims
+    in claims mode and from the user's profile row otherwise.
+    """
+    if _uses_token_claims():
+        claims = get_token_claims()
+        if claims and claims.get(f'{role}_id'):
+            return claims[f'{role}_id']
+
+    profile = getattr(get_current_user(), role, None)
+    return profile.id if profile else None
+
+def get_current_professional():
+    """
+    The caller's Professional row. In claims mode it is fetched by the id in
+    the token, without loading the user.
+    """
+    if _uses_token_claims():
+        claims = get_token_claims()
+        if claims and claims.get('professional_id'):
+            return db.session.get(Professional, claims['professional_id'])
+
+    user = get_current_user()
+    return user.professional if user else None
+
+def current_verification_status():
+    if _uses_token_claims():
+        claims = get_token_claims()
+        return claims.get('verification_status') if claims else None
+
+    professional = getattr(get_current_user(), 'professional', None)
+    return professional.verification_status if professional else None
+
+def current_customer_id():
+    return current_profile_id('customer')
+
+def current_professional_id():
+    return current_profile_id('professional')
+
 def role_required(role):
     """
     Decorator for checking if the user has the required role
@@ -66,30 +233,32 @@ def role_required(role):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            user = get_current_user()
-            
-            if not user:
+            identity = get_current_identity()
+
+            if not identity and g.get('auth_unavailable'):
+                return jsonify({'message': 'Authentication is temporarily unavailable'}), 503
+
+            if not identity:
                 logger.warning(f"Authentication required for {request.path}")
                 return jsonify({'message': 'Authentication required'}), 401
-            
-            logger.info(f"Checking if user {user.username} has role: {role} (actual role: {user.role})")
-            
-            if role == 'admin' and not user.is_admin():
-                logger.warning(f"Admin access required for {request.path}, but user is {user.role}")
+
+            username, user_role = identity
+            logger.debug("Checking if user %s has role: %s (actual role: %s)", username, role, user_role)
+
+            if role == 'admin' and user_role != 'admin':
+                logger.warning(f"Admin access required for {request.path}, but user is {user_role}")
                 return jsonify({'message': 'Admin access required'}), 403
-                
-            if role == 'professional' and not user.is_professional():
-                logger.warning(f"Professional access required for {request.path}, but user is {user.role}")
+
+            if role == 'professional' and user_role != 'professional':
+                logger.warning(f"Professional access required for {request.path}, but user is {user_role}")
                 return jsonify({'message': 'Professional access required'}), 403
-                
-            if role == 'customer' and not user.is_customer():
-                logger.warning(f"Customer access required for {request.path}, but user is {user.role}")
+
+            if role == 'customer' and user_role != 'customer':
+                logger.warning(f"Customer access required for {request.path}, but user is {user_role}")
                 return jsonify({'message': 'Customer access required'}), 403
-            
-            # Set user for this request
-            _request_ctx_stack.top.user = user
-            logger.info(f"User {user.username} with role {user.role} granted access to {request.path}")
-            
+
+            logger.debug("User %s with role %s granted access to %s", username, user_role, request.path)
+
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -102,4 +271,13 @@ def professional_required(f):
     return role_required('professional')(f)
 
 def customer_required(f):
-    return role_required('customer')(f) 
\ No newline at end of file
+    return role_required('customer')(f)
+
+def approved_professional_required(f):
+    """Professional role plus an approved verification status"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_verification_status() != 'approved':
+            return jsonify({'message': 'Your account is not yet approved'}), 403
+        return f(*args, **kwargs)
+    return role_required('professional')(decorated_function)
@@ -0,0 +1,123 @@
+from flask import current_app
+from flask_mail import Message
+import smtplib
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Messages sent per SMTP connection / per Celery mail task
+MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', 100))
+MAIL_MAX_RETRIES = 3
+MAIL_RETRY_DELAY = 2  # seconds, multiplied by the attempt number
+
+# Errors for a single message, after which the connection is still usable.
+# SMTPSenderRefused and SMTPDataError are SMTPResponseExceptions.
+MESSAGE_REJECTED = (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException)
+
+
+def chunked(items, size):
+    """Split a list into consecutive chunks of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def message_to_dict(msg):
+    """Serialize a Message so it can be passed to a Celery task"""
+    return {
+        'subject': msg.subject,
+        'recipients': list(msg.recipients),
+        'body': msg.body,
+        'html': msg.html,
+        'sender': msg.sender
+    }
+
+
+def message_from_dict(data):
+    return Message(
+        subject=data['subject'],
+        recipients=data['recipients'],
+        body=data.get('body'),
+        html=data.get('html'),
+        sender=data.get('sender')
+    )
+
+
+def send_batch(messages, max_retries=MAIL_MAX_RETRIES, retry_delay=MAIL_RETRY_DELAY, on_sent=None, on_failed=None):
+    """
+    Sends messages over a single SMTP connection instead of one connection
+    per message.
+
+    A message that the server rejects is retried on the next attempt. If the
+    connection itself drops, the message being sent and everything after it
+    are retried on a fresh connection. Gives up after `max_retries` extra
+    attempts.
+
+    `on_sent(msg)` is called as soon as each message has been accepted, so
+    callers can record progress that survives a crash later in the batch.
+    `on_failed(msg, error)` is called each time a message fails an attempt.
+
+    Returns a dict with the number of messages sent, the messages that still
+    failed, the elapsed time and the throughput in messages per second.
+    """
+    mail = current_app.extensions['mail']
+    pending = list(messages)
+    sent = 0
+    attempt = 0
+    started = time.perf_counter()
+
+    while pending and attempt <= max_retries:
+        if attempt:
+            time.sleep(retry_delay * attempt)
+
+        failed = []
+        index = 0
+        try:
+            with mail.connect() as conn:
+                while index < len(pending):
+                    msg = pending[index]
+                    try:
+                        conn.send(msg)
+                    except smtplib.SMTPServerDisconnected:
+                        raise
+                    except MESSAGE_REJECTED as e:
+                        # The server refused this message; the connection is still usable
+                        logger.warning(f"Failed to send email to {msg.recipients}: {e}")
+                        failed.append(msg)
+                        if on_failed is not None:
+                            on_failed(msg, e)
+                    except OSError:
+                        # Connection-level failure (SMTPException is an OSError too,
+                        # which is why the rejections are caught first)
+                        raise
+                    except Exception as e:
+                        logger.warning(f"Failed to send email to {msg.recipients}: {e}")
+                        failed.append(msg)
+                        if on_failed is not None:
+                            on_failed(msg, e)
+                    else:
+                        sent += 1
+                        if on_sent is not None:
+                            on_sent(msg)
+                    index += 1
+        except (smtplib.SMTPException, OSError) as e:
+            logger.warning(f"SMTP connection failed after {index} of {len(pending)} messages: {e}")
+            failed.extend(pending[index:])
+            if on_failed is not None:
+                for msg in pending[index:]:
+                    on_failed(msg, e)
+
+        pending = failed
+        attempt += 1
+
+    elapsed = time.perf_counter() - started
+    rate = sent / elapsed if elapsed else 0.0
+    logger.info(f"Sent {sent} emails in {elapsed:.2f}s ({rate:.1f} msg/s), {len(pending)} failed")
+
+    return {
+        'sent': sent,
+        'failed': pending,
+        'elapsed': elapsed,
+        'rate': rate
+    }
@@ -0,0 +1,205 @@
+from sqlalchemy import event, inspect, update, insert
+from models.models import db, ServiceRequest, Review, Service, MonthlyMetrics, upsert_statement
+from collections import defaultdict, Counter
+from datetime import datetime
+
+# Longest history /api/admin/reports/monthly returns
+MAX_REPORT_MONTHS = 120
+
+
+def _previous(obj, attr):
+    """Value of an attribute before this flush"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _request_key(date_of_request, service_id):
+    if date_of_request is None or service_id is None:
+        return None
+    return (date_of_request.year, date_of_request.month, service_id)
+
+
+def _base_price(session, service_id):
+    service = session.get(Service, service_id)
+    return service.base_price if service else 0
+
+
+def _request_counters(session, status, service_id):
+    completed = int(status == 'completed')
+    return Counter(
+        request_count=1,
+        completed_count=completed,
+        revenue=completed * _base_price(session, service_id)
+    )
+
+
+def _rating_counters(rating, sign=1):
+    return Counter(rating_sum=sign * rating, rating_count=sign)
+
+
+def _add(deltas, key, counters, sign=1):
+    if key is None:
+        return
+    for name, value in counters.items():
+        deltas[key][name] += sign * value
+
+
+def _review_request(session, review):
+    service_request = review.service_request
+    if service_request is None and review.service_request_id:
+        service_request = session.get(ServiceRequest, review.service_request_id)
+    return service_request
+
+
+def _service_request_deltas(session, obj, deltas, is_new, is_deleted):
+    if not is_new:
+        old_key = _request_key(_previous(obj, 'date_of_request'), _previous(obj, 'service_id'))
+        old = _request_counters(session, _previous(obj, 'service_status'), _previous(obj, 'service_id'))
+        _add(deltas, old_key, old, sign=-1)
+    if not is_deleted:
+        new_key = _request_key(obj.date_of_request, obj.service_id)
+        new = _request_counters(session, obj.service_status, obj.service_id)
+        _add(deltas, new_key, new)
+
+    # An existing review follows its request to another month or service
+    if not is_new and not is_deleted and old_key != new_key:
+        review = obj.review
+        if review is not None and review not in session.new and review not in session.deleted:
+            _add(deltas, old_key, _rating_counters(review.rating), sign=-1)
+            _add(deltas, new_key, _rating_counters(review.rating))
+
+
+def _review_deltas(session, obj, deltas, is_new, is_deleted):
+    service_request = _review_request(session, obj)
+    if service_request is None:
+        return
+    if service_request in session.deleted:
+        key = _request_key(_previous(service_request, 'date_of_request'), _previous(service_request, 'service_id'))
+    else:
+        key = _request_key(service_request.date_of_request, service_request.service_id)
+
+    if not is_new:
+        _add(deltas, key, _rating_counters(_previous(obj, 'rating')), sign=-1)
+    if not is_deleted:
+        _add(deltas, key, _rating_counters(obj.rating))
+
+
+DELTA_BUILDERS = {
+    ServiceRequest: _service_request_deltas,
+    Review: _review_deltas,
+}
+
+
+def _apply(connection, deltas):
+    """
+    Add each month's deltas, creating the row the first time a month/service
+    is seen. One INSERT ... ON CONFLICT DO UPDATE per row, so concurrent
+    first writes for the same month and service both land instead of the
+    second failing on the primary key.
+    """
+    for (year, month, service_id), counters in deltas.items():
+        counters = {name: value for name, value in counters.items() if value}
+        if not counters:
+            continue
+
+        row = {name: 0 for name in MonthlyMetrics.COUNTERS}
+        row.update(counters)
+        row.update(year=year, month=month, service_id=service_id, is_final=False, updated_at=datetime.utcnow())
+        values = {name: getattr(MonthlyMetrics.__table__.c, name) + value for name, value in counters.items()}
+        values['updated_at'] = row['updated_at']
+
+        statement = upsert_statement(connection.dialect.name, MonthlyMetrics, row, ['year', 'month', 'service_id'], values)
+        if statement is not None:
+            connection.execute(statement)
+            continue
+
+        # Other dialects: update, then insert when the row does not exist yet
+        key = (MonthlyMetrics.year == year, MonthlyMetrics.month == month, MonthlyMetrics.service_id == service_id)
+        if not connection.execute(update(MonthlyMetrics).where(*key).values(**values)).rowcount:
+            connection.execute(insert(MonthlyMetrics).values(**row))
+
+
+def _repriced_services(session):
+    """service_id -> new base_price for the services whose price changed in this flush"""
+    repriced = {}
+    for obj in session.dirty:
+        if isinstance(obj, Service) and inspect(obj).attrs['base_price'].history.has_changes():
+            repriced[obj.id] = obj.base_price
+    return repriced
+
+
+def _reprice(connection, repriced):
+    """
+    Revenue is the current base price of a service times its completed
+    requests, as recompute() computes it, so a price change rescales every
+    row of the service rather than leaving deltas priced at different times.
+    """
+    for service_id, base_price in repriced.items():
+        connection.execute(
+            update(MonthlyMetrics).where(MonthlyMetrics.service_id == service_id).values(
+                revenue=MonthlyMetrics.completed_count * base_price,
+                updated_at=datetime.utcnow()
+            )
+        )
+
+
+def update_monthly_metrics(session, flush_context):
+    """
+    after_flush: fold the flushed request and review changes into
+    monthly_metrics, in the same transaction as the changes themselves.
+    Bulk UPDATEs bypass this; ServiceRequest.claim() only moves requests
+    between statuses that are not counted.
+    """
+    deltas = defaultdict(Counter)
+    for objects, is_new, is_deleted in ((session.new, True, False), (session.dirty, False, False), (session.deleted, False, True)):
+        for obj in objects:
+            builder = DELTA_BUILDERS.get(type(obj))
+            if builder is None:
+                continue
+            if not is_new and not is_deleted and not session.is_modified(obj, include_collections=False):
+                continue
+            builder(session, obj, deltas, is_new, is_deleted)
+
+    repriced = _repriced_services(session)
+    if deltas:
+        _apply(session.connection(), deltas)
+    if repriced:
+        _reprice(session.connection(), repriced)
+
+
+def init_monthly_metrics(app=None):
+    """Attach the monthly_metrics listener to db.session (safe to call once per create_app)"""
+    if not event.contains(db.session, 'after_flush', update_monthly_metrics):
+        event.listen(db.session, 'after_flush', update_monthly_metrics)
+
+
+def report_months(count, today=None):
+    """The (year, month) of the current month and the `count` - 1 before it, newest first"""
+    today = today or datetime.now()
+    year, month = today.year, today.month
+    months = []
+    for _ in range(count):
+        months.append((year, month))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return months
+
+
+def monthly_totals(months):
+    """
+    Totals over all services for each (year, month), read from
+    monthly_metrics in one grouped range query on its primary key.
+    """
+    rows = db.session.query(
+        MonthlyMetrics.year,
+        MonthlyMetrics.month,
+        db.func.sum(MonthlyMetrics.request_count).label('request_count'),
+        db.func.sum(MonthlyMetrics.completed_count).label('completed_count'),
+        db.func.sum(MonthlyMetrics.rating_sum).label('rating_sum'),
+        db.func.sum(MonthlyMetrics.rating_count).label('rating_count'),
+        db.func.sum(MonthlyMetrics.revenue).label('revenue')
+    ).filter(
+        MonthlyMetrics.in_months(min(months), max(months))
+    ).group_by(MonthlyMetrics.year, MonthlyMetrics.month).all()
+    return {(row.year, row.month): row for row in rows}
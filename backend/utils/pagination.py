@@ -0,0 +1,135 @@
+from flask import request, jsonify
+from sqlalchemy import and_, or_
+from datetime import datetime
+import base64
+import json
+
+DEFAULT_PAGE_LIMIT = 50
+MAX_PAGE_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def is_paginated_request():
+    """
+    List endpoints keep returning the full list unless the client asks for
+    a page by passing `limit` or `cursor`.
+    """
+    return 'limit' in request.args or 'cursor' in request.args
+
+
+def get_page_limit():
+    limit = request.args.get('limit', DEFAULT_PAGE_LIMIT, type=int)
+    return max(1, min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT))
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page into an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor back into typed values matching the sort columns"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor(cursor)
+
+    decoded = []
+    for column, value in zip(columns, values):
+        try:
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            else:
+                value = column.type.python_type(value)
+        except (ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        decoded.append(value)
+
+    return decoded
+
+
+def _after(columns, values, descending):
+    """
+    Build the keyset predicate `(c1, c2, ...) > (v1, v2, ...)` (or `<` when
+    descending) using plain AND/OR so it works on every backend and can use
+    the composite index on the sort columns.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        compare = column < values[i] if descending else column > values[i]
+        equal = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, compare))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, cursor=None, limit=DEFAULT_PAGE_LIMIT, descending=False, row_key=None):
+    """
+    Fetch one page of `query` ordered by `columns`, starting after `cursor`.
+
+    The last column must be unique (normally the primary key) so the order
+    is total. Any ordering already on `query` is replaced. `row_key` returns
+    the sort values of a row when they are not attributes named after the
+    columns, e.g. for `(Model, rank)` rows. Returns the rows of the page and
+    the cursor for the next page, which is None once the end of the result
+    set has been reached.
+    """
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if row_key:
+            next_cursor = encode_cursor(list(row_key(last)))
+        else:
+            next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+
+    return rows, next_cursor
+
+
+def paginated_list(query, columns, serialize, descending=False, row_key=None):
+    """
+    Serialize a list endpoint response.
+
+    Returns the plain list for unpaginated requests and a
+    `{'items', 'next_cursor', 'limit'}` page when `limit`/`cursor` is given.
+    """
+    if not is_paginated_request():
+        return jsonify([serialize(row) for row in query.all()]), 200
+
+    limit = get_page_limit()
+    try:
+        rows, next_cursor = keyset_page(
+            query, columns,
+            cursor=request.args.get('cursor'),
+            limit=limit,
+            descending=descending,
+            row_key=row_key
+        )
+    except InvalidCursor:
+        return jsonify({'message': 'Invalid cursor'}), 400
+
+    return jsonify({
+        'items': [serialize(row) for row in rows],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }), 200
+
+
+def get_bool_arg(name):
+    """Parse an optional boolean query string filter such as `?is_active=true`"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return value.lower() in ('true', '1', 't', 'yes')
@@ -0,0 +1,168 @@
+from sqlalchemy import func, case, and_, desc
+from models.models import db, Service, Professional, Customer, User, ServiceRequest, Review
+from utils.stats import count_where
+from datetime import datetime, timedelta
+
+REPORT_TYPES = ('service_performance', 'customer_activity', 'professional_performance')
+
+REPORT_TITLES = {
+    'service_performance': 'Service Performance',
+    'customer_activity': 'Customer Activity',
+    'professional_performance': 'Professional Performance',
+}
+
+# Rows listed in a report's table; the summary still covers the whole range
+REPORT_ROW_LIMIT = 1000
+
+
+def _in_range(start_date, end_date):
+    return and_(ServiceRequest.date_of_request >= start_date, ServiceRequest.date_of_request < end_date)
+
+
+def _completed():
+    return ServiceRequest.service_status == 'completed'
+
+
+def _revenue():
+    """Base price of the service of every completed request"""
+    return func.coalesce(func.sum(case((_completed(), Service.base_price), else_=0)), 0)
+
+
+def _rating(value):
+    return f"{value or 0:.1f}"
+
+
+def _money(value):
+    return f"${value or 0:.2f}"
+
+
+def report_summary(start_date, end_date):
+    """Request, completion, rating and revenue totals over the range in one query"""
+    row = db.session.query(
+        func.count(ServiceRequest.id).label('total'),
+        count_where(_completed()).label('completed'),
+        func.avg(Review.rating).label('avg_rating'),
+        _revenue().label('revenue')
+    ).select_from(ServiceRequest).join(
+        Service, Service.id == ServiceRequest.service_id
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    ).filter(_in_range(start_date, end_date)).one()
+
+    return [
+        ('Total Service Requests', str(row.total)),
+        ('Completed Requests', str(row.completed)),
+        ('Average Rating', f"{_rating(row.avg_rating)} / 5.0"),
+        ('Revenue', _money(row.revenue)),
+    ]
+
+
+def service_performance(start_date, end_date):
+    """Every service with its requests, completions, rating and revenue in the range"""
+    requests = func.count(ServiceRequest.id)
+    rows = db.session.query(
+        Service.name,
+        requests.label('requests'),
+        count_where(_completed()).label('completed'),
+        func.avg(Review.rating).label('avg_rating'),
+        _revenue().label('revenue')
+    ).outerjoin(
+        ServiceRequest, and_(ServiceRequest.service_id == Service.id, _in_range(start_date, end_date))
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    ).group_by(Service.id).order_by(desc(requests), Service.id).limit(REPORT_ROW_LIMIT)
+
+    columns = ['Service', 'Requests', 'Completed', 'Avg. Rating', 'Revenue']
+    return columns, [
+        [row.name, str(row.requests), str(row.completed), _rating(row.avg_rating), _money(row.revenue)]
+        for row in rows
+    ]
+
+
+def customer_activity(start_date, end_date):
+    """Customers with requests in the range, most active first"""
+    requests = func.count(ServiceRequest.id)
+    rows = db.session.query(
+        User.username,
+        Customer.pin_code,
+        requests.label('requests'),
+        count_where(_completed()).label('completed'),
+        func.count(Review.id).label('reviews'),
+        func.avg(Review.rating).label('avg_rating'),
+        _revenue().label('spent')
+    ).select_from(ServiceRequest).join(
+        Customer, Customer.id == ServiceRequest.customer_id
+    ).join(
+        User, User.id == Customer.user_id
+    ).join(
+        Service, Service.id == ServiceRequest.service_id
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    ).filter(
+        _in_range(start_date, end_date)
+    ).group_by(Customer.id, User.id).order_by(desc(requests), Customer.id).limit(REPORT_ROW_LIMIT)
+
+    columns = ['Customer', 'Pin Code', 'Requests', 'Completed', 'Reviews', 'Avg. Rating Given', 'Spent']
+    return columns, [
+        [row.username, row.pin_code or '', str(row.requests), str(row.completed), str(row.reviews),
+         _rating(row.avg_rating), _money(row.spent)]
+        for row in rows
+    ]
+
+
+def professional_performance(start_date, end_date):
+    """Professionals with requests assigned in the range, most completions first"""
+    completed = count_where(_completed())
+    rows = db.session.query(
+        User.username,
+        Service.name.label('service_name'),
+        func.count(ServiceRequest.id).label('assigned'),
+        completed.label('completed'),
+        count_where(ServiceRequest.service_status == 'rejected').label('rejected'),
+        func.avg(Review.rating).label('avg_rating'),
+        _revenue().label('earned')
+    ).select_from(ServiceRequest).join(
+        Professional, Professional.id == ServiceRequest.professional_id
+    ).join(
+        User, User.id == Professional.user_id
+    ).join(
+        Service, Service.id == ServiceRequest.service_id
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    ).filter(
+        _in_range(start_date, end_date)
+    ).group_by(Professional.id, User.id, Service.id).order_by(desc(completed), Professional.id).limit(REPORT_ROW_LIMIT)
+
+    columns = ['Professional', 'Service', 'Assigned', 'Completed', 'Rejected', 'Avg. Rating', 'Earned']
+    return columns, [
+        [row.username, row.service_name, str(row.assigned), str(row.completed), str(row.rejected),
+         _rating(row.avg_rating), _money(row.earned)]
+        for row in rows
+    ]
+
+
+REPORT_BUILDERS = {
+    'service_performance': service_performance,
+    'customer_activity': customer_activity,
+    'professional_performance': professional_performance,
+}
+
+
+def build_report(report_type, start_date, end_date):
+    """
+    The content of an admin report, already formatted for display so the
+    HTML and PDF renderings show the same values. `end_date` is exclusive.
+    """
+    columns, rows = REPORT_BUILDERS[report_type](start_date, end_date)
+    return {
+        'title': REPORT_TITLES[report_type],
+        'report_type': report_type,
+        'start_date': start_date,
+        'end_date': end_date,
+        'period': f"{start_date:%Y-%m-%d} to {end_date - timedelta(days=1):%Y-%m-%d}",
+        'generated_at': datetime.now(),
+        'summary': report_summary(start_date, end_date),
+        'columns': columns,
+        'rows': rows,
+        'row_limit': REPORT_ROW_LIMIT,
+    }
@@ -0,0 +1,197 @@
+from flask import current_app
+from sqlalchemy import event, inspect
+from models.models import db, ServiceRequest
+from cache.cache_config import get_redis_client
+from utils.service_requests import serialize_available_request
+from utils.request_matching import apply_pool_changes, invalidate_indexes
+import logging
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# One channel per service, carrying changes to its pool of open requests
+AVAILABLE_REQUESTS_CHANNEL = 'available_requests_{}'
+
+# Session.info key holding the pool changes of the current transaction
+PENDING_CHANGES = 'available_request_changes'
+
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT = 15
+# Seconds before a stream is closed so the client reconnects with a fresh
+# snapshot; bounds how long one stream holds a worker connection
+STREAM_MAX_LIFETIME = int(os.getenv('STREAM_MAX_LIFETIME', 300))
+# Reconnection delay sent to EventSource clients, in milliseconds
+STREAM_RETRY_MS = 1000
+
+
+def _is_available(service_id, status, professional_id):
+    return status == 'requested' and professional_id is None and service_id is not None
+
+
+def _previous(obj, attr):
+    """Value of an attribute before this flush"""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _pool_changes(obj, is_new, is_deleted):
+    """
+    Compare a request's pool membership before and after the flush and
+    return the (service_id, message) pairs to publish. Added requests are
+    serialized after the flush, see serialize_pool_changes().
+    """
+    before = None
+    if not is_new:
+        old = (_previous(obj, 'service_id'), _previous(obj, 'service_status'), _previous(obj, 'professional_id'))
+        if _is_available(*old):
+            before = old[0]
+
+    after = None
+    if not is_deleted and _is_available(obj.service_id, obj.service_status, obj.professional_id):
+        after = obj.service_id
+
+    changes = []
+    if before is not None and before != after:
+        changes.append((before, {'event': 'removed', 'id': obj.id}))
+    if after is not None and before != after:
+        changes.append((after, obj))
+    return changes
+
+
+def collect_pool_changes(session, flush_context):
+    """after_flush: record requests entering or leaving an open request pool"""
+    if get_redis_client() is None:
+        return
+
+    pending = session.info.setdefault(PENDING_CHANGES, [])
+    for obj in session.new:
+        if isinstance(obj, ServiceRequest):
+            pending.extend(_pool_changes(obj, is_new=True, is_deleted=False))
+    for obj in session.dirty:
+        if isinstance(obj, ServiceRequest) and session.is_modified(obj, include_collections=False):
+            pending.extend(_pool_changes(obj, is_new=False, is_deleted=False))
+    for obj in session.deleted:
+        if isinstance(obj, ServiceRequest):
+            pending.extend(_pool_changes(obj, is_new=False, is_deleted=True))
+
+
+def serialize_pool_changes(session, flush_context):
+    """
+    after_flush_postexec: serialize the requests added to a pool. New rows
+    only lazy-load their service and customer once the flush has finished.
+    """
+    pending = session.info.get(PENDING_CHANGES)
+    if not pending:
+        return
+    for i, (service_id, message) in enumerate(pending):
+        if isinstance(message, ServiceRequest):
+            pending[i] = (service_id, {'event': 'added', 'request': serialize_available_request(message)})
+
+
+def queue_claimed_request(service_request, session=None):
+    """
+    Queue the removal of a request claimed with a bulk UPDATE, which
+    bypasses the flush. See ServiceRequest.claim().
+    """
+    if get_redis_client() is None:
+        return
+    session = session or db.session
+    session.info.setdefault(PENDING_CHANGES, []).append(
+        (service_request.service_id, {'event': 'removed', 'id': service_request.id})
+    )
+
+
+def publish_pool_changes(session):
+    """
+    after_commit: publish the committed changes, one message per change,
+    and apply them to the pincode matching index
+    """
+    changes = session.info.pop(PENDING_CHANGES, None)
+    if not changes:
+        return
+
+    client = get_redis_client()
+    try:
+        pipe = client.pipeline(transaction=False)
+        for service_id, message in changes:
+            pipe.publish(AVAILABLE_REQUESTS_CHANNEL.format(service_id), current_app.json.dumps(message))
+        pipe.execute()
+    except Exception as e:
+        # The data is committed; subscribers fall back to their next snapshot
+        logger.warning(f"Failed to publish {len(changes)} available request changes: {e}")
+
+    try:
+        apply_pool_changes(client, changes)
+    except Exception as e:
+        # Rebuild the affected indexes on their next lookup; if Redis is down
+        # the ready flags expire on their own (MATCH_READY_TIMEOUT)
+        logger.warning(f"Failed to index {len(changes)} available request changes: {e}")
+        try:
+            invalidate_indexes(client, {service_id for service_id, _ in changes})
+        except Exception as e:
+            logger.warning(f"Failed to invalidate available request indexes: {e}")
+
+
+def discard_pool_changes(session):
+    session.info.pop(PENDING_CHANGES, None)
+
+
+LISTENERS = (
+    ('after_flush', collect_pool_changes),
+    ('after_flush_postexec', serialize_pool_changes),
+    ('after_commit', publish_pool_changes),
+    ('after_rollback', discard_pool_changes),
+)
+
+
+def init_request_feed(app=None):
+    """Attach the pool change listeners to db.session (safe to call once per create_app)"""
+    for name, listener in LISTENERS:
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
+
+
+def subscribe_available_requests(service_id):
+    """Subscribe to a service's pool, or return None when Redis is not in use"""
+    client = get_redis_client()
+    if client is None:
+        return None
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(AVAILABLE_REQUESTS_CHANNEL.format(service_id))
+    return pubsub
+
+
+def _sse(event_name, data):
+    return f'event: {event_name}\ndata: {data}\n\n'
+
+
+def available_requests_stream(pubsub, snapshot):
+    """
+    Server-sent events for one service's pool: a `snapshot` event with the
+    current open requests, then `added` / `removed` events as they happen.
+    `snapshot` is pre-serialized JSON, so the generator needs no app context.
+    The stream ends after STREAM_MAX_LIFETIME seconds; EventSource clients
+    reconnect after STREAM_RETRY_MS and receive a new snapshot.
+    """
+    deadline = time.monotonic() + STREAM_MAX_LIFETIME
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        yield _sse('snapshot', snapshot)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            message = pubsub.get_message(timeout=min(STREAM_HEARTBEAT, remaining))
+            if message is None:
+                yield ': keep-alive\n\n'
+                continue
+            data = message['data']
+            if isinstance(data, bytes):
+                data = data.decode()
+            yield _sse(json.loads(data)['event'], data)
+    finally:
+        pubsub.close()
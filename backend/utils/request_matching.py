@@ -0,0 +1,315 @@
+from sqlalchemy import case, func, and_, or_
+from models.models import db, ServiceRequest, Customer
+from cache.cache_config import get_redis_client
+from utils.service_requests import available_requests_query, iter_batches
+from utils.pagination import InvalidCursor, encode_cursor
+import heapq
+import base64
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Indian pincodes: zone, sub-zone and sorting district, then the post office
+PIN_CODE_DIGITS = 6
+
+# Open requests of a service whose customer pincode starts with a prefix,
+# one sorted set per (service_id, prefix) and prefix length, scored by id
+MATCH_INDEX_KEY = 'open_requests_{}_{}'
+# Requests without a usable pincode
+NO_PIN = 'none'
+# request id -> indexed pincode, to find a request's sets again on removal
+MATCH_PINS_KEY = 'open_request_pins_{}'
+# Set once a service's index has been built from the database. It expires so
+# the index is rebuilt periodically and picks up changes it missed
+MATCH_READY_KEY = 'open_requests_{}_ready'
+MATCH_READY_TIMEOUT = 6 * 60 * 60
+MATCH_BUILD_LOCK_KEY = 'open_requests_{}_building'
+MATCH_BUILD_LOCK_TIMEOUT = 300
+
+
+def normalize_pin(pin_code):
+    """A pincode as indexed, or None when it is missing or malformed"""
+    pin = (pin_code or '').strip()
+    return pin if len(pin) == PIN_CODE_DIGITS and pin.isdigit() else None
+
+
+def _index_keys(service_id, pin):
+    if pin is None:
+        return [MATCH_INDEX_KEY.format(service_id, NO_PIN)]
+    return [MATCH_INDEX_KEY.format(service_id, pin[:n]) for n in range(1, PIN_CODE_DIGITS + 1)]
+
+
+def _bands(service_id, pin):
+    """
+    The index sets to read, grouped into bands nearest first. Band 0 is the
+    professional's own pincode; band k holds the pincodes sharing exactly
+    PIN_CODE_DIGITS - k leading digits, which are the sibling prefixes one
+    digit longer. The last band also holds requests without a pincode.
+    """
+    no_pin = MATCH_INDEX_KEY.format(service_id, NO_PIN)
+    if pin is None:
+        return [[MATCH_INDEX_KEY.format(service_id, digit) for digit in '0123456789'] + [no_pin]]
+
+    bands = [[MATCH_INDEX_KEY.format(service_id, pin)]]
+    for shared in range(PIN_CODE_DIGITS - 1, -1, -1):
+        bands.append([
+            MATCH_INDEX_KEY.format(service_id, pin[:shared] + digit)
+            for digit in '0123456789' if digit != pin[shared]
+        ])
+    bands[-1].append(no_pin)
+    return bands
+
+
+def decode_match_cursor(cursor):
+    """Decode a (band, request id) position from an opaque cursor"""
+    try:
+        band, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return int(band), int(last_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+# Index maintenance
+
+def _add_to_index(pipe, service_id, request_id, pin):
+    for key in _index_keys(service_id, pin):
+        pipe.zadd(key, {request_id: request_id})
+    pipe.hset(MATCH_PINS_KEY.format(service_id), request_id, pin or '')
+
+
+def _remove_from_index(pipe, service_id, request_id, pin):
+    for key in _index_keys(service_id, pin):
+        pipe.zrem(key, request_id)
+    pipe.hdel(MATCH_PINS_KEY.format(service_id), request_id)
+
+
+def _indexed_pins(client, entries):
+    """Look up the pincode each (service_id, request_id) was indexed under"""
+    pipe = client.pipeline(transaction=False)
+    for service_id, request_id in entries:
+        pipe.hget(MATCH_PINS_KEY.format(service_id), request_id)
+    pins = {}
+    for entry, pin in zip(entries, pipe.execute()):
+        if pin is not None:
+            pins[entry] = normalize_pin(pin.decode() if isinstance(pin, bytes) else pin)
+    return pins
+
+
+def apply_pool_changes(client, changes):
+    """
+    Update the index with the committed pool changes collected by
+    utils.request_feed: `added` messages carry the serialized request,
+    `removed` messages only its id.
+    """
+    removed = [(service_id, message['id']) for service_id, message in changes if message['event'] == 'removed']
+    pins = _indexed_pins(client, removed) if removed else {}
+
+    pipe = client.pipeline(transaction=False)
+    for service_id, message in changes:
+        if message['event'] == 'added':
+            request = message['request']
+            pin = normalize_pin(request.get('customer_pin_code'))
+            pins[(service_id, request['id'])] = pin
+            _add_to_index(pipe, service_id, request['id'], pin)
+        elif (service_id, message['id']) in pins:
+            _remove_from_index(pipe, service_id, message['id'], pins.pop((service_id, message['id'])))
+    pipe.execute()
+
+
+def index_requests(client, service_id, rows):
+    """Add (request_id, pin_code) rows to a service's index in one round trip"""
+    by_key = {}
+    pins = {}
+    for request_id, pin_code in rows:
+        pin = normalize_pin(pin_code)
+        pins[request_id] = pin or ''
+        for key in _index_keys(service_id, pin):
+            by_key.setdefault(key, {})[request_id] = request_id
+    if not pins:
+        return
+
+    pipe = client.pipeline(transaction=False)
+    for key, members in by_key.items():
+        pipe.zadd(key, members)
+    pipe.hset(MATCH_PINS_KEY.format(service_id), mapping=pins)
+    pipe.execute()
+
+
+def unindex_requests(client, service_id, request_ids):
+    """Remove requests from a service's index"""
+    entries = [(service_id, request_id) for request_id in request_ids]
+    pins = _indexed_pins(client, entries)
+    if not pins:
+        return
+    pipe = client.pipeline(transaction=False)
+    for (_, request_id), pin in pins.items():
+        _remove_from_index(pipe, service_id, request_id, pin)
+    pipe.execute()
+
+
+def _open_request_pins_query(service_id):
+    return db.session.query(ServiceRequest.id, Customer.pin_code).join(
+        Customer, Customer.id == ServiceRequest.customer_id
+    ).filter(
+        ServiceRequest.service_id == service_id,
+        ServiceRequest.service_status == 'requested',
+        ServiceRequest.professional_id == None
+    )
+
+
+def build_index(client, service_id, batch_size=10000):
+    """
+    Index a service's open requests from the database. Returns False when
+    another process is already building it. Changes committed meanwhile are
+    applied by the pool listeners, and requests that closed during the build
+    are dropped the first time a lookup finds them gone.
+    """
+    lock = MATCH_BUILD_LOCK_KEY.format(service_id)
+    if not client.set(lock, 1, nx=True, ex=MATCH_BUILD_LOCK_TIMEOUT):
+        return False
+    try:
+        for batch in iter_batches(_open_request_pins_query(service_id), batch_size):
+            index_requests(client, service_id, batch)
+        client.set(MATCH_READY_KEY.format(service_id), 1, ex=MATCH_READY_TIMEOUT)
+    finally:
+        client.delete(lock)
+    return True
+
+
+def invalidate_indexes(client, service_ids):
+    """Mark services' indexes for a rebuild on their next lookup"""
+    client.delete(*[MATCH_READY_KEY.format(service_id) for service_id in service_ids])
+
+
+def ensure_index(client, service_id):
+    """Build a service's index on first use; False while it is unavailable"""
+    if client.exists(MATCH_READY_KEY.format(service_id)):
+        return True
+    logger.info(f"Building open request index for service {service_id}")
+    return build_index(client, service_id)
+
+
+def reindex_customer_requests(customer_id, pin_code):
+    """Move a customer's open requests to their new pincode"""
+    client = get_redis_client()
+    if client is None:
+        return
+    rows = db.session.query(ServiceRequest.id, ServiceRequest.service_id).filter(
+        ServiceRequest.customer_id == customer_id,
+        ServiceRequest.service_status == 'requested',
+        ServiceRequest.professional_id == None
+    ).all()
+    for row in rows:
+        unindex_requests(client, row.service_id, [row.id])
+        index_requests(client, row.service_id, [(row.id, pin_code)])
+
+
+# Lookups
+
+def nearest_request_ids(client, service_id, pin_code, limit, after=None):
+    """
+    Up to `limit` + 1 (band, request_id) positions, nearest pincode first
+    and oldest first within a band, starting after the `after` position.
+    One pipelined round trip of range reads, each O(log n + limit).
+    """
+    after_band, after_id = after if after else (0, 0)
+    bands = _bands(service_id, normalize_pin(pin_code))
+
+    pipe = client.pipeline(transaction=False)
+    for band, keys in enumerate(bands):
+        if band < after_band:
+            continue
+        min_score = f'({after_id}' if band == after_band else '-inf'
+        for key in keys:
+            pipe.zrangebyscore(key, min_score, '+inf', start=0, num=limit + 1)
+    results = iter(pipe.execute())
+
+    positions = []
+    for band, keys in enumerate(bands):
+        if band < after_band:
+            continue
+        members = [[int(member) for member in next(results)] for _ in keys]
+        for request_id in heapq.merge(*members):
+            positions.append((band, request_id))
+            if len(positions) > limit:
+                return positions
+    return positions
+
+
+def match_band_expression(pin_code):
+    """
+    SQL equivalent of the bands of _bands() for a professional's pincode.
+    None when the professional has no pincode, as every request is then in
+    band 0.
+    """
+    pin = normalize_pin(pin_code)
+    if pin is None:
+        return None
+
+    customer_pin = func.trim(Customer.pin_code)
+    whens = [(customer_pin == pin, 0)]
+    for shared in range(PIN_CODE_DIGITS - 1, 0, -1):
+        whens.append((
+            and_(func.length(customer_pin) == PIN_CODE_DIGITS, func.substr(customer_pin, 1, shared) == pin[:shared]),
+            PIN_CODE_DIGITS - shared
+        ))
+    return case(*whens, else_=PIN_CODE_DIGITS)
+
+
+def nearest_requests_query(service_id, pin_code):
+    """Open requests for a service ordered nearest pincode first, from SQL"""
+    band = match_band_expression(pin_code)
+    if band is None:
+        return available_requests_query(service_id).order_by(ServiceRequest.id)
+    return available_requests_query(service_id).join(
+        Customer, Customer.id == ServiceRequest.customer_id
+    ).order_by(band, ServiceRequest.id)
+
+
+def _sql_page(service_id, pin_code, limit, after):
+    band = match_band_expression(pin_code)
+    query = _open_request_pins_query(service_id)
+    if band is None:
+        # A single band: plain id order
+        if after:
+            query = query.filter(ServiceRequest.id > after[1])
+        return [(0, row.id) for row in query.order_by(ServiceRequest.id).limit(limit + 1)]
+
+    query = query.add_columns(band.label('band'))
+    if after:
+        query = query.filter(or_(band > after[0], and_(band == after[0], ServiceRequest.id > after[1])))
+    return [(row.band, row.id) for row in query.order_by(band, ServiceRequest.id).limit(limit + 1)]
+
+
+def nearest_available_requests(service_id, pin_code, limit, cursor=None):
+    """
+    One page of a service's open requests, nearest to `pin_code` first.
+    Served from the Redis index when it is available and from an ordered
+    SQL query otherwise; both return the same order and cursors.
+    Returns the requests and the cursor of the next page, or None.
+    Raises InvalidCursor for a malformed cursor.
+    """
+    after = decode_match_cursor(cursor) if cursor else None
+
+    client = get_redis_client()
+    if client is not None and ensure_index(client, service_id):
+        positions = nearest_request_ids(client, service_id, pin_code, limit, after)
+    else:
+        client = None
+        positions = _sql_page(service_id, pin_code, limit, after)
+
+    next_cursor = None
+    if len(positions) > limit:
+        positions = positions[:limit]
+        next_cursor = encode_cursor(list(positions[-1]))
+
+    ids = [request_id for _, request_id in positions]
+    rows = {req.id: req for req in available_requests_query(service_id).filter(ServiceRequest.id.in_(ids))} if ids else {}
+
+    stale = [request_id for request_id in ids if request_id not in rows]
+    if client is not None and stale:
+        # Closed while the index was being built
+        unindex_requests(client, service_id, stale)
+
+    return [rows[request_id] for request_id in ids if request_id in rows], next_cursor
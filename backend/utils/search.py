@@ -0,0 +1,272 @@
+from flask import current_app
+from sqlalchemy import text, inspect, literal, or_, Integer, Float
+from models.models import db, Service, Professional, User
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Search terms are words; each one is matched as a prefix ("plumb" finds
+# "plumber" and "plumbing") and a document must contain all of them
+MAX_SEARCH_TERMS = 8
+_TERM = re.compile(r'[^\W_]+')
+
+# SQLite: FTS5 tables kept in step with their source rows by triggers.
+# services_fts is an external-content index over services; professionals_fts
+# stores its own copy because a document spans professionals, users and
+# services. Neither stems words, so prefix matching behaves the same as on
+# PostgreSQL's 'simple' configuration.
+SQLITE_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+_SQLITE_PROFESSIONAL_DOCUMENT = '''
+    SELECT p.id, u.username, s.name, p.description
+    FROM professionals p
+    JOIN users u ON u.id = p.user_id
+    JOIN services s ON s.id = p.service_id
+'''
+
+SQLITE_DDL = [
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS services_fts USING fts5(
+        name, description, content = 'services', content_rowid = 'id', {SQLITE_TOKENIZE})''',
+    '''CREATE TRIGGER IF NOT EXISTS services_fts_insert AFTER INSERT ON services BEGIN
+        INSERT INTO services_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS services_fts_delete AFTER DELETE ON services BEGIN
+        INSERT INTO services_fts (services_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS services_fts_update AFTER UPDATE OF name, description ON services BEGIN
+        INSERT INTO services_fts (services_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO services_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+    END''',
+
+    f'''CREATE VIRTUAL TABLE IF NOT EXISTS professionals_fts USING fts5(
+        name, service, description, {SQLITE_TOKENIZE})''',
+    f'''CREATE TRIGGER IF NOT EXISTS professionals_fts_insert AFTER INSERT ON professionals BEGIN
+        INSERT INTO professionals_fts (rowid, name, service, description)
+        {_SQLITE_PROFESSIONAL_DOCUMENT} WHERE p.id = new.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS professionals_fts_update
+    AFTER UPDATE OF user_id, service_id, description ON professionals BEGIN
+        DELETE FROM professionals_fts WHERE rowid = old.id;
+        INSERT INTO professionals_fts (rowid, name, service, description)
+        {_SQLITE_PROFESSIONAL_DOCUMENT} WHERE p.id = new.id;
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS professionals_fts_delete AFTER DELETE ON professionals BEGIN
+        DELETE FROM professionals_fts WHERE rowid = old.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS professionals_fts_username AFTER UPDATE OF username ON users BEGIN
+        DELETE FROM professionals_fts WHERE rowid IN (SELECT id FROM professionals WHERE user_id = new.id);
+        INSERT INTO professionals_fts (rowid, name, service, description)
+        {_SQLITE_PROFESSIONAL_DOCUMENT} WHERE p.user_id = new.id;
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS professionals_fts_service_name AFTER UPDATE OF name ON services BEGIN
+        DELETE FROM professionals_fts WHERE rowid IN (SELECT id FROM professionals WHERE service_id = new.id);
+        INSERT INTO professionals_fts (rowid, name, service, description)
+        {_SQLITE_PROFESSIONAL_DOCUMENT} WHERE p.service_id = new.id;
+    END''',
+]
+
+SQLITE_REBUILD = [
+    "INSERT INTO services_fts (services_fts) VALUES ('rebuild')",
+    'DELETE FROM professionals_fts',
+    f'INSERT INTO professionals_fts (rowid, name, service, description) {_SQLITE_PROFESSIONAL_DOCUMENT}',
+]
+
+# PostgreSQL: weighted tsvector documents in side tables with GIN indexes,
+# maintained by triggers. Weights: A name, B service, C description.
+_PG_SERVICE_DOCUMENT = '''
+    setweight(to_tsvector('simple', coalesce(s.name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(s.description, '')), 'C')
+'''
+_PG_PROFESSIONAL_DOCUMENT = '''
+    SELECT p.id,
+        setweight(to_tsvector('simple', coalesce(u.username, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(s.name, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(p.description, '')), 'C')
+    FROM professionals p
+    JOIN users u ON u.id = p.user_id
+    JOIN services s ON s.id = p.service_id
+'''
+
+POSTGRES_DDL = [
+    '''CREATE TABLE IF NOT EXISTS service_search (
+        service_id INTEGER PRIMARY KEY REFERENCES services (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS ix_service_search_document ON service_search USING GIN (document)',
+    '''CREATE TABLE IF NOT EXISTS professional_search (
+        professional_id INTEGER PRIMARY KEY REFERENCES professionals (id) ON DELETE CASCADE,
+        document TSVECTOR NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS ix_professional_search_document ON professional_search USING GIN (document)',
+
+    f'''CREATE OR REPLACE FUNCTION refresh_service_search() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO service_search (service_id, document)
+        SELECT s.id, {_PG_SERVICE_DOCUMENT} FROM services s WHERE s.id = NEW.id
+        ON CONFLICT (service_id) DO UPDATE SET document = EXCLUDED.document;
+        IF TG_OP = 'UPDATE' AND NEW.name IS DISTINCT FROM OLD.name THEN
+            INSERT INTO professional_search (professional_id, document)
+            {_PG_PROFESSIONAL_DOCUMENT} WHERE p.service_id = NEW.id
+            ON CONFLICT (professional_id) DO UPDATE SET document = EXCLUDED.document;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql''',
+    'DROP TRIGGER IF EXISTS refresh_service_search ON services',
+    '''CREATE TRIGGER refresh_service_search AFTER INSERT OR UPDATE OF name, description ON services
+        FOR EACH ROW EXECUTE FUNCTION refresh_service_search()''',
+
+    f'''CREATE OR REPLACE FUNCTION refresh_professional_search() RETURNS trigger AS $$
+    BEGIN
+        IF TG_TABLE_NAME = 'users' THEN
+            INSERT INTO professional_search (professional_id, document)
+            {_PG_PROFESSIONAL_DOCUMENT} WHERE p.user_id = NEW.id
+            ON CONFLICT (professional_id) DO UPDATE SET document = EXCLUDED.document;
+        ELSE
+            INSERT INTO professional_search (professional_id, document)
+            {_PG_PROFESSIONAL_DOCUMENT} WHERE p.id = NEW.id
+            ON CONFLICT (professional_id) DO UPDATE SET document = EXCLUDED.document;
+        END IF;
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql''',
+    'DROP TRIGGER IF EXISTS refresh_professional_search ON professionals',
+    '''CREATE TRIGGER refresh_professional_search
+        AFTER INSERT OR UPDATE OF user_id, service_id, description ON professionals
+        FOR EACH ROW EXECUTE FUNCTION refresh_professional_search()''',
+    'DROP TRIGGER IF EXISTS refresh_professional_search ON users',
+    '''CREATE TRIGGER refresh_professional_search AFTER UPDATE OF username ON users
+        FOR EACH ROW EXECUTE FUNCTION refresh_professional_search()''',
+]
+
+POSTGRES_REBUILD = [
+    'DELETE FROM service_search',
+    f'INSERT INTO service_search (service_id, document) SELECT s.id, {_PG_SERVICE_DOCUMENT} FROM services s',
+    'DELETE FROM professional_search',
+    f'INSERT INTO professional_search (professional_id, document) {_PG_PROFESSIONAL_DOCUMENT}',
+]
+
+SEARCH_BACKENDS = {
+    'sqlite': ('fts5', 'services_fts', SQLITE_DDL, SQLITE_REBUILD),
+    'postgresql': ('tsvector', 'service_search', POSTGRES_DDL, POSTGRES_REBUILD),
+}
+
+
+def _execute_all(statements):
+    with db.engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def init_search_index(app):
+    """
+    Create the search index and its triggers if they are missing, filling
+    it from the existing rows the first time. Call inside an app context
+    after db.create_all(). Databases without a supported full-text engine
+    keep the LIKE search.
+    """
+    backend = SEARCH_BACKENDS.get(db.engine.dialect.name)
+    app.extensions['search_backend'] = None
+    if backend is None:
+        return
+
+    name, table, ddl, rebuild = backend
+    try:
+        created = not inspect(db.engine).has_table(table)
+        _execute_all(ddl)
+        if created:
+            _execute_all(rebuild)
+            logger.info(f"Built {name} search index")
+    except Exception as e:
+        logger.warning(f"Full-text search is unavailable, falling back to LIKE: {e}")
+        return
+
+    app.extensions['search_backend'] = name
+
+
+def rebuild_search_index():
+    """Refill the search index from the source tables"""
+    backend = SEARCH_BACKENDS.get(db.engine.dialect.name)
+    if backend is None:
+        return False
+    _execute_all(backend[2])
+    _execute_all(backend[3])
+    return True
+
+
+def search_terms(query_text):
+    """The lower-cased words of a search query"""
+    return _TERM.findall((query_text or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def _match_subquery(name, sql, terms):
+    return text(sql).bindparams(terms=terms).columns(id=Integer, search_rank=Float).subquery(name)
+
+
+def _fts5_match(table, weights, terms):
+    # Quoted, so every term is a plain token followed by the prefix operator
+    match = ' '.join(f'"{term}"*' for term in terms)
+    return _match_subquery(f'{table}_match', f'''
+        SELECT rowid AS id, bm25({table}, {weights}) AS search_rank
+        FROM {table} WHERE {table} MATCH :terms
+    ''', match)
+
+
+def _tsvector_match(table, key, terms):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    # Negated so that, as with bm25(), a lower rank is a better match
+    return _match_subquery(f'{table}_match', f'''
+        SELECT {key} AS id, -ts_rank_cd(document, query) AS search_rank
+        FROM {table}, to_tsquery('simple', :terms) AS query
+        WHERE document @@ query
+    ''', query)
+
+
+def _like_match(name, query, columns, terms):
+    """LIKE fallback: every term must appear in one of the columns, unranked"""
+    for term in terms:
+        query = query.filter(or_(*[column.ilike(f'%{term}%') for column in columns]))
+    return query.subquery(name)
+
+
+def service_search(query_text):
+    """
+    Subquery of (id, search_rank) for the services matching a search, where
+    a lower rank is a better match. None when the query has no words.
+    """
+    terms = search_terms(query_text)
+    if not terms:
+        return None
+
+    backend = current_app.extensions.get('search_backend')
+    if backend == 'fts5':
+        return _fts5_match('services_fts', '10.0, 1.0', terms)
+    if backend == 'tsvector':
+        return _tsvector_match('service_search', 'service_id', terms)
+
+    query = db.session.query(Service.id.label('id'), literal(0.0).label('search_rank'))
+    return _like_match('services_match', query, [Service.name, Service.description], terms)
+
+
+def professional_search(query_text):
+    """
+    Subquery of (id, search_rank) for the professionals whose name, service
+    or description match a search. None when the query has no words.
+    """
+    terms = search_terms(query_text)
+    if not terms:
+        return None
+
+    backend = current_app.extensions.get('search_backend')
+    if backend == 'fts5':
+        return _fts5_match('professionals_fts', '10.0, 5.0, 1.0', terms)
+    if backend == 'tsvector':
+        return _tsvector_match('professional_search', 'professional_id', terms)
+
+    query = db.session.query(Professional.id.label('id'), literal(0.0).label('search_rank')).join(
+        User, User.id == Professional.user_id
+    ).join(
+        Service, Service.id == Professional.service_id
+    )
+    return _like_match('professionals_match', query, [User.username, Service.name, Professional.description], terms)
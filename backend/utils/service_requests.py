@@ -0,0 +1,197 @@
+from datetime import datetime
+from sqlalchemy.orm import joinedload, aliased
+from models.models import db, ServiceRequest, Customer, Professional, Service, User, Review
+
+
+def service_request_load_options():
+    """
+    Eager-loading options shared by every service request listing.
+    Related rows are fetched with the listing query itself instead of one
+    Service/Customer/User/Professional lookup per request. Built lazily
+    because the relationships are backrefs that only exist once mappers
+    are configured.
+    """
+    return (
+        joinedload(ServiceRequest.service),
+        joinedload(ServiceRequest.customer).joinedload(Customer.user),
+        joinedload(ServiceRequest.professional).joinedload(Professional.user),
+        joinedload(ServiceRequest.review),
+    )
+
+
+def service_request_query():
+    """Base query for service request listings with all relations eager-loaded"""
+    return ServiceRequest.query.options(*service_request_load_options())
+
+
+def available_requests_query(service_id):
+    """Open requests for a service that no professional has taken yet"""
+    return service_request_query().filter(
+        ServiceRequest.service_id == service_id,
+        ServiceRequest.service_status == 'requested',
+        ServiceRequest.professional_id == None
+    )
+
+
+def _service_summary(service):
+    return {
+        'name': service.name,
+        'base_price': float(service.base_price),
+        'time_required': service.time_required
+    }
+
+
+def serialize_admin_request(req):
+    """Serialize a service request for the admin listing"""
+    customer_user = req.customer.user if req.customer else None
+    professional_user = req.professional.user if req.professional else None
+
+    return {
+        'id': req.id,
+        'service_id': req.service_id,
+        'service_name': req.service.name if req.service else 'Unknown Service',
+        'customer_id': req.customer_id,
+        'customer_name': customer_user.username if customer_user else 'Unknown Customer',
+        'professional_id': req.professional_id,
+        'professional_name': professional_user.username if professional_user else None,
+        'date_of_request': req.date_of_request.isoformat() if req.date_of_request else None,
+        'date_of_completion': req.date_of_completion.isoformat() if req.date_of_completion else None,
+        'service_status': req.service_status,
+        'remarks': req.remarks
+    }
+
+
+def serialize_customer_request(req):
+    """Serialize a service request for the customer's own listing"""
+    professional_name = None
+    if req.professional:
+        professional_name = req.professional.user.username
+
+    return {
+        'id': req.id,
+        'service_id': req.service_id,
+        'service_name': req.service.name,
+        'service': _service_summary(req.service),
+        'professional_id': req.professional_id,
+        'professional_name': professional_name,
+        'date_of_request': req.date_of_request,
+        'date_of_completion': req.date_of_completion,
+        'service_status': req.service_status,
+        'remarks': req.remarks,
+        'has_review': req.review is not None
+    }
+
+
+def serialize_professional_request(req):
+    """Serialize a service request assigned to a professional"""
+    return {
+        'id': req.id,
+        'service_id': req.service_id,
+        'service_name': req.service.name,
+        'service': _service_summary(req.service),
+        'customer_id': req.customer_id,
+        'customer_name': req.customer.user.username,
+        'customer_address': req.customer.address,
+        'customer_pin_code': req.customer.pin_code,
+        'date_of_request': req.date_of_request,
+        'date_of_completion': req.date_of_completion,
+        'service_status': req.service_status,
+        'remarks': req.remarks
+    }
+
+
+def serialize_available_request(req):
+    """Serialize an open service request offered to professionals"""
+    return {
+        'id': req.id,
+        'service_id': req.service_id,
+        'service_name': req.service.name,
+        'service': _service_summary(req.service),
+        'customer_id': req.customer_id,
+        'customer_name': req.customer.user.username,
+        'customer_address': req.customer.address,
+        'customer_pin_code': req.customer.pin_code,
+        'date_of_request': req.date_of_request,
+        'remarks': req.remarks
+    }
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def filter_service_requests(query, args):
+    """
+    Apply the optional server-side filters shared by the service request
+    listings: `status`, `service_id`, `customer_id`, `professional_id`,
+    `date_from` and `date_to` (ISO dates, bounding `date_of_request`).
+    """
+    status = args.get('status')
+    if status and status != 'all':
+        query = query.filter(ServiceRequest.service_status == status)
+
+    for name, column in (('service_id', ServiceRequest.service_id),
+                         ('customer_id', ServiceRequest.customer_id),
+                         ('professional_id', ServiceRequest.professional_id)):
+        value = args.get(name, type=int)
+        if value is not None:
+            query = query.filter(column == value)
+
+    date_from = args.get('date_from', type=_parse_date)
+    if date_from:
+        query = query.filter(ServiceRequest.date_of_request >= date_from)
+
+    date_to = args.get('date_to', type=_parse_date)
+    if date_to:
+        query = query.filter(ServiceRequest.date_of_request <= date_to)
+
+    return query
+
+
+def service_request_export_query():
+    """
+    Flat projection of service requests with service, customer, professional
+    and rating resolved by joins. Rows are plain tuples, so exports can
+    stream them in batches without building an ORM object graph.
+    """
+    customer_user = aliased(User)
+    professional_user = aliased(User)
+
+    return db.session.query(
+        ServiceRequest.id,
+        Service.name.label('service_name'),
+        customer_user.username.label('customer_name'),
+        professional_user.username.label('professional_name'),
+        ServiceRequest.date_of_request,
+        ServiceRequest.date_of_completion,
+        ServiceRequest.service_status,
+        ServiceRequest.remarks,
+        Review.rating
+    ).select_from(ServiceRequest).join(
+        Service, Service.id == ServiceRequest.service_id
+    ).join(
+        Customer, Customer.id == ServiceRequest.customer_id
+    ).join(
+        customer_user, customer_user.id == Customer.user_id
+    ).outerjoin(
+        Professional, Professional.id == ServiceRequest.professional_id
+    ).outerjoin(
+        professional_user, professional_user.id == Professional.user_id
+    ).outerjoin(
+        Review, Review.service_request_id == ServiceRequest.id
+    )
+
+
+def iter_batches(query, batch_size=1000):
+    """
+    Yield successive batches of a service request query ordered by id.
+    Each batch is its own keyset query (`id > last id`), so memory stays
+    bounded by the batch size and the session can commit between batches.
+    """
+    last_id = 0
+    while True:
+        batch = query.filter(ServiceRequest.id > last_id).order_by(ServiceRequest.id).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
@@ -0,0 +1,92 @@
+from sqlalchemy import func, case, and_, or_, select
+from models.models import db, Service, Professional, Customer, ServiceRequest, Review, ProfessionalStats
+
+REQUEST_STATUSES = ('requested', 'assigned', 'accepted', 'rejected', 'completed', 'closed')
+CUSTOMER_ACTIVE_STATUSES = ('requested', 'assigned', 'accepted', 'in_progress')
+PROFESSIONAL_ACTIVE_STATUSES = ('assigned', 'accepted')
+
+
+def count_where(condition):
+    """Conditional aggregate: SUM(CASE WHEN condition THEN 1 ELSE 0 END)"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _rating_columns():
+    return [
+        func.avg(Review.rating).label('avg_rating'),
+        func.count(Review.rating).label('review_count'),
+    ]
+
+
+def _status_columns(condition=None):
+    """Total plus one conditional count per request status, optionally scoped"""
+    def scoped(clause):
+        return clause if condition is None else and_(condition, clause)
+
+    total = func.count(ServiceRequest.id) if condition is None else count_where(condition)
+    columns = [total.label('total')]
+    for status in REQUEST_STATUSES:
+        columns.append(count_where(scoped(ServiceRequest.service_status == status)).label(status))
+    return columns
+
+
+def _scalar_count(model, *criteria):
+    return select(func.count(model.id)).where(*criteria).scalar_subquery()
+
+
+def _request_aggregate(columns, *criteria, join_reviews=True):
+    """Run one aggregate over service_requests, LEFT JOINed to reviews when ratings are needed"""
+    query = db.session.query(*columns).select_from(ServiceRequest)
+    if join_reviews:
+        query = query.outerjoin(Review, Review.service_request_id == ServiceRequest.id)
+    if criteria:
+        query = query.filter(*criteria)
+    return query.one()._asdict()
+
+
+def admin_stats():
+    """Platform-wide entity counts, request status counts and rating aggregate in one query"""
+    columns = _status_columns() + _rating_columns() + [
+        _scalar_count(Service).label('services'),
+        _scalar_count(Professional).label('professionals'),
+        _scalar_count(Customer).label('customers'),
+        _scalar_count(Professional, Professional.verification_status == 'pending').label('pending_approvals'),
+    ]
+    return _request_aggregate(columns)
+
+
+def customer_stats(customer_id):
+    """Request status counts for one customer plus the active service count in one query"""
+    columns = _status_columns() + [
+        count_where(ServiceRequest.service_status.in_(CUSTOMER_ACTIVE_STATUSES)).label('active'),
+        _scalar_count(Service, Service.is_active == True).label('active_services'),
+    ]
+    return _request_aggregate(columns, ServiceRequest.customer_id == customer_id)
+
+
+def professional_stats(professional):
+    """
+    Request status counts, rating aggregate and the size of the open request
+    pool for one professional in one query. The scan covers the
+    professional's own requests plus unassigned requests for their service,
+    and the conditional aggregates split the two apart. The rating comes
+    from the professional_stats rollup rather than a join on reviews.
+    """
+    own = ServiceRequest.professional_id == professional.id
+    available = and_(
+        ServiceRequest.service_id == professional.service_id,
+        ServiceRequest.service_status == 'requested',
+        ServiceRequest.professional_id == None
+    )
+
+    avg_rating = select(
+        case((ProfessionalStats.review_count > 0,
+              ProfessionalStats.rating_sum * 1.0 / ProfessionalStats.review_count))
+    ).where(ProfessionalStats.professional_id == professional.id).scalar_subquery()
+
+    columns = _status_columns(own) + [
+        avg_rating.label('avg_rating'),
+        count_where(and_(own, ServiceRequest.service_status.in_(PROFESSIONAL_ACTIVE_STATUSES))).label('active'),
+        count_where(available).label('available'),
+    ]
+    return _request_aggregate(columns, or_(own, available), join_reviews=False)
@@ -0,0 +1,130 @@
+from flask import current_app
+from cache.cache_config import cache, REVOKED_TOKEN_CACHE_KEY, USER_TOKENS_REVOKED_CACHE_KEY
+from datetime import timedelta
+import time
+import uuid
+import jwt
+import os
+
+# In signed-claims mode role checks are answered from the access token
+# alone, so access tokens are kept short-lived and renewed with a refresh token
+JWT_CLAIMS_MODE = os.getenv('JWT_CLAIMS_MODE', 'False').lower() in ('true', '1', 't')
+
+if JWT_CLAIMS_MODE:
+    ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.getenv('ACCESS_TOKEN_MINUTES', 15)))
+else:
+    ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv('REFRESH_TOKEN_DAYS', 7)))
+
+TOKEN_TYPES = ('access', 'refresh')
+
+
+def user_claims(user):
+    """Authorization claims carried by access tokens"""
+    claims = {
+        'user_id': user.id,
+        'username': user.username,
+        'role': user.role,
+        'customer_id': None,
+        'professional_id': None,
+        'verification_status': None
+    }
+    if user.is_customer() and user.customer:
+        claims['customer_id'] = user.customer.id
+    elif user.is_professional() and user.professional:
+        claims['professional_id'] = user.professional.id
+        claims['verification_status'] = user.professional.verification_status
+    return claims
+
+
+def _encode(payload, token_type, expires):
+    now = int(time.time())
+    payload = dict(payload, type=token_type, jti=uuid.uuid4().hex, iat=now,
+                   exp=now + int(expires.total_seconds()))
+    return jwt.encode(payload, current_app.config['SECRET_KEY'], algorithm='HS256')
+
+
+def issue_tokens(user):
+    """Create an access token with the user's claims and a refresh token"""
+    return {
+        'token': _encode(user_claims(user), 'access', ACCESS_TOKEN_EXPIRES),
+        'refresh_token': _encode({'user_id': user.id}, 'refresh', REFRESH_TOKEN_EXPIRES),
+        'expires_in': int(ACCESS_TOKEN_EXPIRES.total_seconds())
+    }
+
+
+def token_type(payload):
+    # Tokens issued before refresh tokens existed have no type and are access tokens
+    return payload.get('type', 'access')
+
+
+class RevocationUnavailable(Exception):
+    """The revocation set could not be read or written, e.g. during a cache outage"""
+
+
+def is_revoked(payload):
+    """
+    Check a verified payload against the revocation set: its own jti, and
+    the cut-off after which the user's tokens of this type were revoked.
+    Both are looked up in one round trip. Raises RevocationUnavailable when
+    the cache cannot be reached; utils.auth decides whether the request may
+    go on without the check.
+    """
+    keys = [USER_TOKENS_REVOKED_CACHE_KEY.format(token_type(payload), payload.get('user_id'))]
+    if payload.get('jti'):
+        keys.append(REVOKED_TOKEN_CACHE_KEY.format(payload['jti']))
+
+    try:
+        values = cache.get_many(*keys)
+    except Exception as e:
+        raise RevocationUnavailable(str(e)) from e
+    revoked_before = values[0]
+    # iat has one-second resolution, so tokens from the cut-off second are revoked too
+    if revoked_before is not None and payload.get('iat', 0) <= revoked_before:
+        return True
+    return len(values) > 1 and values[1] is not None
+
+
+def revoke_token(payload):
+    """Add one token to the revocation set until it would have expired anyway"""
+    if not payload.get('jti'):
+        return
+    remaining = int(payload.get('exp', 0) - time.time())
+    if remaining > 0:
+        cache.set(REVOKED_TOKEN_CACHE_KEY.format(payload['jti']), 1, timeout=remaining)
+
+
+def claim_token(payload):
+    """
+    Revoke a single-use token and report whether this call was the one that
+    revoked it. The revocation key is added only if absent (SET NX), so of
+    two concurrent uses exactly one gets True. Raises RevocationUnavailable
+    when the cache cannot be reached: without the claim a token could be
+    replayed any number of times, so it is refused rather than accepted.
+    """
+    remaining = int(payload.get('exp', 0) - time.time())
+    if not payload.get('jti') or remaining <= 0:
+        return False
+    try:
+        return bool(cache.add(REVOKED_TOKEN_CACHE_KEY.format(payload['jti']), 1, timeout=remaining))
+    except Exception as e:
+        raise RevocationUnavailable(str(e)) from e
+
+
+def revoke_user_tokens(user_id, token_types=TOKEN_TYPES):
+    """Revoke every token of the given types issued to a user up to now"""
+    cutoff = int(time.time())
+    for kind in token_types:
+        expires = ACCESS_TOKEN_EXPIRES if kind == 'access' else REFRESH_TOKEN_EXPIRES
+        cache.set(USER_TOKENS_REVOKED_CACHE_KEY.format(kind, user_id), cutoff,
+                  timeout=int(expires.total_seconds()))
+
+
+def invalidate_user_claims(user_id):
+    """
+    Force a new access token after a claim such as verification status has
+    changed. Only needed in claims mode, where access tokens are trusted
+    without reloading the user; the refresh token stays valid.
+    """
+    if JWT_CLAIMS_MODE:
+        revoke_user_tokens(user_id, token_types=('access',))